@@ -1,14 +1,38 @@
 """
 LLM wrapper for the agent. Uses Anthropic (Claude) API.
 Enforces: JSON-only output (via prompt), token limit, low temperature.
+
+Route handlers use the async helpers, which share one AsyncAnthropic client per
+event loop (pooled keep-alive connections) and cap in-flight calls with a
+semaphore.  Tunables (backend/.env):
+  ANTHROPIC_TIMEOUT           seconds per call (default 60); connect timeout 5 s
+  ANTHROPIC_MAX_RETRIES       SDK retries on 429/5xx/connection errors (default 2)
+  ANTHROPIC_MAX_CONCURRENCY   concurrent Claude calls per process (default 8)
+  ANTHROPIC_BASE_URL          read by the SDK; point at fake_anthropic_server.py for local tests
+
+Callers that pass use_cache=True get responses from a content-addressed cache
+keyed on sha256(system prompt, user message, model, temperature, max_tokens):
+  LLM_CACHE_SIZE              in-memory LRU entries (default 512; 0 disables)
+  LLM_CACHE_TTL               seconds a response stays valid (default 86400)
+  LLM_CACHE_DB                1 = also keep responses in the llm_cache table (shared
+                              across workers and restarts; see schema.sql)
 """
 
+import asyncio
+import hashlib
 import json
 import os
+import time
+import weakref
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator, Awaitable, Callable
 
-from anthropic import Anthropic
+from anthropic import Anthropic, AsyncAnthropic, Timeout
+from dotenv import load_dotenv
+
+# Load backend/.env once, in case the importer (a script, not main.py) didn't
+load_dotenv(dotenv_path=Path(__file__).resolve().parent.parent / ".env")
 
 
 # Contract constants — use a current model ID; older versions (e.g. claude-3-5-sonnet-20241022) return 404 when deprecated
@@ -17,6 +41,15 @@ DEFAULT_MODEL = "claude-sonnet-4-6"
 MAX_OUTPUT_TOKENS = 4096
 TEMPERATURE = 0.2  # Low for consistent, deterministic outputs
 
+REQUEST_TIMEOUT = float(os.environ.get("ANTHROPIC_TIMEOUT", "60"))
+CONNECT_TIMEOUT = 5.0
+MAX_RETRIES = int(os.environ.get("ANTHROPIC_MAX_RETRIES", "2"))
+MAX_CONCURRENCY = int(os.environ.get("ANTHROPIC_MAX_CONCURRENCY", "8"))
+
+LLM_CACHE_SIZE = int(os.environ.get("LLM_CACHE_SIZE", "512"))
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_DB = os.environ.get("LLM_CACHE_DB", "0").strip().lower() in ("1", "true", "yes")
+
 
 def _load_prompt(name: str, version: str = "v1") -> str:
     """Load prompt from agent/prompts/<name>_<version>.txt."""
@@ -27,6 +60,196 @@ def _load_prompt(name: str, version: str = "v1") -> str:
     return path.read_text(encoding="utf-8").strip()
 
 
+def _api_key() -> str:
+    api_key = (os.environ.get("ANTHROPIC_API_KEY") or "").strip()
+    if not api_key:
+        raise RuntimeError("ANTHROPIC_API_KEY is not set")
+    return api_key
+
+
+def _response_text(response: Any) -> str:
+    if not response.content or not response.content[0].text:
+        raise RuntimeError("Anthropic returned empty response")
+    return response.content[0].text.strip()
+
+
+def _timeout(seconds: float | None = None) -> Timeout:
+    return Timeout(seconds or REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT)
+
+
+_sync_client: Anthropic | None = None
+
+# One async client + limiter per event loop (httpx connections belong to a loop)
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple[AsyncAnthropic, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_sync_client() -> Anthropic:
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = Anthropic(api_key=_api_key(), timeout=_timeout(), max_retries=MAX_RETRIES)
+    return _sync_client
+
+
+def _get_async_client() -> tuple[AsyncAnthropic, asyncio.Semaphore]:
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None:
+        client = AsyncAnthropic(api_key=_api_key(), timeout=_timeout(), max_retries=MAX_RETRIES)
+        entry = _async_clients[loop] = (client, asyncio.Semaphore(max(1, MAX_CONCURRENCY)))
+    return entry
+
+
+async def close_async_client() -> None:
+    """Close this loop's shared AsyncAnthropic client (app shutdown)."""
+    entry = _async_clients.pop(asyncio.get_running_loop(), None)
+    if entry is not None:
+        await entry[0].close()
+
+
+# ── Response cache ────────────────────────────────────────────────────────────
+
+
+def prompt_key(system: str, user: str, model: str, temperature: float, max_tokens: int) -> bytes:
+    """Content address of one call: any change to the prompt text or sampling settings misses."""
+    payload = json.dumps([system, user, model, temperature, max_tokens], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).digest()
+
+
+class _ResponseCache:
+    """
+    LRU + TTL cache of response texts, in front of the optional llm_cache table.
+    A miss starts one Claude call; calls for the same key that arrive while it
+    is running await that call instead of starting another.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, use_db: bool) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.use_db = use_db
+        self._entries: OrderedDict[bytes, tuple[float, str]] = OrderedDict()
+        self._inflight: dict[bytes, asyncio.Task] = {}
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 or self.use_db
+
+    def _get_local(self, key: bytes) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, text = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return text
+
+    def _put_local(self, key: bytes, text: str) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def _get_db(self, key: bytes) -> str | None:
+        if not self.use_db:
+            return None
+        import asyncpg  # noqa: PLC0415
+        from repositories import llm_cache  # noqa: PLC0415
+
+        try:
+            return await llm_cache.get_response(key)
+        except asyncpg.UndefinedTableError:
+            self.use_db = False  # table not created (run migrate.sql); stay in-memory only
+        except Exception:
+            pass  # pool not initialised or DB unavailable: treat as a miss
+        return None
+
+    async def _put_db(self, key: bytes, model: str, text: str) -> None:
+        if not self.use_db:
+            return
+        import asyncpg  # noqa: PLC0415
+        from repositories import llm_cache  # noqa: PLC0415
+
+        try:
+            await llm_cache.put_response(key, model, text, self.ttl)
+        except asyncpg.UndefinedTableError:
+            self.use_db = False
+        except Exception:
+            pass
+
+    async def get(self, key: bytes) -> str | None:
+        text = self._get_local(key)
+        if text is not None:
+            self.hits += 1
+            return text
+        text = await self._get_db(key)
+        if text is not None:
+            self.db_hits += 1
+            self._put_local(key, text)
+        return text
+
+    async def put(self, key: bytes, model: str, text: str) -> None:
+        self._put_local(key, text)
+        await self._put_db(key, model, text)
+
+    async def get_or_compute(self, key: bytes, model: str, compute: Callable[[], Awaitable[str]]) -> str:
+        text = await self.get(key)
+        if text is not None:
+            return text
+
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        if task is not None and task.get_loop() is loop:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.misses += 1
+
+        async def compute_and_store() -> str:
+            result = await compute()
+            await self.put(key, model, result)
+            return result
+
+        task = loop.create_task(compute_and_store())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._inflight.pop(key) if self._inflight.get(key) is t else None)
+        # shield: a cancelled caller must not cancel the call other callers share
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.db_hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "max_size": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "db_enabled": self.use_db,
+            "hits": self.hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.db_hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+
+_response_cache = _ResponseCache(LLM_CACHE_SIZE, LLM_CACHE_TTL, LLM_CACHE_DB)
+
+
+def get_llm_cache_stats() -> dict:
+    """Hit/miss counters for the LLM response cache."""
+    return _response_cache.stats()
+
+
+# ── Calls ─────────────────────────────────────────────────────────────────────
+
+
 def complete(
     system: str,
     user: str,
@@ -39,26 +262,56 @@ def complete(
     Call Anthropic (Claude) with system + user message. Returns raw text.
     Use parse_json_response() on the result for structured output.
     """
-    # Ensure .env is loaded (backend/.env) in case it wasn't at startup
-    from dotenv import load_dotenv
-    _backend_dir = Path(__file__).resolve().parent.parent
-    load_dotenv(dotenv_path=_backend_dir / ".env")
-    api_key = (os.environ.get("ANTHROPIC_API_KEY") or "").strip()
-    if not api_key:
-        raise RuntimeError("ANTHROPIC_API_KEY is not set")
-
-    client = Anthropic(api_key=api_key)
-    response = client.messages.create(
+    response = _get_sync_client().messages.create(
         model=model or DEFAULT_MODEL,
         max_tokens=max_tokens,
         temperature=temperature,
         system=system,
         messages=[{"role": "user", "content": user}],
     )
+    return _response_text(response)
 
-    if not response.content or not response.content[0].text:
-        raise RuntimeError("Anthropic returned empty response")
-    return response.content[0].text.strip()
+
+async def complete_async(
+    system: str,
+    user: str,
+    *,
+    model: str | None = None,
+    max_tokens: int = MAX_OUTPUT_TOKENS,
+    temperature: float = TEMPERATURE,
+    timeout: float | None = None,
+    use_cache: bool = False,
+    validate: Callable[[str], Any] | None = None,
+) -> str:
+    """
+    Async complete(): awaits Claude on the caller's event loop instead of blocking it.
+    Waits for a slot when ANTHROPIC_MAX_CONCURRENCY calls are already in flight;
+    `timeout` (seconds) overrides ANTHROPIC_TIMEOUT for this call.
+    With use_cache=True an identical earlier call's response is returned instead;
+    `validate` runs on a fresh response first and keeps it out of the cache by raising.
+    """
+    model = model or DEFAULT_MODEL
+
+    async def call() -> str:
+        client, limiter = _get_async_client()
+        async with limiter:
+            response = await client.messages.create(
+                model=model,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                system=system,
+                messages=[{"role": "user", "content": user}],
+                timeout=_timeout(timeout),
+            )
+        text = _response_text(response)
+        if validate is not None:
+            validate(text)
+        return text
+
+    if not (use_cache and _response_cache.enabled):
+        return await call()
+    key = prompt_key(system, user, model, temperature, max_tokens)
+    return await _response_cache.get_or_compute(key, model, call)
 
 
 def parse_json_response(raw: str) -> dict[str, Any]:
@@ -96,6 +349,76 @@ def complete_json(
     return parse_json_response(raw)
 
 
+async def stream_async(
+    system: str,
+    user: str,
+    *,
+    model: str | None = None,
+    max_tokens: int = MAX_OUTPUT_TOKENS,
+    temperature: float = TEMPERATURE,
+    timeout: float | None = None,
+    use_cache: bool = False,
+) -> AsyncIterator[str]:
+    """
+    Streaming complete_async(): yields text deltas as Claude produces them.
+    Holds a concurrency slot until the stream finishes or the caller stops iterating.
+    With use_cache=True a cached response is yielded as a single chunk, and a
+    stream that runs to completion is cached (shared with complete_async).
+    """
+    model = model or DEFAULT_MODEL
+    key = None
+    if use_cache and _response_cache.enabled:
+        key = prompt_key(system, user, model, temperature, max_tokens)
+        cached = await _response_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        _response_cache.misses += 1
+
+    parts: list[str] = []
+    client, limiter = _get_async_client()
+    async with limiter:
+        async with client.messages.stream(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            system=system,
+            messages=[{"role": "user", "content": user}],
+            timeout=_timeout(timeout),
+        ) as stream:
+            async for text in stream.text_stream:
+                if text:
+                    parts.append(text)
+                    yield text
+    full = "".join(parts).strip()
+    if key is not None and full:
+        await _response_cache.put(key, model, full)
+
+
+async def complete_json_async(
+    system: str,
+    user: str,
+    *,
+    model: str | None = None,
+    max_tokens: int = MAX_OUTPUT_TOKENS,
+    temperature: float = TEMPERATURE,
+    timeout: float | None = None,
+    use_cache: bool = False,
+) -> dict[str, Any]:
+    """Async complete_json()."""
+    raw = await complete_async(
+        system=system,
+        user=user,
+        model=model,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        timeout=timeout,
+        use_cache=use_cache,
+        validate=parse_json_response,  # never cache a reply that isn't valid JSON
+    )
+    return parse_json_response(raw)
+
+
 def get_prompt(name: str, version: str = "v1") -> str:
     """Public helper to load a prompt by name and optional version."""
     return _load_prompt(name, version)
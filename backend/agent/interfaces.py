@@ -1,16 +1,20 @@
 """
-Placeholder interfaces for drop-in integration later.
-Agent code depends on these; implementations (Postgres, pgvector, Reddit, etc.) come later.
+Interfaces for drop-in integration.
+Agent code depends on these; the pgvector Retriever lives in retrieval.py, the rest come later.
 """
 
 from .schemas import AgentRequest, AgentResponse, RetrievalMatch
 
 
 class Retriever:
-    """Vector/search retriever. Stub now; implement with pgvector, Qdrant, etc."""
+    """Vector/search retriever. Stub returns no matches; see retrieval.PgVectorRetriever."""
 
-    def get_matches(self, query: str, limit: int = 20) -> list[RetrievalMatch]:
-        return []
+    async def get_matches(self, query: str, limit: int = 20) -> list[RetrievalMatch]:
+        return (await self.get_matches_batch([query], limit))[0]
+
+    async def get_matches_batch(self, queries: list[str], limit: int = 20) -> list[list[RetrievalMatch]]:
+        """Matches for each query, in order. Implementations should search all queries at once."""
+        return [[] for _ in queries]
 
 
 class Store:
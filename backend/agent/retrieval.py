@@ -0,0 +1,52 @@
+"""
+Retriever backed by the Remand pgvector tables (posts + comment_embeddings).
+All queries of a call are embedded in one batch and searched in one round trip
+(repositories.posts.get_top_matches_batch), so grounding an idea and its variants
+costs one search instead of one per text.
+"""
+
+from typing import TYPE_CHECKING
+
+from .interfaces import Retriever
+from .schemas import RetrievalMatch
+
+if TYPE_CHECKING:
+    from models import TopMatch
+
+_TITLE_CHARS = 120
+
+
+def _title(match: "TopMatch") -> str:
+    if match.title:
+        return match.title
+    first_line = (match.body or "").strip().split("\n", 1)[0]
+    return first_line[:_TITLE_CHARS] or match.id
+
+
+def to_retrieval_match(match: "TopMatch") -> RetrievalMatch:
+    """TopMatch (API shape) → RetrievalMatch (agent contract); similarity etc. go in metadata."""
+    return RetrievalMatch(
+        id=match.id,
+        title=_title(match),
+        text=match.body or "",
+        source="reddit",
+        metadata={
+            "kind": match.kind,
+            "subreddit": match.subreddit,
+            "author": match.author,
+            "score": match.score,
+            "url": match.url,
+            "similarity": match.similarity,
+        },
+    )
+
+
+class PgVectorRetriever(Retriever):
+    """Raises whatever the DB layer raises (e.g. RuntimeError when DATABASE_URL is unset)."""
+
+    async def get_matches_batch(self, queries: list[str], limit: int = 20) -> list[list[RetrievalMatch]]:
+        from repositories import posts as posts_repo
+
+        texts = [q.strip() or "(none)" for q in queries]
+        responses = await posts_repo.get_top_matches_batch(texts, limit=limit)
+        return [[to_retrieval_match(m) for m in r.matches] for r in responses]
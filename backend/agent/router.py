@@ -7,8 +7,11 @@ from .schemas import AgentRequest, AgentResponse
 from .skills import enhance_idea_skill
 
 
-def run(request: AgentRequest) -> AgentResponse:
-    """Dispatch by action to the corresponding skill; return AgentResponse."""
+async def run(request: AgentRequest, use_cache: bool = True) -> AgentResponse:
+    """
+    Dispatch by action to the corresponding skill; return AgentResponse.
+    use_cache=False bypasses the LLM response cache.
+    """
     if request.action == "enhance_idea":
-        return enhance_idea_skill(request)
+        return await enhance_idea_skill(request, use_cache=use_cache)
     raise ValueError(f"Unknown action: {request.action}")
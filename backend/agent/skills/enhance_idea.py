@@ -1,107 +1,112 @@
 """
-AI Enhance: brainstorm up to 5 better-but-similar ideas, test each against Remand search.
-Only suggest one if it has greater Reddit traction; otherwise report "your idea is well optimised".
+AI Enhance: brainstorm up to 5 better-but-similar ideas in one Claude call, test them against
+Remand search in one batched round trip, and suggest the first that has greater Reddit traction
+than the original; otherwise report "your idea is well optimised".
 When the Remand DB is unavailable, we still run Claude once and return the enhanced idea (no traction comparison).
 """
 
 import asyncio
 from typing import Any
 
-from ..claude_client import complete_json, get_prompt
-from ..schemas import AgentRequest, AgentResponse
+from ..claude_client import complete_json_async, get_prompt
+from ..retrieval import PgVectorRetriever
+from ..schemas import AgentRequest, AgentResponse, RetrievalMatch
 from .._response import normalize_llm_output
 from ._build_user import build_user_message
 
 # Limit and traction window for fair comparison
 TOP_MATCHES_LIMIT = 15
-MAX_BRAINSTORM_ATTEMPTS = 5
+MAX_BRAINSTORM_ATTEMPTS = 5  # variants requested from Claude in one call
 
+_retriever = PgVectorRetriever()
 
-def _traction_score(matches: list[Any]) -> float:
+
+def _traction_score(matches: list[RetrievalMatch]) -> float:
     """Sum of similarity scores; higher = more/better Reddit demand."""
-    return sum(getattr(m, "similarity", 0.0) for m in matches)
+    return sum(m.metadata.get("similarity", 0.0) for m in matches)
+
+
+def _variants(raw: dict[str, Any]) -> list[dict[str, str]]:
+    """Distinct non-empty variants from the v2 output, in Claude's order (best first)."""
+    outputs = raw.get("outputs") if isinstance(raw.get("outputs"), dict) else {}
+    items = outputs.get("variants")
+    if not isinstance(items, list):
+        items = [outputs]  # tolerate a single v1-style variant
+    seen: set[str] = set()
+    variants = []
+    for item in items[:MAX_BRAINSTORM_ATTEMPTS]:
+        if not isinstance(item, dict):
+            continue
+        text = (item.get("enhanced_idea_text") or "").strip()
+        if text and text.lower() not in seen:
+            seen.add(text.lower())
+            variants.append({"enhanced_idea_text": text, "rationale": item.get("rationale") or ""})
+    return variants
+
 
+async def _cancel(tasks: list[asyncio.Task]) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
 
-def _run_with_db(request: AgentRequest) -> AgentResponse | None:
+
+async def _run_with_db(request: AgentRequest, use_cache: bool = True) -> AgentResponse | None:
     """
     Run full pipeline using Remand DB for traction. Returns None if DB is unavailable.
-    """
-    system = get_prompt("enhance_idea", "v1")
-    base_user = build_user_message(request, use_mock_if_empty=False)
 
-    # Get original traction once (required to compare)
+    Claude starts straight away, grounded in the request's own retrieval matches,
+    while the original idea is searched for its traction.  All variants are then
+    scored with one batched search, and the first variant in Claude's order that
+    beats the original wins: one LLM call plus two searches, the first overlapped.
+    """
+    system = get_prompt("enhance_idea", "v2")
+    user = build_user_message(request, use_mock_if_empty=False) + (
+        f"\n\nWrite {MAX_BRAINSTORM_ATTEMPTS} variants."
+    )
+    llm_task = asyncio.create_task(complete_json_async(system=system, user=user, use_cache=use_cache))
     try:
-        from repositories import posts as posts_repo
-
-        async def _fetch_original() -> list[Any]:
-            r = await posts_repo.get_top_matches(
-                request.idea_text.strip() or "(none)", limit=TOP_MATCHES_LIMIT
-            )
-            return r.matches
-
-        loop = asyncio.new_event_loop()
-        try:
-            orig_matches = loop.run_until_complete(_fetch_original())
-            original_traction = _traction_score(orig_matches)
-        finally:
-            loop.close()
+        original_matches = await _retriever.get_matches(request.idea_text, limit=TOP_MATCHES_LIMIT)
+    except asyncio.CancelledError:
+        await _cancel([llm_task])
+        raise
     except Exception:
+        await _cancel([llm_task])
         return None
+    original_traction = _traction_score(original_matches)
+    raw = await llm_task
+    variants = _variants(raw)
 
-    # Brainstorm -> back_idea up to 5 times; stop when one beats original
-    winner_idea: str | None = None
+    winner: dict[str, str] | None = None
     winner_traction: float = 0.0
-    winner_rationale: str = ""
-    last_raw: dict[str, Any] = {}
-
-    for attempt in range(1, MAX_BRAINSTORM_ATTEMPTS + 1):
-        user = base_user
-        if attempt > 1:
-            user += f"\n\nAttempt {attempt} of {MAX_BRAINSTORM_ATTEMPTS}. Previous variant(s) did not beat the original traction; try a different refinement (same idea, different wording or angle)."
-        raw = complete_json(system=system, user=user)
-        last_raw = raw
-
-        enhanced_idea_text = ""
-        if isinstance(raw.get("outputs"), dict):
-            enhanced_idea_text = (raw["outputs"].get("enhanced_idea_text") or "").strip()
-        if not enhanced_idea_text:
-            continue
-
+    if variants:
         try:
-            from repositories import posts as posts_repo
-
-            async def _fetch_enhanced(text: str) -> list[Any]:
-                r = await posts_repo.get_top_matches(text, limit=TOP_MATCHES_LIMIT)
-                return r.matches
-
-            loop = asyncio.new_event_loop()
-            try:
-                enh_matches = loop.run_until_complete(_fetch_enhanced(enhanced_idea_text))
-                enhanced_traction = _traction_score(enh_matches)
-            finally:
-                loop.close()
+            per_variant = await _retriever.get_matches_batch(
+                [v["enhanced_idea_text"] for v in variants], limit=TOP_MATCHES_LIMIT
+            )
         except Exception:
-            continue
+            per_variant = [[] for _ in variants]
+        for variant, matches in zip(variants, per_variant):
+            enhanced_traction = _traction_score(matches)
+            if enhanced_traction > original_traction:
+                winner, winner_traction = variant, enhanced_traction
+                break
 
-        if enhanced_traction > original_traction:
-            winner_idea = enhanced_idea_text
-            winner_traction = enhanced_traction
-            winner_rationale = (raw.get("outputs") or {}).get("rationale") or ""
-            break
-
-    base_response = normalize_llm_output("enhance_idea", last_raw)
+    base_response = normalize_llm_output("enhance_idea", raw)
+    base_response.outputs.pop("variants", None)
     base_response.outputs["original_traction"] = round(original_traction, 2)
     base_response.outputs["db_used"] = True
+    base_response.outputs["variants_tested"] = len(variants)
 
-    if winner_idea is not None:
+    if winner is not None:
         base_response.outputs["suggested"] = True
-        base_response.outputs["enhanced_idea_text"] = winner_idea
+        base_response.outputs["enhanced_idea_text"] = winner["enhanced_idea_text"]
         base_response.outputs["enhanced_traction"] = round(winner_traction, 2)
-        base_response.outputs["rationale"] = winner_rationale
+        base_response.outputs["rationale"] = winner["rationale"]
     else:
         base_response.outputs["suggested"] = False
         base_response.outputs["well_optimised_message"] = (
-            "We couldn't enhance your idea—after five attempts, no refinement had better traction than your original."
+            f"We couldn't enhance your idea—after {len(variants) or 'several'} variants, "
+            "no refinement had better traction than your original."
         )
         base_response.outputs["enhanced_idea_text"] = None
         base_response.outputs["enhanced_traction"] = None
@@ -110,14 +115,14 @@ def _run_with_db(request: AgentRequest) -> AgentResponse | None:
     return base_response
 
 
-def _run_without_db(request: AgentRequest) -> AgentResponse:
+async def _run_without_db(request: AgentRequest, use_cache: bool = True) -> AgentResponse:
     """
     DB unavailable: run Claude once with request context (and optional mock retrieval),
     return the enhanced idea without traction comparison.
     """
     system = get_prompt("enhance_idea", "v1")
     base_user = build_user_message(request, use_mock_if_empty=True)
-    raw = complete_json(system=system, user=base_user)
+    raw = await complete_json_async(system=system, user=base_user, use_cache=use_cache)
     base_response = normalize_llm_output("enhance_idea", raw)
     base_response.outputs["db_used"] = False
     base_response.outputs["original_traction"] = None
@@ -143,12 +148,14 @@ def _run_without_db(request: AgentRequest) -> AgentResponse:
     return base_response
 
 
-def enhance_idea_skill(request: AgentRequest) -> AgentResponse:
+async def enhance_idea_skill(request: AgentRequest, use_cache: bool = True) -> AgentResponse:
     """
     Pipeline: when Remand DB is available, brainstorm and compare traction; otherwise
     run Claude once and return the enhanced idea (referencing request/retrieval context).
+    With use_cache, an identical request reuses Claude's earlier variants (traction is
+    always re-scored against the current data).
     """
-    response = _run_with_db(request)
+    response = await _run_with_db(request, use_cache)
     if response is not None:
         return response
-    return _run_without_db(request)
+    return await _run_without_db(request, use_cache)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for ingest.iter_zst — legacy vs current line reader.
+
+The legacy reader did `buf += chunk; buf.split(b"\\n")` over the whole buffer
+on every 128 KB read, which goes quadratic on records spanning many reads.
+The current reader (ingest.iter_zst_lines) only ever scans the new chunk.
+
+Usage
+-----
+  # Bundled sample dumps:
+  python bench_iter_zst.py
+
+  # Specific files / read sizes:
+  python bench_iter_zst.py ../zst/microsaas_comments.zst --read-size 131072 --read-size 1048576
+
+  # Add a synthetic file with a few very long records (e.g. 8 MB selftext):
+  python bench_iter_zst.py --long-record-mb 8
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterator
+
+import zstandard as zstd
+
+from ingest import ZST_READ_SIZE, iter_zst
+
+_DEFAULT_FILES = sorted((Path(__file__).resolve().parent.parent / "zst").glob("microsaas_*.zst"))
+
+
+def _iter_zst_legacy(path: str) -> Iterator[dict]:
+    """The original iter_zst, kept verbatim for comparison."""
+    dctx = zstd.ZstdDecompressor(max_window_size=2**31)
+    buf = b""
+    with open(path, "rb") as fh:
+        with dctx.stream_reader(fh) as reader:
+            while True:
+                chunk = reader.read(131_072)
+                if not chunk:
+                    break
+                buf += chunk
+                lines = buf.split(b"\n")
+                buf = lines[-1]
+                for line in lines[:-1]:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+    if buf.strip():
+        try:
+            yield json.loads(buf)
+        except json.JSONDecodeError:
+            pass
+
+
+def _write_long_record_file(mb: int, records: int = 4) -> str:
+    """Write a temporary .zst with `records` posts whose selftext is `mb` MB each."""
+    fd, path = tempfile.mkstemp(suffix=".zst")
+    body = "x" * (mb * 1024 * 1024)
+    with os.fdopen(fd, "wb") as fh, zstd.ZstdCompressor().stream_writer(fh) as writer:
+        for i in range(records):
+            writer.write(json.dumps({"id": f"long{i}", "title": "t", "selftext": body}).encode() + b"\n")
+    return path
+
+
+def _bench(label: str, path: str, records_iter) -> None:
+    size_mb = os.path.getsize(path) / 1_048_576
+    t0 = time.perf_counter()
+    n = sum(1 for _ in records_iter)
+    elapsed = time.perf_counter() - t0
+    print(
+        f"  {label:<24} {n:>9,} records  {elapsed:7.2f}s  "
+        f"{size_mb / elapsed:8.1f} MB/s (compressed)  {n / elapsed:10,.0f} records/s"
+    )
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("files", nargs="*", default=[str(f) for f in _DEFAULT_FILES])
+    p.add_argument(
+        "--read-size", type=int, action="append", metavar="BYTES",
+        help=f"Read size(s) for the current reader (default: {ZST_READ_SIZE})",
+    )
+    p.add_argument("--long-record-mb", type=int, default=0, metavar="MB",
+                   help="Also benchmark a synthetic file with records of this size")
+    args = p.parse_args()
+
+    files = list(args.files)
+    tmp = None
+    if args.long_record_mb:
+        tmp = _write_long_record_file(args.long_record_mb)
+        files.append(tmp)
+
+    try:
+        for path in files:
+            print(path)
+            _bench("legacy (128 KB)", path, _iter_zst_legacy(path))
+            for read_size in args.read_size or [ZST_READ_SIZE]:
+                _bench(f"current ({read_size // 1024} KB)", path, iter_zst(path, read_size=read_size))
+    finally:
+        if tmp:
+            os.unlink(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Check that the onnx embedding backend is a drop-in replacement for local.
+
+Encodes the same texts with sentence-transformers (EMBEDDING_BACKEND=local)
+and ONNX Runtime (EMBEDDING_BACKEND=onnx), prints the per-text cosine
+similarity between the two and each backend's throughput, and exits non-zero
+if any pair falls below --tolerance.  Existing vectors can be kept when
+switching backends only if this passes.
+
+Usage
+-----
+  # fp32 ONNX vs sentence-transformers on 500 posts from the sample dump:
+  python compare_embeddings.py --n 500
+
+  # int8-quantized ONNX, 4 threads:
+  python compare_embeddings.py --quantize --threads 4 --tolerance 0.98
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv(Path(__file__).resolve().parent / ".env")
+
+_DEFAULT_ZST = Path(__file__).resolve().parent.parent / "zst" / "microsaas_submissions.zst"
+
+
+def _load_texts(path: str, n: int) -> list[str]:
+    from ingest import extract_post, iter_zst  # noqa: PLC0415
+
+    texts: list[str] = []
+    for obj in iter_zst(path):
+        post = extract_post(obj)
+        if post:
+            texts.append(post["reconstructed_text"])
+            if len(texts) >= n:
+                break
+    return texts
+
+
+def _timed(label: str, encode, texts: list[str]):
+    encode(texts[:8])  # load the model outside the timing
+    t0 = time.perf_counter()
+    vecs = encode(texts)
+    elapsed = time.perf_counter() - t0
+    print(f"  {label:<8} {len(texts) / elapsed:8.1f} texts/s")
+    return vecs
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--zst", default=str(_DEFAULT_ZST), help="Submissions dump to sample texts from")
+    p.add_argument("--n", type=int, default=200, help="Number of texts (default: 200)")
+    p.add_argument("--quantize", action="store_true", help="Compare the int8-quantized ONNX model")
+    p.add_argument("--threads", type=int, default=0, help="ONNX_THREADS (default: onnxruntime default)")
+    p.add_argument(
+        "--tolerance", type=float, default=0.99,
+        help="Minimum cosine similarity per text (default: 0.99)",
+    )
+    args = p.parse_args()
+
+    # Read at import time by repositories.embeddings
+    os.environ["ONNX_QUANTIZE"] = "1" if args.quantize else "0"
+    os.environ["ONNX_THREADS"] = str(args.threads)
+
+    import numpy as np  # noqa: PLC0415
+
+    from repositories.embeddings import _LOCAL_MODEL_NAME, _encode_local, _encode_onnx  # noqa: PLC0415
+
+    texts = _load_texts(args.zst, args.n)
+    print(f"{len(texts)} texts, model={_LOCAL_MODEL_NAME}, int8={args.quantize}")
+    ref = np.stack(_timed("local", _encode_local, texts))
+    got = np.stack(_timed("onnx", _encode_onnx, texts))
+
+    # Both sides are L2-normalised, so the row-wise dot product is the cosine
+    cos = np.einsum("ij,ij->i", ref, got)
+    print(
+        f"  cosine   min={cos.min():.5f}  p1={np.percentile(cos, 1):.5f}  "
+        f"mean={cos.mean():.5f}  (tolerance {args.tolerance})"
+    )
+    if cos.min() < args.tolerance:
+        worst = int(cos.argmin())
+        print(f"FAIL: text #{worst} at {cos[worst]:.5f}: {texts[worst][:80]!r}")
+        sys.exit(1)
+    print("OK: onnx vectors are compatible with existing local embeddings.")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,11 @@ No queries in this file — use repositories/ when schema is ready.
 """
 
 import os
+import struct
 from contextlib import asynccontextmanager
 
 import asyncpg
+import numpy as np
 
 
 _pool: asyncpg.Pool | None = None
@@ -20,6 +22,52 @@ async def get_pool() -> asyncpg.Pool:
     return _pool
 
 
+# ── pgvector binary codec ─────────────────────────────────────────────────────
+#
+# pgvector's binary wire format is a big-endian uint16 dimension, a uint16
+# reserved word, then `dim` big-endian float32s.  Registering it lets callers
+# bind NumPy float32 arrays (or any float sequence) as `vector` parameters
+# without formatting and re-parsing a "[x,y,...]" text literal per row.
+
+_VECTOR_HEADER = struct.Struct(">HH")
+
+
+def _encode_vector(value) -> bytes:
+    arr = np.asarray(value, dtype=">f4")
+    if arr.ndim != 1:
+        raise ValueError(f"vector must be 1-dimensional, got shape {arr.shape}")
+    return _VECTOR_HEADER.pack(arr.shape[0], 0) + arr.tobytes()
+
+
+def _decode_vector(data: bytes) -> np.ndarray:
+    dim, _ = _VECTOR_HEADER.unpack_from(data)
+    return np.frombuffer(data, dtype=">f4", count=dim, offset=_VECTOR_HEADER.size).astype(np.float32)
+
+
+async def register_vector_codec(conn: asyncpg.Connection) -> None:
+    """
+    Register the binary `vector` codec on `conn`.  Pass as `init=` to
+    create_pool so every pooled connection gets it.  No-op when the pgvector
+    extension isn't installed.
+    """
+    schema = await conn.fetchval(
+        """
+        SELECT n.nspname FROM pg_type t
+        JOIN pg_namespace n ON n.oid = t.typnamespace
+        WHERE t.typname = 'vector'
+        """
+    )
+    if schema is None:
+        return
+    await conn.set_type_codec(
+        "vector",
+        schema=schema,
+        encoder=_encode_vector,
+        decoder=_decode_vector,
+        format="binary",
+    )
+
+
 def _is_placeholder_db_url(url: str) -> bool:
     """True if URL looks like .env.example placeholder (not a real host)."""
     if not url or not url.strip():
@@ -43,6 +91,7 @@ async def init_pool() -> None:
             min_size=1,
             max_size=10,
             command_timeout=60,
+            init=register_vector_codec,
         )
     except Exception:
         # DB unreachable (e.g. wrong host, no network) — leave pool None so app still starts
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Minimal stand-in for the Anthropic Messages API, for exercising the agent and
+engage routes (shared client, timeouts, concurrency limit) without an API key.
+
+Serves POST /v1/messages, streaming (SSE) or not.  Replies are canned but shaped
+like the real ones:
+  - JSON-only prompts (the enhance_idea prompts) get a valid enhance_idea object
+    with one variant per requested variant, derived from the idea text
+  - the /agent/ping connectivity test gets "OK"
+  - anything else gets a short reply quoting the start of the user message
+
+Usage
+-----
+  python fake_anthropic_server.py --latency-ms 800 --token-delay-ms 40
+
+  ANTHROPIC_API_KEY=x ANTHROPIC_BASE_URL=http://127.0.0.1:8090 uvicorn main:app
+
+Stats (requests, connections opened, peak in-flight requests) are printed every
+10 s. Peak in-flight stays at ANTHROPIC_MAX_CONCURRENCY however many requests
+the app receives, and connections stay near it because the client reuses them.
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Stats:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def enter(self) -> None:
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def leave(self) -> None:
+        with self.lock:
+            self.in_flight -= 1
+
+
+def _user_text(payload: dict) -> str:
+    parts = []
+    for message in payload.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(block.get("text", "") for block in content if isinstance(block, dict))
+    return "\n".join(parts)
+
+
+def _system_text(payload: dict) -> str:
+    system = payload.get("system") or ""
+    if isinstance(system, list):
+        return "\n".join(block.get("text", "") for block in system if isinstance(block, dict))
+    return system
+
+
+def _reply_text(payload: dict) -> str:
+    system, user = _system_text(payload), _user_text(payload)
+    if "Reply with exactly: OK" in system:
+        return "OK"
+    if "valid JSON" in system:
+        match = re.search(r"Idea text:\n(.*?)\n\n", user, re.S)
+        idea = (match.group(1) if match else user[:200]).strip() or "an idea"
+        wanted = re.search(r"Write (\d+) variants", user)
+        angles = ["for small teams", "for solo founders", "with a free tier", "for agencies", "that saves hours weekly"]
+        variants = [
+            {"enhanced_idea_text": f"{idea} {angles[i % len(angles)]}", "rationale": f"Narrows the customer ({angles[i % len(angles)]})."}
+            for i in range(int(wanted.group(1)) if wanted else 1)
+        ]
+        outputs = {"variants": variants} if wanted else variants[0]
+        return json.dumps({
+            "idea_card": None, "outputs": outputs,
+            "assumptions": [], "risks": [], "next_steps": [], "evidence": [],
+        })
+    return f"I built something for exactly this. ({user[:80].strip()}…)"
+
+
+def _make_handler(stats: _Stats, latency: float, token_delay: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self) -> None:
+            super().setup()
+            with stats.lock:
+                stats.connections += 1
+
+        def log_message(self, *args) -> None:  # keep stdout for the stats line
+            pass
+
+        def _send_json(self, status: int, body: dict) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("request-id", f"req_{uuid.uuid4().hex[:24]}")
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):  # client timed out and hung up
+                pass
+
+        def _stream(self, payload: dict, text: str) -> None:
+            """Send `text` as Messages API stream events, a few words per delta."""
+            msg_id = f"msg_{uuid.uuid4().hex[:24]}"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+
+            def event(kind: str, data: dict) -> None:
+                self.wfile.write(f"event: {kind}\ndata: {json.dumps({'type': kind, **data})}\n\n".encode())
+                self.wfile.flush()
+
+            words = re.findall(r"\S+\s*", text)
+            try:
+                event("message_start", {"message": {
+                    "id": msg_id, "type": "message", "role": "assistant", "content": [],
+                    "model": payload.get("model", "claude-sonnet-4-6"), "stop_reason": None,
+                    "stop_sequence": None, "usage": {"input_tokens": len(_user_text(payload)) // 4 + 1, "output_tokens": 1},
+                }})
+                event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+                for i in range(0, len(words), 3):
+                    if i:
+                        time.sleep(token_delay)
+                    event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": "".join(words[i:i + 3])}})
+                event("content_block_stop", {"index": 0})
+                event("message_delta", {"delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                        "usage": {"output_tokens": len(text) // 4 + 1}})
+                event("message_stop", {})
+            except (BrokenPipeError, ConnectionResetError):  # client went away mid-stream
+                pass
+            self.close_connection = True
+
+        def do_POST(self) -> None:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if self.path.split("?")[0].rstrip("/") != "/v1/messages":
+                self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": "not found"}})
+                return
+            stats.enter()
+            try:
+                if latency:
+                    time.sleep(latency)
+                text = _reply_text(payload)
+                if payload.get("stream"):
+                    self._stream(payload, text)
+                    return
+                self._send_json(200, {
+                    "id": f"msg_{uuid.uuid4().hex[:24]}",
+                    "type": "message",
+                    "role": "assistant",
+                    "model": payload.get("model", "claude-sonnet-4-6"),
+                    "content": [{"type": "text", "text": text}],
+                    "stop_reason": "end_turn",
+                    "stop_sequence": None,
+                    "usage": {"input_tokens": len(_user_text(payload)) // 4 + 1, "output_tokens": len(text) // 4 + 1},
+                })
+            finally:
+                stats.leave()
+
+    return Handler
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--port", type=int, default=8090)
+    p.add_argument("--latency-ms", type=int, default=500,
+                   help="Added latency per request, i.e. time to first token (default: 500)")
+    p.add_argument("--token-delay-ms", type=int, default=40,
+                   help="Delay between streamed text deltas (default: 40)")
+    args = p.parse_args()
+
+    stats = _Stats()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), _make_handler(stats, args.latency_ms / 1000, args.token_delay_ms / 1000))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(
+        f"Fake Anthropic Messages API on http://127.0.0.1:{args.port}  "
+        f"(latency={args.latency_ms} ms, token delay={args.token_delay_ms} ms)"
+    )
+
+    t0 = time.monotonic()
+    try:
+        while True:
+            time.sleep(10)
+            print(
+                f"{time.monotonic() - t0:6.0f}s  requests={stats.requests}  connections={stats.connections}  "
+                f"peak_in_flight={stats.peak_in_flight}",
+                flush=True,
+            )
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Minimal stand-in for the OpenAI embeddings API, for exercising the client-side
+rate limiter in repositories/embeddings.py without spending tokens.
+
+Serves POST /v1/embeddings with deterministic unit vectors and enforces
+sliding 60 s RPM/TPM windows.  Over either limit it answers 429 with the same
+x-ratelimit-* and retry-after-ms headers the real API sends.
+
+Usage
+-----
+  python fake_openai_server.py --rpm 600 --tpm 200000 --latency-ms 50
+
+  OPENAI_API_KEY=x OPENAI_BASE_URL=http://127.0.0.1:8089/v1 \\
+  EMBEDDING_BACKEND=openai OPENAI_RPM_LIMIT=600 OPENAI_TPM_LIMIT=200000 \\
+  python ingest.py --mode embed
+
+Stats (requests served, 429s, tokens) are printed every 10 s.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+class _Limits:
+    def __init__(self, rpm: int, tpm: int) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self._events: deque[tuple[float, int]] = deque()  # (timestamp, tokens)
+        self._tokens = 0
+        self._lock = threading.Lock()
+        self.served = 0
+        self.rejected = 0
+        self.tokens_served = 0
+
+    def _expire(self, now: float) -> None:
+        while self._events and now - self._events[0][0] >= 60.0:
+            self._tokens -= self._events.popleft()[1]
+
+    def admit(self, tokens: int) -> tuple[bool, dict]:
+        """Record the request if it fits both windows; returns (ok, rate-limit headers)."""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            ok = len(self._events) < self.rpm and self._tokens + tokens <= self.tpm
+            if ok:
+                self._events.append((now, tokens))
+                self._tokens += tokens
+                self.served += 1
+                self.tokens_served += tokens
+            else:
+                self.rejected += 1
+            retry = 0.0
+            if not ok and self._events:
+                # Oldest events must age out before this request fits
+                need_tokens = self._tokens + tokens - self.tpm
+                freed = 0
+                for ts, n in self._events:
+                    freed += n
+                    retry = 60.0 - (now - ts)
+                    if freed >= need_tokens and len(self._events) < self.rpm:
+                        break
+            headers = {
+                "x-ratelimit-limit-requests": str(self.rpm),
+                "x-ratelimit-limit-tokens": str(self.tpm),
+                "x-ratelimit-remaining-requests": str(max(0, self.rpm - len(self._events))),
+                "x-ratelimit-remaining-tokens": str(max(0, self.tpm - self._tokens)),
+                "x-ratelimit-reset-requests": f"{int(retry * 1000)}ms",
+                "x-ratelimit-reset-tokens": f"{int(retry * 1000)}ms",
+            }
+            if not ok:
+                headers["retry-after-ms"] = str(max(1, int(retry * 1000)))
+            return ok, headers
+
+
+def _vector(text: str, dim: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+    vec = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+def _make_handler(limits: _Limits, latency: float, default_dim: int):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args) -> None:  # keep stdout for the stats line
+            pass
+
+        def _send(self, status: int, body: dict, headers: dict) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self) -> None:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if self.path.rstrip("/") != "/v1/embeddings":
+                self._send(404, {"error": {"message": "not found", "type": "invalid_request_error"}}, {})
+                return
+            inputs = payload.get("input", [])
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            tokens = sum(len(t) // 4 + 1 for t in inputs)
+
+            ok, headers = limits.admit(tokens)
+            if not ok:
+                self._send(429, {"error": {
+                    "message": "Rate limit reached for requests", "type": "requests",
+                    "code": "rate_limit_exceeded",
+                }}, headers)
+                return
+
+            if latency:
+                time.sleep(latency)
+            dim = int(payload.get("dimensions") or default_dim)
+            data = []
+            for i, text in enumerate(inputs):
+                vec = _vector(text, dim)
+                if payload.get("encoding_format") == "base64":
+                    embedding = base64.b64encode(vec.astype("<f4").tobytes()).decode()
+                else:
+                    embedding = vec.tolist()
+                data.append({"object": "embedding", "index": i, "embedding": embedding})
+            self._send(200, {
+                "object": "list",
+                "data": data,
+                "model": payload.get("model", "text-embedding-3-small"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            }, headers)
+
+    return Handler
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--port", type=int, default=8089)
+    p.add_argument("--rpm", type=int, default=3000, help="Requests per minute (default: 3000)")
+    p.add_argument("--tpm", type=int, default=1_000_000, help="Tokens per minute (default: 1000000)")
+    p.add_argument("--latency-ms", type=int, default=50, help="Added latency per request (default: 50)")
+    p.add_argument("--dim", type=int, default=1536, help="Embedding dimension (default: 1536)")
+    args = p.parse_args()
+
+    limits = _Limits(args.rpm, args.tpm)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), _make_handler(limits, args.latency_ms / 1000, args.dim))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Fake OpenAI embeddings on http://127.0.0.1:{args.port}/v1  (rpm={args.rpm}, tpm={args.tpm})")
+
+    t0 = time.monotonic()
+    try:
+        while True:
+            time.sleep(10)
+            elapsed = time.monotonic() - t0
+            print(
+                f"{elapsed:6.0f}s  served={limits.served}  429s={limits.rejected}  "
+                f"tokens={limits.tokens_served}  ({limits.tokens_served / elapsed * 60:,.0f} tok/min)",
+                flush=True,
+            )
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,8 @@ Stages
 ------
   import  – Parse ZST files, insert raw posts + comments, compute activity stats.
   embed   – Batch-embed posts and/or comments via OpenAI; resumes automatically
-            (skips records that already have embeddings).
+            (skips records that already have embeddings). Texts seen before are
+            served from the embedding_cache table instead of being re-encoded.
   all     – Run import then embed.
 
 Usage
@@ -32,6 +33,31 @@ Usage
   # Embed posts only (skip comments):
   python ingest.py --mode embed --skip-comment-embeddings
 
+  # Fast bulk import for multi-GB dumps (binary COPY via a staging table):
+  python ingest.py \\
+      --submissions ../zst/submissions.zst \\
+      --comments    ../zst/comments.zst \\
+      --mode import --load-method copy
+
+  # Same, with decoding/parsing spread over 6 parser processes:
+  python ingest.py \\
+      --submissions ../zst/submissions.zst \\
+      --mode import --load-method copy --workers 6
+
+  # Large embedding backfill: set-based writes, HNSW rebuilt once at the end:
+  python ingest.py --mode embed --embed-write-method copy --rebuild-indexes
+
+  # Bulk load into a fresh database: no HNSW maintenance until everything is in,
+  # then one tuned build (see INDEX_BUILD_* in .env.example):
+  python ingest.py \\
+      --submissions ../zst/submissions.zst \\
+      --comments    ../zst/comments.zst \\
+      --mode all --load-method copy --embed-write-method copy --defer-indexes
+
+  # Recompute activity_ratio for every post (e.g. nightly from cron); import runs
+  # only refresh posts that gained comments, or all with --refresh-activity-all:
+  python ingest.py --mode activity
+
   # Test on a small slice:
   python ingest.py \\
       --submissions ../zst/submissions.zst \\
@@ -56,19 +82,22 @@ Rate limits & cost
 
 import argparse
 import asyncio
+import functools
 import json
 import logging
 import os
 import sys
 import time
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Iterator
+from typing import Iterable, Iterator
 
 import asyncpg
 import zstandard as zstd
 from dotenv import load_dotenv
 
+from database import register_vector_codec
+
 # ─── Logging ──────────────────────────────────────────────────────────────────
 
 logging.basicConfig(
@@ -87,8 +116,14 @@ load_dotenv()
 
 EMBED_BATCH_SIZE = 200          # texts per embedding call
 EMBED_CONCURRENCY = 4           # concurrent embedding calls
+EMBED_FETCH_WINDOW = 2_000      # pending rows fetched per page, then regrouped by length
 DB_INSERT_BATCH = 500           # rows per INSERT statement
+COPY_BATCH = 50_000             # rows per COPY into a staging table (--load-method copy)
 MIN_COMMENT_BODY_LEN = 50       # characters; shorter comments aren't worth embedding
+ZST_READ_SIZE = int(os.environ.get("ZST_READ_SIZE", str(1 << 20)))  # decompressed bytes per read
+# Session settings for one-off HNSW builds (--defer-indexes / --rebuild-indexes)
+INDEX_BUILD_MAINTENANCE_WORK_MEM = os.environ.get("INDEX_BUILD_MAINTENANCE_WORK_MEM", "1GB")
+INDEX_BUILD_PARALLEL_WORKERS = int(os.environ.get("INDEX_BUILD_PARALLEL_WORKERS", "4"))
 
 _DELETED = frozenset({"[deleted]", "[removed]", ""})
 _BOT_AUTHORS = frozenset({"AutoModerator", "[deleted]", "reddit", "BotDefense"})
@@ -96,37 +131,65 @@ _BOT_AUTHORS = frozenset({"AutoModerator", "[deleted]", "reddit", "BotDefense"})
 # ─── ZST helpers ──────────────────────────────────────────────────────────────
 
 
-def iter_zst(path: str, limit: int | None = None) -> Iterator[dict]:
-    """Stream JSON objects from a Zstandard-compressed NDJSON file."""
+def _split_lines(reader, read_size: int) -> Iterator[bytes]:
+    """
+    Yield raw lines (without the trailing newline) from a decompressing reader.
+
+    Complete lines are split straight out of each decompressed chunk; only the
+    trailing partial line is carried over, in a bytearray.  A record spanning
+    many chunks therefore costs O(len) to assemble instead of re-concatenating
+    and re-splitting the whole buffer on every read.
+    """
+    tail = bytearray()
+    while True:
+        chunk = reader.read(read_size)
+        if not chunk:
+            break
+        last_nl = chunk.rfind(b"\n")
+        if last_nl < 0:
+            tail += chunk
+            continue
+        start = 0
+        if tail:
+            first_nl = chunk.find(b"\n")
+            tail += chunk[:first_nl]
+            yield bytes(tail)
+            tail.clear()
+            start = first_nl + 1
+        if start <= last_nl:
+            yield from chunk[start:last_nl].split(b"\n")
+        tail += chunk[last_nl + 1:]
+    if tail:
+        yield bytes(tail)
+
+
+def iter_zst_lines(path: str, read_size: int = ZST_READ_SIZE) -> Iterator[bytes]:
+    """Yield raw lines (without the trailing newline) from a Zstandard-compressed file."""
     dctx = zstd.ZstdDecompressor(max_window_size=2**31)
-    count = 0
-    buf = b""
     with open(path, "rb") as fh:
         with dctx.stream_reader(fh) as reader:
-            while True:
-                chunk = reader.read(131_072)
-                if not chunk:
-                    break
-                buf += chunk
-                lines = buf.split(b"\n")
-                buf = lines[-1]
-                for line in lines[:-1]:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        yield json.loads(line)
-                    except json.JSONDecodeError:
-                        continue
-                    count += 1
-                    if limit and count >= limit:
-                        return
-    # Handle any remaining bytes after the loop
-    if buf.strip():
+            yield from _split_lines(reader, read_size)
+
+
+def iter_zst(
+    path: str,
+    limit: int | None = None,
+    read_size: int = ZST_READ_SIZE,
+) -> Iterator[dict]:
+    """Stream JSON objects from a Zstandard-compressed NDJSON file."""
+    count = 0
+    for line in iter_zst_lines(path, read_size):
+        line = line.strip()
+        if not line:
+            continue
         try:
-            yield json.loads(buf)
+            obj = json.loads(line)
         except json.JSONDecodeError:
-            pass
+            continue
+        yield obj
+        count += 1
+        if limit and count >= limit:
+            return
 
 
 def _ts(val) -> datetime | None:
@@ -137,6 +200,196 @@ def _ts(val) -> datetime | None:
         return None
 
 
+def month_bucket(dt: datetime) -> int:
+    """Integer month bucket used by the trend queries: 2023-06-14 → 202306."""
+    return dt.year * 100 + dt.month
+
+
+def week_bucket(dt: datetime) -> int:
+    """Integer week bucket (the week's Monday, like DATE_TRUNC('week')): 2023-06-14 → 20230612."""
+    monday = dt.date() - timedelta(days=dt.weekday())
+    return monday.year * 10_000 + monday.month * 100 + monday.day
+
+
+# ─── Seekable ZST cursors ─────────────────────────────────────────────────────
+#
+# A checkpoint is the decompressed byte offset just past the last consumed
+# line.  Reopening at a checkpoint seeks straight to the Zstandard frame that
+# contains it (via a sidecar frame index) and only *decompresses* — never
+# JSON-parses — the bytes between that frame's start and the checkpoint.
+# Multi-frame dumps therefore resume almost for free; single-frame dumps (the
+# Pushshift default) still pay for decompression, which is a small fraction of
+# the parse cost.  Within one process, keep the ZstCursor open and nothing is
+# re-read at all.
+
+_ZST_MAGIC = 0xFD2FB528
+_ZST_SKIPPABLE_MASK = 0xFFFFFFF0
+_ZST_SKIPPABLE_MAGIC = 0x184D2A50
+
+
+def zst_frame_offsets(path: str) -> list[tuple[int, int | None]]:
+    """
+    Return (compressed offset, decompressed size or None) for every data frame,
+    walking frame and block headers only — nothing is decompressed.
+    """
+    frames: list[tuple[int, int | None]] = []
+    with open(path, "rb") as fh:
+        end = fh.seek(0, os.SEEK_END)
+        pos = 0
+        while pos < end:
+            fh.seek(pos)
+            magic = int.from_bytes(fh.read(4), "little")
+            if magic & _ZST_SKIPPABLE_MASK == _ZST_SKIPPABLE_MAGIC:
+                pos += 8 + int.from_bytes(fh.read(4), "little")
+                continue
+            if magic != _ZST_MAGIC:
+                raise ValueError(f"{path}: no zstd frame at byte {pos}")
+
+            fhd = fh.read(1)[0]
+            fcs_flag, single_segment = fhd >> 6, (fhd >> 5) & 1
+            has_checksum, dict_flag = (fhd >> 2) & 1, fhd & 3
+            fcs_len = (1 if single_segment else 0, 2, 4, 8)[fcs_flag]
+            header = fh.read((0 if single_segment else 1) + (0, 1, 2, 4)[dict_flag] + fcs_len)
+            content_size = None
+            if fcs_len:
+                content_size = int.from_bytes(header[len(header) - fcs_len:], "little")
+                if fcs_len == 2:
+                    content_size += 256
+            frames.append((pos, content_size))
+
+            block_pos = fh.tell()
+            while True:
+                fh.seek(block_pos)
+                bh = int.from_bytes(fh.read(3), "little")
+                last, block_type, block_size = bh & 1, (bh >> 1) & 3, bh >> 3
+                block_pos += 3 + (1 if block_type == 1 else block_size)  # RLE blocks store 1 byte
+                if last:
+                    break
+            pos = block_pos + (4 if has_checksum else 0)
+    return frames
+
+
+def _zst_frame_size(fh, start: int, stop: int) -> int:
+    """Decompressed size of the frame stored in bytes [start, stop) of `fh`."""
+    dobj = zstd.ZstdDecompressor(max_window_size=2**31).decompressobj()
+    fh.seek(start)
+    size = 0
+    remaining = stop - start
+    while remaining > 0:
+        chunk = fh.read(min(remaining, 1 << 20))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        size += len(dobj.decompress(chunk))
+    return size
+
+
+def load_zst_index(path: str) -> list[tuple[int, int]]:
+    """
+    Return (compressed offset, decompressed offset) for every frame of `path`.
+
+    Cached in a `<path>.index.json` sidecar keyed on file size and mtime, so the
+    scan runs once per dump.  Frames without a content size in their header are
+    decompressed once to measure them (except the last, whose size never matters).
+    """
+    st = os.stat(path)
+    sidecar = Path(f"{path}.index.json")
+    try:
+        cached = json.loads(sidecar.read_text())
+        if cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+            return [tuple(f) for f in cached["frames"]]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    t0 = time.monotonic()
+    raw = zst_frame_offsets(path)
+    index: list[tuple[int, int]] = []
+    decompressed = 0
+    with open(path, "rb") as fh:
+        for i, (offset, content_size) in enumerate(raw):
+            index.append((offset, decompressed))
+            if i + 1 == len(raw):
+                break
+            if content_size is None:
+                content_size = _zst_frame_size(fh, offset, raw[i + 1][0])
+            decompressed += content_size
+    log.info("Indexed %s: %d frame(s) in %.1fs.", path, len(index), time.monotonic() - t0)
+
+    try:
+        tmp = sidecar.with_name(sidecar.name + ".tmp")
+        tmp.write_text(json.dumps({"size": st.st_size, "mtime_ns": st.st_mtime_ns, "frames": index}))
+        tmp.replace(sidecar)
+    except OSError as exc:
+        log.warning("Could not write ZST index %s (%s) — it will be rebuilt next run.", sidecar, exc)
+    return index
+
+
+class ZstCursor:
+    """
+    Forward-only reader over an NDJSON .zst file that tracks its decompressed
+    byte `position`, so a caller can checkpoint it and reopen there later.
+    """
+
+    def __init__(self, path: str, position: int = 0, read_size: int = ZST_READ_SIZE) -> None:
+        index = load_zst_index(path)
+        frame_offset, frame_start = index[0] if index else (0, 0)
+        for offset, start in index:
+            if start > position:
+                break
+            frame_offset, frame_start = offset, start
+
+        self.path = path
+        self._fh = open(path, "rb")
+        self._fh.seek(frame_offset)
+        self._reader = zstd.ZstdDecompressor(max_window_size=2**31).stream_reader(
+            self._fh, read_across_frames=True, closefd=False,
+        )
+        # Decompress-and-discard up to the checkpoint; no line splitting or JSON.
+        skip = position - frame_start
+        while skip > 0:
+            chunk = self._reader.read(min(skip, read_size))
+            if not chunk:
+                break
+            skip -= len(chunk)
+        self.position = position - skip
+        self._lines = _split_lines(self._reader, read_size)
+
+    def take(self, n: int, extract) -> list[dict]:
+        """Return up to `n` records for which `extract(obj)` is not None."""
+        records: list[dict] = []
+        if n <= 0:
+            return records
+        for line in self._lines:
+            self.position += len(line) + 1
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = extract(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+            if record is None:
+                continue
+            records.append(record)
+            if len(records) >= n:
+                break
+        return records
+
+    def skip(self, n: int, extract) -> int:
+        """Advance past `n` valid records without keeping them; returns how many were skipped."""
+        skipped = 0
+        while skipped < n:
+            batch = len(self.take(min(n - skipped, 10_000), extract))
+            if not batch:
+                break
+            skipped += batch
+        return skipped
+
+    def close(self) -> None:
+        self._reader.close()
+        self._fh.close()
+
+
 # ─── Post extraction ──────────────────────────────────────────────────────────
 
 
@@ -179,6 +432,8 @@ def extract_post(obj: dict) -> dict | None:
         "url": url,
         "num_comments": _int(obj.get("num_comments")),
         "reconstructed_text": reconstructed,
+        "month_bucket": month_bucket(created),
+        "week_bucket": week_bucket(created),
     }
 
 
@@ -237,16 +492,30 @@ async def connect_db() -> asyncpg.Pool:
         log.error("DATABASE_URL is not set — cannot connect.")
         sys.exit(1)
     log.info("Connecting to database…")
-    pool = await asyncpg.create_pool(url, min_size=2, max_size=10, command_timeout=120)
+    pool = await asyncpg.create_pool(
+        url, min_size=2, max_size=10, command_timeout=120, init=register_vector_codec,
+    )
     log.info("Connected.")
     return pool
 
 
-async def ensure_schema(conn: asyncpg.Connection) -> None:
-    """Create missing tables and indexes without touching existing ones."""
+async def ensure_schema(conn: asyncpg.Connection, vector_indexes: bool = True) -> None:
+    """
+    Create missing tables and indexes without touching existing ones.
+    With vector_indexes=False the HNSW indexes are left for the caller to build.
+    """
     # Import here so EMBEDDING_BACKEND env var is already loaded from .env
     from repositories.embeddings import EMBEDDING_DIM  # noqa: PLC0415
 
+    # Time-bucket columns written by insert_posts (backfilled by migrate.sql).
+    try:
+        await conn.execute("""
+            ALTER TABLE posts ADD COLUMN IF NOT EXISTS month_bucket INTEGER;
+            ALTER TABLE posts ADD COLUMN IF NOT EXISTS week_bucket INTEGER;
+        """)
+    except asyncpg.exceptions.InsufficientPrivilegeError:
+        log.warning("Could not add posts.month_bucket/week_bucket (insufficient privileges) — run migrate.sql as table owner.")
+
     await conn.execute(f"""
         CREATE TABLE IF NOT EXISTS comment_embeddings (
             comment_id  TEXT PRIMARY KEY REFERENCES comments(id) ON DELETE CASCADE,
@@ -255,24 +524,122 @@ async def ensure_schema(conn: asyncpg.Connection) -> None:
         );
     """)
 
-    # HNSW indexes require table ownership — skip gracefully if we lack it.
-    for idx_sql in [
-        """
+    # Parking table for comments whose post is not loaded yet (--park-orphans).
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS orphan_comments (
+            id               TEXT PRIMARY KEY,
+            post_id          TEXT NOT NULL,
+            parent_id        TEXT,
+            parent_type      TEXT,
+            author           TEXT,
+            body             TEXT NOT NULL,
+            created_utc      TIMESTAMP NOT NULL,
+            score            INTEGER,
+            controversiality INTEGER,
+            parked_at        TIMESTAMP NOT NULL DEFAULT NOW()
+        );
+        CREATE INDEX IF NOT EXISTS orphan_comments_post_id_idx ON orphan_comments (post_id);
+    """)
+
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS post_comment_activity (
+            post_id     TEXT PRIMARY KEY REFERENCES posts(id) ON DELETE CASCADE,
+            hourly_cum  INTEGER[] NOT NULL
+        );
+    """)
+
+    # Vectors of already-embedded texts, reused for duplicates (--no-embedding-cache skips it).
+    # Untyped vector column: rows from other models/dims are keyed apart, never mixed.
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            content_hash BYTEA     NOT NULL,
+            model        TEXT      NOT NULL,
+            dim          INTEGER   NOT NULL,
+            embedding    vector    NOT NULL,
+            created_at   TIMESTAMP NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (content_hash, model)
+        );
+    """)
+
+    if vector_indexes:
+        await build_vector_indexes(conn)
+    log.info(
+        "Schema ensured (comment_embeddings + orphan_comments + post_comment_activity + "
+        "embedding_cache tables%s).",
+        ", HNSW indexes" if vector_indexes else "; HNSW indexes deferred",
+    )
+
+
+# HNSW vector indexes by name (same definitions as schema.sql).
+_VECTOR_INDEXES = {
+    "posts_embedding_hnsw": """
         CREATE INDEX IF NOT EXISTS posts_embedding_hnsw
             ON posts USING hnsw (embedding vector_cosine_ops)
-            WITH (m = 16, ef_construction = 64);
-        """,
-        """
+            WITH (m = 16, ef_construction = 64)
+    """,
+    "comment_embeddings_hnsw": """
         CREATE INDEX IF NOT EXISTS comment_embeddings_hnsw
             ON comment_embeddings USING hnsw (embedding vector_cosine_ops)
-            WITH (m = 16, ef_construction = 64);
-        """,
-    ]:
+            WITH (m = 16, ef_construction = 64)
+    """,
+}
+
+
+async def build_vector_indexes(conn: asyncpg.Connection, bulk: bool = False) -> None:
+    """
+    Create any missing HNSW indexes.
+
+    bulk=True is for building over an already-loaded table: the session gets
+    INDEX_BUILD_MAINTENANCE_WORK_MEM and INDEX_BUILD_PARALLEL_WORKERS (an HNSW
+    build is far faster when the graph fits in maintenance_work_mem), and each
+    index's build time and size are logged.
+    """
+    if bulk:
+        await conn.execute(
+            "SELECT set_config('maintenance_work_mem', $1, false), "
+            "set_config('max_parallel_maintenance_workers', $2, false)",
+            INDEX_BUILD_MAINTENANCE_WORK_MEM, str(INDEX_BUILD_PARALLEL_WORKERS),
+        )
+        log.info(
+            "Building HNSW indexes (maintenance_work_mem=%s, max_parallel_maintenance_workers=%d)…",
+            INDEX_BUILD_MAINTENANCE_WORK_MEM, INDEX_BUILD_PARALLEL_WORKERS,
+        )
+    try:
+        # HNSW indexes require table ownership — skip gracefully if we lack it.
+        for name, idx_sql in _VECTOR_INDEXES.items():
+            t0 = time.monotonic()
+            try:
+                await conn.execute(idx_sql)
+            except asyncpg.exceptions.InsufficientPrivilegeError:
+                log.warning("Skipping %s creation (insufficient privileges — run as table owner to create indexes).", name)
+                continue
+            if bulk:
+                size = await conn.fetchval(
+                    "SELECT pg_size_pretty(pg_relation_size(to_regclass($1)))", name,
+                )
+                log.info("Built %s in %.0fs (%s).", name, time.monotonic() - t0, size)
+    finally:
+        if bulk:
+            await conn.execute("RESET maintenance_work_mem; RESET max_parallel_maintenance_workers")
+
+
+async def drop_vector_indexes(conn: asyncpg.Connection) -> None:
+    """Drop the HNSW indexes so bulk embedding writes skip per-row graph inserts."""
+    for name in _VECTOR_INDEXES:
         try:
-            await conn.execute(idx_sql)
+            await conn.execute(f"DROP INDEX IF EXISTS {name}")
         except asyncpg.exceptions.InsufficientPrivilegeError:
-            log.warning("Skipping HNSW index creation (insufficient privileges — run as table owner to create indexes).")
-    log.info("Schema ensured (comment_embeddings table + HNSW indexes).")
+            log.warning("Could not drop %s (insufficient privileges) — writes will keep updating it.", name)
+
+
+_POST_COLUMNS = (
+    "id", "subreddit", "title", "body", "author", "created_utc", "score", "url",
+    "num_comments", "reconstructed_text", "month_bucket", "week_bucket",
+)
+_COMMENT_COLUMNS = (
+    "id", "post_id", "parent_id", "parent_type", "author", "body",
+    "created_utc", "score", "controversiality",
+)
 
 
 async def insert_posts(pool: asyncpg.Pool, posts: list[dict], dry_run: bool) -> int:
@@ -280,103 +647,358 @@ async def insert_posts(pool: asyncpg.Pool, posts: list[dict], dry_run: bool) ->
         return 0
     async with pool.acquire() as conn:
         await conn.executemany(
-            """
-            INSERT INTO posts
-                (id, subreddit, title, body, author, created_utc, score, url,
-                 num_comments, reconstructed_text)
-            VALUES ($1,$2,$3,$4,$5,$6,$7,$8,$9,$10)
+            f"""
+            INSERT INTO posts ({", ".join(_POST_COLUMNS)})
+            VALUES ($1,$2,$3,$4,$5,$6,$7,$8,$9,$10,$11,$12)
             ON CONFLICT (id) DO NOTHING
             """,
-            [
-                (
-                    p["id"], p["subreddit"], p["title"], p["body"], p["author"],
-                    p["created_utc"], p["score"], p["url"],
-                    p["num_comments"], p["reconstructed_text"],
-                )
-                for p in posts
-            ],
+            [tuple(p[c] for c in _POST_COLUMNS) for p in posts],
         )
     return len(posts)
 
 
-async def insert_comments(pool: asyncpg.Pool, comments: list[dict], dry_run: bool) -> int:
+# ─── Orphan comments ──────────────────────────────────────────────────────────
+#
+# A comment whose post is not in `posts` (common with --limit or per-subreddit
+# dumps) would violate comments.post_id's foreign key.  Batches are filtered
+# against the posts table up front so the rest of the batch still goes through
+# as one statement; orphans are counted and either dropped or parked in
+# orphan_comments (--park-orphans) for adopt_orphan_comments() to pick up once
+# their posts have been imported.
+
+_orphan_stats = {"dropped": 0, "parked": 0}
+
+# Posts that gained comments since activity stats were last updated; the comment
+# loaders add to it and run_import() hands it to update_activity_stats().
+_dirty_post_ids: set[str] = set()
+
+
+async def _park_orphans(conn: asyncpg.Connection, rows: list[tuple]) -> None:
+    await conn.executemany(
+        f"""
+        INSERT INTO orphan_comments ({", ".join(_COMMENT_COLUMNS)})
+        VALUES ($1,$2,$3,$4,$5,$6,$7,$8,$9)
+        ON CONFLICT (id) DO NOTHING
+        """,
+        rows,
+    )
+
+
+async def insert_comments(
+    pool: asyncpg.Pool,
+    comments: list[dict],
+    dry_run: bool,
+    park_orphans: bool = False,
+) -> int:
     if not comments or dry_run:
         return 0
-    rows = [
-        (
-            c["id"], c["post_id"], c["parent_id"], c["parent_type"],
-            c["author"], c["body"], c["created_utc"],
-            c["score"], c["controversiality"],
-        )
-        for c in comments
-    ]
     async with pool.acquire() as conn:
-        try:
-            await conn.executemany(
-                """
-                INSERT INTO comments
-                    (id, post_id, parent_id, parent_type, author, body,
-                     created_utc, score, controversiality)
-                VALUES ($1,$2,$3,$4,$5,$6,$7,$8,$9)
+        post_ids = list({c["post_id"] for c in comments})
+        known = {
+            r["id"]
+            for r in await conn.fetch("SELECT id FROM posts WHERE id = ANY($1::text[])", post_ids)
+        }
+        rows: list[tuple] = []
+        orphans: list[tuple] = []
+        for c in comments:
+            row = tuple(c[k] for k in _COMMENT_COLUMNS)
+            (rows if c["post_id"] in known else orphans).append(row)
+
+        inserted: list[asyncpg.Record] = []
+        if rows:
+            # One statement with RETURNING, so only posts that really gained a
+            # comment (not ones whose comments were already loaded) get marked dirty
+            inserted = await conn.fetch(
+                f"""
+                INSERT INTO comments ({", ".join(_COMMENT_COLUMNS)})
+                SELECT * FROM unnest(
+                    $1::text[], $2::text[], $3::text[], $4::text[], $5::text[],
+                    $6::text[], $7::timestamp[], $8::int[], $9::int[]
+                )
                 ON CONFLICT (id) DO NOTHING
+                RETURNING post_id
                 """,
-                rows,
+                *(list(col) for col in zip(*rows)),
+            )
+            _dirty_post_ids.update(r["post_id"] for r in inserted)
+        if orphans:
+            if park_orphans:
+                await _park_orphans(conn, orphans)
+                _orphan_stats["parked"] += len(orphans)
+            else:
+                _orphan_stats["dropped"] += len(orphans)
+    return len(inserted)
+
+
+async def adopt_orphan_comments(pool: asyncpg.Pool, dry_run: bool) -> int:
+    """Move parked orphans whose post now exists into `comments`. Returns rows adopted."""
+    if dry_run:
+        return 0
+    cols = ", ".join(_COMMENT_COLUMNS)
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(f"""
+            WITH adopted AS (
+                DELETE FROM orphan_comments o
+                WHERE EXISTS (SELECT 1 FROM posts p WHERE p.id = o.post_id)
+                RETURNING {cols}
+            ), inserted AS (
+                INSERT INTO comments ({cols})
+                SELECT {cols} FROM adopted
+                ON CONFLICT (id) DO NOTHING
+                RETURNING post_id
             )
-            return len(rows)
-        except asyncpg.exceptions.ForeignKeyViolationError:
-            # Some comments reference posts not yet loaded (e.g. when --limit is used).
-            # Fall back to row-by-row inserts, skipping orphaned comments.
-            inserted = 0
-            for row in rows:
-                try:
-                    await conn.execute(
-                        """
-                        INSERT INTO comments
-                            (id, post_id, parent_id, parent_type, author, body,
-                             created_utc, score, controversiality)
-                        VALUES ($1,$2,$3,$4,$5,$6,$7,$8,$9)
-                        ON CONFLICT (id) DO NOTHING
-                        """,
-                        *row,
-                    )
-                    inserted += 1
-                except asyncpg.exceptions.ForeignKeyViolationError:
-                    pass
-            return inserted
-
-
-async def update_activity_stats(pool: asyncpg.Pool, dry_run: bool) -> None:
+            SELECT post_id, COUNT(*) AS n FROM inserted GROUP BY post_id
+        """)
+    _dirty_post_ids.update(r["post_id"] for r in rows)
+    adopted = sum(r["n"] for r in rows)
+    if adopted:
+        log.info("Adopted %d previously orphaned comments.", adopted)
+    return adopted
+
+
+# ─── COPY-based bulk loader (--load-method copy) ──────────────────────────────
+#
+# Each batch is streamed with binary COPY into an UNLOGGED staging table and then
+# merged with one INSERT … SELECT … ON CONFLICT DO NOTHING.  TRUNCATE takes an
+# exclusive lock until commit, so concurrent loaders serialise instead of mixing
+# their staging rows.
+
+async def ensure_staging_tables(conn: asyncpg.Connection) -> None:
+    """Create the UNLOGGED staging tables used by the COPY loader."""
+    await conn.execute("""
+        CREATE UNLOGGED TABLE IF NOT EXISTS posts_staging (
+            id                 TEXT,
+            subreddit          TEXT,
+            title              TEXT,
+            body               TEXT,
+            author             TEXT,
+            created_utc        TIMESTAMP,
+            score              INTEGER,
+            url                TEXT,
+            num_comments       INTEGER,
+            reconstructed_text TEXT,
+            month_bucket       INTEGER,
+            week_bucket        INTEGER
+        );
+        CREATE UNLOGGED TABLE IF NOT EXISTS comments_staging (
+            id               TEXT,
+            post_id          TEXT,
+            parent_id        TEXT,
+            parent_type      TEXT,
+            author           TEXT,
+            body             TEXT,
+            created_utc      TIMESTAMP,
+            score            INTEGER,
+            controversiality INTEGER
+        );
+    """)
+
+
+def _rows_affected(status: str) -> int:
+    """Parse the row count from a command tag such as 'INSERT 0 4981'."""
+    try:
+        return int(status.rsplit(" ", 1)[-1])
+    except (ValueError, IndexError):
+        return 0
+
+
+async def copy_posts(pool: asyncpg.Pool, posts: list[dict], dry_run: bool) -> int:
+    """COPY a batch of posts into posts_staging and merge into posts. Returns rows inserted."""
+    if not posts or dry_run:
+        return 0
+    cols = ", ".join(_POST_COLUMNS)
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute("TRUNCATE posts_staging")
+            await conn.copy_records_to_table(
+                "posts_staging",
+                records=[tuple(p[c] for c in _POST_COLUMNS) for p in posts],
+                columns=_POST_COLUMNS,
+            )
+            status = await conn.execute(f"""
+                INSERT INTO posts ({cols})
+                SELECT {cols} FROM posts_staging
+                ON CONFLICT (id) DO NOTHING
+            """)
+    return _rows_affected(status)
+
+
+async def copy_comments(
+    pool: asyncpg.Pool,
+    comments: list[dict],
+    dry_run: bool,
+    park_orphans: bool = False,
+) -> int:
     """
-    Compute last_comment_utc, recent_comment_count, and activity_ratio for all posts
+    COPY a batch of comments into comments_staging and merge into comments.
+    Comments whose post is not loaded are excluded by a semi-join (and counted,
+    or parked with --park-orphans) rather than failing the merge on the foreign
+    key.  Returns rows inserted.
+    """
+    if not comments or dry_run:
+        return 0
+    cols = ", ".join(_COMMENT_COLUMNS)
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute("TRUNCATE comments_staging")
+            await conn.copy_records_to_table(
+                "comments_staging",
+                records=[tuple(c[k] for k in _COMMENT_COLUMNS) for c in comments],
+                columns=_COMMENT_COLUMNS,
+            )
+            inserted = await conn.fetch(f"""
+                WITH ins AS (
+                    INSERT INTO comments ({cols})
+                    SELECT {cols} FROM comments_staging s
+                    WHERE EXISTS (SELECT 1 FROM posts p WHERE p.id = s.post_id)
+                    ON CONFLICT (id) DO NOTHING
+                    RETURNING post_id
+                )
+                SELECT post_id, COUNT(*) AS n FROM ins GROUP BY post_id
+            """)
+            orphan_sql = f"""
+                SELECT {cols} FROM comments_staging s
+                WHERE NOT EXISTS (SELECT 1 FROM posts p WHERE p.id = s.post_id)
+            """
+            if park_orphans:
+                parked = _rows_affected(await conn.execute(f"""
+                    INSERT INTO orphan_comments ({cols})
+                    {orphan_sql}
+                    ON CONFLICT (id) DO NOTHING
+                """))
+                _orphan_stats["parked"] += parked
+            else:
+                _orphan_stats["dropped"] += await conn.fetchval(
+                    f"SELECT COUNT(*) FROM ({orphan_sql}) o"
+                )
+    _dirty_post_ids.update(r["post_id"] for r in inserted)
+    return sum(r["n"] for r in inserted)
+
+
+ACTIVITY_STATS_BATCH = 5_000     # post ids per incremental activity-stats UPDATE
+ACTIVITY_WINDOW_MAX_HOURS = 720  # longest window_hours the activity endpoints accept
+
+# Post age is measured to the start of the current day rather than NOW(), so a
+# post's stats only change when its comments do (or the date rolls over) and
+# rows whose values are unchanged can be skipped instead of rewritten.
+# Import runs only recompute posts that gained comments, so another post's
+# activity_ratio is as of the day it last got a new comment until a full pass
+# (--mode activity or --refresh-activity-all) moves it to the current date.
+_ACTIVITY_STATS_SQL = """
+    WITH agg AS (
+        SELECT
+            post_id,
+            COUNT(*)            AS cnt,
+            MAX(created_utc)    AS last_ts
+        FROM comments
+        {where}
+        GROUP BY post_id
+    ), fresh AS (
+        SELECT
+            agg.post_id,
+            agg.cnt,
+            agg.last_ts,
+            agg.cnt::float /
+                GREATEST(
+                    1.0,
+                    EXTRACT(EPOCH FROM (CURRENT_DATE - p.created_utc)) / 86400.0 / 30.0
+                ) AS ratio
+        FROM agg
+        JOIN posts p ON p.id = agg.post_id
+    )
+    UPDATE posts p
+    SET
+        last_comment_utc      = fresh.last_ts,
+        recent_comment_count  = fresh.cnt,
+        activity_ratio        = fresh.ratio
+    FROM fresh
+    WHERE p.id = fresh.post_id
+      AND (p.last_comment_utc, p.recent_comment_count, p.activity_ratio)
+          IS DISTINCT FROM (fresh.last_ts, fresh.cnt, fresh.ratio)
+"""
+
+
+# post_comment_activity.hourly_cum[h] = comments posted within h hours before the
+# post's last_comment_utc, for h = 1 … ACTIVITY_WINDOW_MAX_HOURS, so any window
+# is one array lookup.  The array stops at the oldest comment's hour (every
+# later entry would equal the last one); readers index it with
+# LEAST(window_hours, cardinality(hourly_cum)).
+_COMMENT_ACTIVITY_SQL = """
+    WITH hist AS (
+        SELECT
+            c.post_id,
+            LEAST(
+                GREATEST(CEIL(EXTRACT(EPOCH FROM (p.last_comment_utc - c.created_utc)) / 3600.0), 1),
+                {max_hours} + 1
+            )::int   AS hour,
+            COUNT(*) AS n
+        FROM comments c
+        JOIN posts p ON p.id = c.post_id
+        WHERE p.last_comment_utc IS NOT NULL
+          {where}
+        GROUP BY 1, 2
+    ), spans AS (
+        SELECT post_id, LEAST(MAX(hour), {max_hours}) AS len
+        FROM hist
+        GROUP BY post_id
+    ), cum AS (
+        SELECT
+            s.post_id,
+            g.h,
+            SUM(COALESCE(hist.n, 0)) OVER (PARTITION BY s.post_id ORDER BY g.h) AS cnt
+        FROM spans s
+        CROSS JOIN LATERAL generate_series(1, s.len) AS g(h)
+        LEFT JOIN hist ON hist.post_id = s.post_id AND hist.hour = g.h
+    )
+    INSERT INTO post_comment_activity (post_id, hourly_cum)
+    SELECT post_id, array_agg(cnt::int ORDER BY h)
+    FROM cum
+    GROUP BY post_id
+    ON CONFLICT (post_id) DO UPDATE
+        SET hourly_cum = EXCLUDED.hourly_cum
+        WHERE post_comment_activity.hourly_cum IS DISTINCT FROM EXCLUDED.hourly_cum
+"""
+
+
+async def update_activity_stats(
+    pool: asyncpg.Pool,
+    dry_run: bool,
+    post_ids: Iterable[str] | None = None,
+) -> None:
+    """
+    Compute last_comment_utc, recent_comment_count, and activity_ratio for posts
     that have comments. activity_ratio = comments per month since post creation.
+    Also refreshes their post_comment_activity window histogram.
+
+    With `post_ids`, only those posts are re-aggregated (through
+    comments_post_id_idx, ACTIVITY_STATS_BATCH ids per statement); otherwise
+    every post with comments is.  Rows whose stats are unchanged are not rewritten.
     """
     if dry_run:
         return
-    log.info("Updating activity stats (last_comment_utc, recent_comment_count, activity_ratio)…")
+    t0 = time.monotonic()
+    updated = 0
     async with pool.acquire() as conn:
-        updated = await conn.fetchval("""
-            WITH agg AS (
-                SELECT
-                    post_id,
-                    COUNT(*)            AS cnt,
-                    MAX(created_utc)    AS last_ts
-                FROM comments
-                GROUP BY post_id
+        if post_ids is None:
+            log.info("Updating activity stats for all posts (last_comment_utc, recent_comment_count, activity_ratio)…")
+            updated = _rows_affected(await conn.execute(_ACTIVITY_STATS_SQL.format(where="")))
+            await conn.execute(
+                _COMMENT_ACTIVITY_SQL.format(where="", max_hours=ACTIVITY_WINDOW_MAX_HOURS)
             )
-            UPDATE posts p
-            SET
-                last_comment_utc      = agg.last_ts,
-                recent_comment_count  = agg.cnt,
-                activity_ratio        = agg.cnt::float /
-                    GREATEST(
-                        1.0,
-                        EXTRACT(EPOCH FROM (NOW() - p.created_utc)) / 86400.0 / 30.0
-                    )
-            FROM agg
-            WHERE p.id = agg.post_id
-            RETURNING p.id
-        """)
-    log.info("Activity stats updated for %s posts.", updated if updated else "0")
+        else:
+            ids = sorted(set(post_ids))
+            if not ids:
+                return
+            log.info("Updating activity stats for %d posts with new comments…", len(ids))
+            sql = _ACTIVITY_STATS_SQL.format(where="WHERE post_id = ANY($1::text[])")
+            histogram_sql = _COMMENT_ACTIVITY_SQL.format(
+                where="AND c.post_id = ANY($1::text[])", max_hours=ACTIVITY_WINDOW_MAX_HOURS,
+            )
+            for i in range(0, len(ids), ACTIVITY_STATS_BATCH):
+                chunk = ids[i : i + ACTIVITY_STATS_BATCH]
+                updated += _rows_affected(await conn.execute(sql, chunk))
+                await conn.execute(histogram_sql, chunk)
+    log.info("Activity stats updated for %d posts in %.1fs.", updated, time.monotonic() - t0)
 
 
 # ─── Embedding helpers ────────────────────────────────────────────────────────
@@ -391,12 +1013,50 @@ def _check_embedding_backend() -> None:
             "Embedding backend: LOCAL  model=%s  dim=%d  (set EMBEDDING_BACKEND=openai to use OpenAI)",
             _LOCAL_MODEL_NAME, EMBEDDING_DIM,
         )
+    elif _BACKEND == "onnx":
+        from repositories.embeddings import _ONNX_QUANTIZE  # noqa: PLC0415
+
+        log.info(
+            "Embedding backend: ONNX  model=%s  dim=%d  int8=%s",
+            _LOCAL_MODEL_NAME, EMBEDDING_DIM, _ONNX_QUANTIZE,
+        )
     else:
         log.info("Embedding backend: OPENAI  model=text-embedding-3-small  dim=%d", EMBEDDING_DIM)
 
 
-def _to_pg_vector(embedding: list[float]) -> str:
-    return "[" + ",".join(map(str, embedding)) + "]"
+# ─── Embedding cache ──────────────────────────────────────────────────────────
+# Reddit dumps repeat a lot of text verbatim (crossposts, reposted titles, bot and
+# boilerplate comments). embedding_cache maps sha256(text) → vector per model, so a
+# text is encoded once and every later copy of it gets the stored vector.
+
+
+async def _lookup_cached_embeddings(pool: asyncpg.Pool, model_id: str, hashes: list[bytes]) -> dict:
+    """Return {content_hash: vector} for the hashes already in embedding_cache."""
+    from repositories.embeddings import EMBEDDING_DIM  # noqa: PLC0415
+
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            """
+            SELECT content_hash, embedding FROM embedding_cache
+            WHERE model = $1 AND dim = $2 AND content_hash = ANY($3::bytea[])
+            """,
+            model_id, EMBEDDING_DIM, hashes,
+        )
+    return {r["content_hash"]: r["embedding"] for r in rows}
+
+
+async def _cache_embeddings(pool: asyncpg.Pool, model_id: str, hashes: list[bytes], vecs: list) -> None:
+    from repositories.embeddings import EMBEDDING_DIM  # noqa: PLC0415
+
+    async with pool.acquire() as conn:
+        await conn.executemany(
+            """
+            INSERT INTO embedding_cache (content_hash, model, dim, embedding)
+            VALUES ($1, $2, $3, $4)
+            ON CONFLICT (content_hash, model) DO NOTHING
+            """,
+            [(h, model_id, EMBEDDING_DIM, v) for h, v in zip(hashes, vecs)],
+        )
 
 
 # ─── Generic embed-and-store helper ──────────────────────────────────────────
@@ -405,7 +1065,7 @@ def _to_pg_vector(embedding: list[float]) -> str:
 async def _embed_and_store(
     pool: asyncpg.Pool,
     label: str,
-    fetch_sql: str,
+    fetch_sql: str,     # keyset page: last two params are (last id, page size)
     fetch_params: list,
     text_field: str,
     id_field: str,
@@ -414,53 +1074,157 @@ async def _embed_and_store(
     batch_size: int,
     concurrency: int,
     dry_run: bool,
+    use_cache: bool = True,
 ) -> None:
-    from repositories.embeddings import embed_texts  # noqa: PLC0415
+    from repositories.embeddings import (  # noqa: PLC0415
+        content_hash,
+        embed_texts,
+        embedding_model_id,
+        estimate_tokens,
+        plan_embedding_batches,
+    )
 
     sem = asyncio.Semaphore(concurrency)
+    model_id = embedding_model_id()
     embedded = 0
+    cache_hits = 0      # rows whose text was already in embedding_cache
+    duplicates = 0      # rows sharing their text with another pending row in the same page
     t0 = time.monotonic()
+    # bucket label -> [texts, estimated tokens, seconds spent embedding]
+    bucket_stats: dict[str, list[float]] = {}
 
-    async def process_batch(rows: list) -> None:
+    async def store_groups(groups: list[list], vecs: list, detail: str) -> None:
+        """Store one vector per group of rows with identical text."""
         nonlocal embedded
-        ids = [r[id_field] for r in rows]
-        texts = [r[text_field] or "" for r in rows]
-        async with sem:
-            if dry_run:
-                await asyncio.sleep(0.02)
-                vecs = [[0.0] * 4 for _ in texts]  # placeholder in dry-run
-            else:
-                vecs = await embed_texts(texts)
+        ids = [r[id_field] for g in groups for r in g]
         if not dry_run:
-            await store_fn(pool, ids, vecs)
+            await store_fn(pool, ids, [v for g, v in zip(groups, vecs) for _ in g])
         embedded += len(ids)
         elapsed = time.monotonic() - t0
         rate = embedded / elapsed if elapsed > 0 else 0
         eta = (total - embedded) / rate if rate > 0 else float("inf")
-        log.info("%s embedded: %d / %d  (%.0f/s, ETA %.0fm)", label, embedded, total, rate, eta / 60)
+        log.info(
+            "%s embedded: %d / %d  (%.0f/s, ETA %.0fm)  [%s ×%d]",
+            label, embedded, total, rate, eta / 60, detail, len(ids),
+        )
 
-    offset = 0
+    async def process_batch(bucket: str, keys: list, groups: list[list]) -> None:
+        texts = [g[0][text_field] or "" for g in groups]
+        async with sem:
+            t_batch = time.monotonic()
+            if dry_run:
+                await asyncio.sleep(0.02)
+                vecs = [[0.0] * 4 for _ in texts]  # placeholder in dry-run
+            else:
+                vecs = await embed_texts(texts)
+            stats = bucket_stats.setdefault(bucket, [0, 0, 0.0])
+            stats[0] += len(texts)
+            stats[1] += sum(estimate_tokens(t) for t in texts)
+            stats[2] += time.monotonic() - t_batch
+        if use_cache and not dry_run:
+            await _cache_embeddings(pool, model_id, keys, vecs)
+        await store_groups(groups, vecs, bucket)
+
+    # Keyset pagination: rows drop out of the pending set as they are embedded,
+    # so OFFSET would skip rows; `id > last_id` visits each one exactly once and
+    # every page is an index range scan regardless of how far in we are.
+    # Each page is a wide window: rows with identical text are grouped (and served
+    # from embedding_cache when it already has their vector), then the remaining
+    # unique texts are regrouped by plan_embedding_batches() into length-homogeneous
+    # (or token-budgeted) batches.
+    window = max(EMBED_FETCH_WINDOW, batch_size)
+    last_id = ""
     tasks: list[asyncio.Task] = []
-    while offset < total:
+    while True:
         async with pool.acquire() as conn:
-            rows = await conn.fetch(fetch_sql, *fetch_params, batch_size, offset)
+            rows = await conn.fetch(fetch_sql, *fetch_params, last_id, window)
         if not rows:
             break
-        tasks.append(asyncio.create_task(process_batch(list(rows))))
-        offset += batch_size
-
-        if len(tasks) >= concurrency * 4:
-            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
-            for t in done:
-                await t
-            tasks = list(pending)
+        last_id = rows[-1][id_field]
+        groups: dict = {}
+        for r in rows:
+            key = content_hash(r[text_field] or "") if use_cache else r[id_field]
+            groups.setdefault(key, []).append(r)
+        cached = await _lookup_cached_embeddings(pool, model_id, list(groups)) if use_cache else {}
+        if cached:
+            hit_keys = [k for k in groups if k in cached]
+            cache_hits += sum(len(groups[k]) for k in hit_keys)
+            await store_groups([groups[k] for k in hit_keys], [cached[k] for k in hit_keys], "cache")
+
+        keys = [k for k in groups if k not in cached]
+        duplicates += sum(len(groups[k]) - 1 for k in keys)
+        texts = [groups[k][0][text_field] or "" for k in keys]
+        for bucket, idx in plan_embedding_batches(texts, batch_size):
+            batch_keys = [keys[i] for i in idx]
+            tasks.append(asyncio.create_task(
+                process_batch(bucket, batch_keys, [groups[k] for k in batch_keys])
+            ))
+
+            if len(tasks) >= concurrency * 4:
+                done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    await t
+                tasks = list(pending)
 
     if tasks:
         await asyncio.gather(*tasks)
 
+    for bucket, (n, tokens, secs) in sorted(bucket_stats.items(), key=lambda kv: kv[1][1] / kv[1][0]):
+        log.info(
+            "%s %-12s %8d texts  %10d est. tokens  %7.1f texts/s  %9.0f tokens/s (per worker)",
+            label, bucket, n, tokens, n / secs if secs else 0, tokens / secs if secs else 0,
+        )
+    if use_cache and embedded:
+        log.info(
+            "%s embedding cache: %d of %d rows reused (%.1f%% hit rate) — %d from embedding_cache, "
+            "%d duplicate texts in this run; %d texts encoded.",
+            label, cache_hits + duplicates, embedded, 100 * (cache_hits + duplicates) / embedded,
+            cache_hits, duplicates, embedded - cache_hits - duplicates,
+        )
     log.info("Done. %s embedded total: %d", label, embedded)
 
 
+# ─── Set-based embedding writes (--embed-write-method copy) ───────────────────
+
+
+async def _copy_embeddings(pool: asyncpg.Pool, ids: list, vecs: list, apply_sql: str) -> None:
+    """
+    Binary-COPY (id, embedding) pairs into a per-connection temp table, then
+    apply them with one set-based statement instead of a statement per row.
+    """
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS embedding_staging (
+                    id        TEXT,
+                    embedding vector
+                ) ON COMMIT DELETE ROWS
+            """)
+            await conn.copy_records_to_table(
+                "embedding_staging",
+                records=list(zip(ids, vecs)),
+                columns=("id", "embedding"),
+            )
+            await conn.execute(apply_sql)
+
+
+async def _copy_post_embeddings(pool: asyncpg.Pool, ids: list, vecs: list) -> None:
+    await _copy_embeddings(pool, ids, vecs, """
+        UPDATE posts p
+        SET embedding = s.embedding, embedded_at = NOW()
+        FROM embedding_staging s
+        WHERE p.id = s.id
+    """)
+
+
+async def _copy_comment_embeddings(pool: asyncpg.Pool, ids: list, vecs: list) -> None:
+    await _copy_embeddings(pool, ids, vecs, """
+        INSERT INTO comment_embeddings (comment_id, embedding, embedded_at)
+        SELECT id, embedding, NOW() FROM embedding_staging
+        ON CONFLICT (comment_id) DO NOTHING
+    """)
+
+
 # ─── Embed posts ──────────────────────────────────────────────────────────────
 
 
@@ -468,11 +1232,18 @@ async def _store_post_embeddings(pool: asyncpg.Pool, ids: list, vecs: list) -> N
     async with pool.acquire() as conn:
         await conn.executemany(
             "UPDATE posts SET embedding = $2::vector, embedded_at = NOW() WHERE id = $1",
-            [(_id, _to_pg_vector(v)) for _id, v in zip(ids, vecs)],
+            list(zip(ids, vecs)),
         )
 
 
-async def embed_posts(pool: asyncpg.Pool, batch_size: int, concurrency: int, dry_run: bool) -> None:
+async def embed_posts(
+    pool: asyncpg.Pool,
+    batch_size: int,
+    concurrency: int,
+    dry_run: bool,
+    write_method: str = "update",
+    use_cache: bool = True,
+) -> None:
     """Fetch unembedded posts, generate embeddings, store in posts.embedding."""
     async with pool.acquire() as conn:
         total = await conn.fetchval("SELECT COUNT(*) FROM posts WHERE embedding IS NULL")
@@ -485,16 +1256,17 @@ async def embed_posts(pool: asyncpg.Pool, batch_size: int, concurrency: int, dry
         label="Posts",
         fetch_sql="""
             SELECT id, COALESCE(reconstructed_text, title) AS reconstructed_text
-            FROM posts WHERE embedding IS NULL ORDER BY id LIMIT $1 OFFSET $2
+            FROM posts WHERE embedding IS NULL AND id > $1 ORDER BY id LIMIT $2
         """,
         fetch_params=[],
         text_field="reconstructed_text",
         id_field="id",
-        store_fn=_store_post_embeddings,
+        store_fn=_copy_post_embeddings if write_method == "copy" else _store_post_embeddings,
         total=total,
         batch_size=batch_size,
         concurrency=concurrency,
         dry_run=dry_run,
+        use_cache=use_cache,
     )
 
 
@@ -509,11 +1281,18 @@ async def _store_comment_embeddings(pool: asyncpg.Pool, ids: list, vecs: list) -
             VALUES ($1, $2::vector, NOW())
             ON CONFLICT (comment_id) DO NOTHING
             """,
-            [(_id, _to_pg_vector(v)) for _id, v in zip(ids, vecs)],
+            list(zip(ids, vecs)),
         )
 
 
-async def embed_comments(pool: asyncpg.Pool, batch_size: int, concurrency: int, dry_run: bool) -> None:
+async def embed_comments(
+    pool: asyncpg.Pool,
+    batch_size: int,
+    concurrency: int,
+    dry_run: bool,
+    write_method: str = "update",
+    use_cache: bool = True,
+) -> None:
     """Embed substantive comments and store in comment_embeddings."""
     async with pool.acquire() as conn:
         total = await conn.fetchval(
@@ -541,82 +1320,116 @@ async def embed_comments(pool: asyncpg.Pool, batch_size: int, concurrency: int,
             WHERE LENGTH(c.body) >= $1
               AND c.body NOT IN ('[deleted]', '[removed]')
               AND NOT EXISTS (SELECT 1 FROM comment_embeddings ce WHERE ce.comment_id = c.id)
-            ORDER BY c.id LIMIT $2 OFFSET $3
+              AND c.id > $2
+            ORDER BY c.id LIMIT $3
         """,
         fetch_params=[MIN_COMMENT_BODY_LEN],
         text_field="body",
         id_field="id",
-        store_fn=_store_comment_embeddings,
+        store_fn=_copy_comment_embeddings if write_method == "copy" else _store_comment_embeddings,
         total=total,
         batch_size=batch_size,
         concurrency=concurrency,
         dry_run=dry_run,
+        use_cache=use_cache,
     )
 
 
 # ─── Import stage ─────────────────────────────────────────────────────────────
 
 
+async def _import_file(
+    pool: asyncpg.Pool,
+    label: str,
+    path: str,
+    extract,            # callable(obj) -> dict | None
+    load,               # async callable(pool, records, dry_run) -> int
+    batch_size: int,
+    limit: int | None,
+    dry_run: bool,
+) -> None:
+    log.info("Importing %s from %s…", label.lower(), path)
+    batch: list[dict] = []
+    total_inserted = 0
+    total_loaded = 0
+    total_skipped = 0
+    t0 = time.monotonic()
+
+    for obj in iter_zst(path, limit=limit):
+        record = extract(obj)
+        if record is None:
+            total_skipped += 1
+            continue
+        batch.append(record)
+        if len(batch) >= batch_size:
+            total_inserted += await load(pool, batch, dry_run)
+            total_loaded += len(batch)
+            batch.clear()
+            elapsed = time.monotonic() - t0
+            log.info(
+                "%s inserted: %d  (skipped: %d, %.0fs, %.0f rows/s)",
+                label, total_inserted, total_skipped, elapsed, total_loaded / elapsed,
+            )
+
+    if batch:
+        total_inserted += await load(pool, batch, dry_run)
+        total_loaded += len(batch)
+    elapsed = time.monotonic() - t0
+    log.info(
+        "%s import complete: %d inserted, %d skipped in %.0fs (%.0f rows/s, dry_run=%s).",
+        label, total_inserted, total_skipped, elapsed,
+        total_loaded / elapsed if elapsed > 0 else 0, dry_run,
+    )
+
+
 async def run_import(args: argparse.Namespace, pool: asyncpg.Pool) -> None:
     if not args.submissions and not args.comments:
         log.error("--mode import requires at least one of --submissions or --comments.")
         sys.exit(1)
 
+    if args.load_method == "copy":
+        load_posts, load_comments, batch_size = copy_posts, copy_comments, COPY_BATCH
+        if not args.dry_run:
+            async with pool.acquire() as conn:
+                await ensure_staging_tables(conn)
+    else:
+        load_posts, load_comments, batch_size = insert_posts, insert_comments, DB_INSERT_BATCH
+    load_comments = functools.partial(load_comments, park_orphans=args.park_orphans)
+
+    import_file = _import_file
+    if args.workers > 0:
+        from ingest_pipeline import import_file_pipelined  # noqa: PLC0415
+
+        import_file = functools.partial(
+            import_file_pipelined, workers=args.workers, read_size=ZST_READ_SIZE,
+        )
+
     if args.submissions:
-        log.info("Importing posts from %s…", args.submissions)
-        batch: list[dict] = []
-        total_inserted = 0
-        total_skipped = 0
-        t0 = time.monotonic()
-
-        for obj in iter_zst(args.submissions, limit=args.limit):
-            post = extract_post(obj)
-            if post is None:
-                total_skipped += 1
-                continue
-            batch.append(post)
-            if len(batch) >= DB_INSERT_BATCH:
-                total_inserted += await insert_posts(pool, batch, args.dry_run)
-                batch.clear()
-                elapsed = time.monotonic() - t0
-                log.info("Posts inserted: %d  (skipped: %d, %.0fs)", total_inserted, total_skipped, elapsed)
-
-        if batch:
-            total_inserted += await insert_posts(pool, batch, args.dry_run)
-        log.info(
-            "Posts import complete: %d inserted, %d skipped (dry_run=%s).",
-            total_inserted, total_skipped, args.dry_run,
+        await import_file(
+            pool, "Posts", args.submissions, extract_post, load_posts,
+            batch_size, args.limit, args.dry_run,
         )
+        if args.park_orphans:
+            await adopt_orphan_comments(pool, args.dry_run)
 
     if args.comments:
-        log.info("Importing comments from %s…", args.comments)
-        batch = []
-        total_inserted = 0
-        total_skipped = 0
-        t0 = time.monotonic()
-
-        for obj in iter_zst(args.comments, limit=args.limit):
-            comment = extract_comment(obj)
-            if comment is None:
-                total_skipped += 1
-                continue
-            batch.append(comment)
-            if len(batch) >= DB_INSERT_BATCH:
-                total_inserted += await insert_comments(pool, batch, args.dry_run)
-                batch.clear()
-                elapsed = time.monotonic() - t0
-                log.info("Comments inserted: %d  (skipped: %d, %.0fs)", total_inserted, total_skipped, elapsed)
-
-        if batch:
-            total_inserted += await insert_comments(pool, batch, args.dry_run)
+        await import_file(
+            pool, "Comments", args.comments, extract_comment, load_comments,
+            batch_size, args.limit, args.dry_run,
+        )
         log.info(
-            "Comments import complete: %d inserted, %d skipped (dry_run=%s).",
-            total_inserted, total_skipped, args.dry_run,
+            "Orphan comments (post not loaded): %d dropped, %d parked in orphan_comments.",
+            _orphan_stats["dropped"], _orphan_stats["parked"],
         )
 
-    # Recompute activity stats after loading comments
-    if args.comments:
+    # Recompute activity stats for posts that gained comments (loaded or adopted),
+    # or for every post with --refresh-activity-all
+    if args.refresh_activity_all:
         await update_activity_stats(pool, args.dry_run)
+        _dirty_post_ids.clear()
+    elif _dirty_post_ids:
+        await update_activity_stats(pool, args.dry_run, post_ids=_dirty_post_ids)
+        _dirty_post_ids.clear()
 
 
 # ─── Embed stage ──────────────────────────────────────────────────────────────
@@ -624,10 +1437,27 @@ async def run_import(args: argparse.Namespace, pool: asyncpg.Pool) -> None:
 
 async def run_embed(args: argparse.Namespace, pool: asyncpg.Pool) -> None:
     _check_embedding_backend()
-    if not args.skip_post_embeddings:
-        await embed_posts(pool, args.embed_batch_size, args.embed_concurrency, args.dry_run)
-    if not args.skip_comment_embeddings:
-        await embed_comments(pool, args.embed_batch_size, args.embed_concurrency, args.dry_run)
+    # --defer-indexes builds once at the very end of main() instead
+    rebuild = args.rebuild_indexes and not args.defer_indexes and not args.dry_run
+    if rebuild:
+        log.info("Dropping HNSW indexes for the backfill (rebuilt when the embed stage ends)…")
+        async with pool.acquire() as conn:
+            await drop_vector_indexes(conn)
+    try:
+        if not args.skip_post_embeddings:
+            await embed_posts(
+                pool, args.embed_batch_size, args.embed_concurrency, args.dry_run,
+                args.embed_write_method, use_cache=not args.no_embedding_cache,
+            )
+        if not args.skip_comment_embeddings:
+            await embed_comments(
+                pool, args.embed_batch_size, args.embed_concurrency, args.dry_run,
+                args.embed_write_method, use_cache=not args.no_embedding_cache,
+            )
+    finally:
+        if rebuild:
+            async with pool.acquire() as conn:
+                await build_vector_indexes(conn, bulk=True)
 
 
 # ─── Entry point ──────────────────────────────────────────────────────────────
@@ -643,9 +1473,48 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--comments", metavar="PATH", help="Path to comments .zst file")
     p.add_argument(
         "--mode",
-        choices=["import", "embed", "all"],
+        choices=["import", "embed", "all", "activity"],
         default="all",
-        help="Pipeline stage to run (default: all)",
+        help=(
+            "Pipeline stage to run (default: all). 'activity' only recomputes activity stats "
+            "for every post, so activity_ratio reflects the current date"
+        ),
+    )
+    p.add_argument(
+        "--load-method",
+        choices=["insert", "copy"],
+        default="insert",
+        help=(
+            "How the import stage writes rows: 'insert' = batched INSERT … ON CONFLICT "
+            f"({DB_INSERT_BATCH} rows), 'copy' = binary COPY into an unlogged staging table "
+            f"then one merge per {COPY_BATCH} rows (much faster for large dumps). Default: insert"
+        ),
+    )
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        metavar="N",
+        help=(
+            "Decompress and parse in separate processes (1 decoder + N parsers) feeding the DB "
+            "writer through bounded queues; 0 = parse inline (default: 0)"
+        ),
+    )
+    p.add_argument(
+        "--park-orphans",
+        action="store_true",
+        help=(
+            "Keep comments whose post is not loaded in orphan_comments instead of dropping them; "
+            "they are moved into comments on a later run once their posts are imported"
+        ),
+    )
+    p.add_argument(
+        "--refresh-activity-all",
+        action="store_true",
+        help=(
+            "After import, recompute activity stats for every post instead of only posts that "
+            "gained comments (activity_ratio depends on post age, so it goes stale otherwise)"
+        ),
     )
     p.add_argument(
         "--limit",
@@ -659,14 +1528,55 @@ def parse_args() -> argparse.Namespace:
         type=int,
         default=EMBED_BATCH_SIZE,
         metavar="N",
-        help=f"Texts per OpenAI embedding call (default: {EMBED_BATCH_SIZE})",
+        help=(
+            f"Texts per embedding batch for the local/onnx backends (default: {EMBED_BATCH_SIZE}); "
+            "OpenAI requests are sized by OPENAI_EMBED_BATCH_TOKENS instead"
+        ),
     )
     p.add_argument(
         "--embed-concurrency",
         type=int,
         default=EMBED_CONCURRENCY,
         metavar="N",
-        help=f"Concurrent OpenAI embedding calls (default: {EMBED_CONCURRENCY})",
+        help=(
+            f"Concurrent embedding batches (default: {EMBED_CONCURRENCY}). OpenAI requests are "
+            "additionally paced by OPENAI_RPM_LIMIT / OPENAI_TPM_LIMIT"
+        ),
+    )
+    p.add_argument(
+        "--embed-write-method",
+        choices=["update", "copy"],
+        default="update",
+        help=(
+            "How the embed stage stores vectors: 'update' = one UPDATE/INSERT per row, "
+            "'copy' = binary COPY into a temp table then one set-based UPDATE … FROM / "
+            "INSERT … SELECT per batch. Default: update"
+        ),
+    )
+    p.add_argument(
+        "--no-embedding-cache",
+        action="store_true",
+        help=(
+            "Encode every row even if the same text was embedded before; by default identical "
+            "texts reuse the vector stored in embedding_cache"
+        ),
+    )
+    p.add_argument(
+        "--rebuild-indexes",
+        action="store_true",
+        help=(
+            "Drop the HNSW indexes before the embed stage and rebuild them once it finishes "
+            "(for very large backfills; vector search is slow until the rebuild completes)"
+        ),
+    )
+    p.add_argument(
+        "--defer-indexes",
+        action="store_true",
+        help=(
+            "Skip (and drop, if present) the HNSW indexes for the whole run and build them once "
+            "after import and embed, with INDEX_BUILD_MAINTENANCE_WORK_MEM / "
+            "INDEX_BUILD_PARALLEL_WORKERS. Use for bulk loads into a fresh or offline database"
+        ),
     )
     p.add_argument(
         "--skip-post-embeddings",
@@ -694,15 +1604,28 @@ async def main() -> None:
 
     pool = await connect_db()
 
+    defer = args.defer_indexes and not args.dry_run
     try:
         async with pool.acquire() as conn:
-            await ensure_schema(conn)
+            await ensure_schema(conn, vector_indexes=not defer)
+            if defer:
+                log.info("Deferring HNSW indexes until import and embed finish…")
+                await drop_vector_indexes(conn)
 
-        if args.mode in ("import", "all"):
-            await run_import(args, pool)
-
-        if args.mode in ("embed", "all"):
-            await run_embed(args, pool)
+        try:
+            if args.mode in ("import", "all"):
+                await run_import(args, pool)
+
+            if args.mode in ("embed", "all"):
+                await run_embed(args, pool)
+
+            if args.mode == "activity":
+                await update_activity_stats(pool, args.dry_run)
+        finally:
+            # Build even after a failure so search isn't left without its indexes
+            if defer:
+                async with pool.acquire() as conn:
+                    await build_vector_indexes(conn, bulk=True)
     finally:
         await pool.close()
 
@@ -65,7 +65,9 @@ async def main():
         await insert_comments(pool, matching_comments, dry_run=False)
         log.info("Comments inserted.")
 
-        await update_activity_stats(pool, dry_run=False)
+        await update_activity_stats(
+            pool, dry_run=False, post_ids={c["post_id"] for c in matching_comments},
+        )
 
     if args.mode in ("embed", "all"):
         from ingest import EMBED_BATCH_SIZE, EMBED_CONCURRENCY, _check_embedding_backend
@@ -0,0 +1,255 @@
+"""
+Pipelined ZST importer used by `ingest.py --workers N`.
+
+    decompressor process ──line blocks──▶ N parser processes ──records──▶ asyncio writer
+      (zstd → newline-aligned blocks)     (JSON + extract_post/comment)    (insert/copy batches)
+
+The inline importer decompresses, parses and writes on one core, and never
+parses while a DB write is in flight.  Here each stage runs concurrently and
+both hand-offs are bounded multiprocessing queues, so a slow stage applies
+back-pressure instead of buffering the file in memory.
+
+Queue depths are logged with every batch:
+  blocks queue full, records queue empty  → parsers are the bottleneck (add --workers)
+  records queue full                      → the DB writer is the bottleneck
+  both near empty                         → decompression is the bottleneck
+
+Parsers use orjson when it is installed (pip install orjson), json otherwise.
+
+A child that fails sends a _WorkerError (with its traceback) ahead of its
+sentinel; the writer re-raises it, and also fails if any child exits non-zero,
+so a broken worker fails the import instead of silently truncating it.
+
+--limit counts decoded JSON objects, as iter_zst does for the inline importer,
+and is applied by the writer.  Parsers finish blocks out of order, so the same
+number of objects is imported but not necessarily the first N in the file.
+"""
+
+import asyncio
+import logging
+import multiprocessing as mp
+import queue
+import time
+import traceback
+
+import asyncpg
+import zstandard as zstd
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # optional speed-up
+    import json
+
+    _loads = json.loads
+
+log = logging.getLogger("ingest")
+
+BLOCK_BYTES = 4 * 1024 * 1024   # decompressed bytes per block handed to a parser
+READ_SIZE = 1 << 20             # decompressed bytes per zstd read (ingest.ZST_READ_SIZE)
+QUEUE_BLOCKS_PER_WORKER = 4     # bound on each queue, per parser process
+JOIN_TIMEOUT = 30.0             # seconds to wait for children to exit after a clean run
+
+
+class _WorkerError:
+    """Queue item a child sends before its sentinel when it fails."""
+
+    def __init__(self, stage: str, details: str):
+        self.stage = stage
+        self.details = details
+
+
+# ─── Stage 1: decompressor ────────────────────────────────────────────────────
+
+
+def _decompress_blocks(
+    path: str,
+    block_queue,
+    n_workers: int,
+    read_size: int,
+) -> None:
+    """Decode `path` into newline-aligned blocks of ~BLOCK_BYTES; one sentinel per parser."""
+    dctx = zstd.ZstdDecompressor(max_window_size=2**31)
+    pending = bytearray()
+    last_nl = -1  # index of the last newline in `pending`
+
+    try:
+        with open(path, "rb") as fh:
+            with dctx.stream_reader(fh) as reader:
+                while True:
+                    chunk = reader.read(read_size)
+                    if not chunk:
+                        break
+                    # Only scan the new chunk for a newline, never the whole buffer
+                    idx = chunk.rfind(b"\n")
+                    if idx >= 0:
+                        last_nl = len(pending) + idx
+                    pending += chunk
+                    if len(pending) < BLOCK_BYTES or last_nl < 0:
+                        continue
+                    block = bytes(pending[: last_nl + 1])
+                    del pending[: last_nl + 1]
+                    last_nl = -1
+                    block_queue.put(block)
+        if pending.strip():
+            block_queue.put(bytes(pending) + b"\n")
+    except BaseException:
+        block_queue.put(_WorkerError("decompressor", traceback.format_exc()))
+        raise
+    finally:
+        for _ in range(n_workers):
+            block_queue.put(None)
+
+
+# ─── Stage 2: parsers ─────────────────────────────────────────────────────────
+
+
+def _parse_blocks(extract, block_queue, record_queue) -> None:
+    """
+    Parse blocks until the sentinel arrives.  Each block becomes a list with one
+    entry per decoded JSON object: the extracted record, or None when extract()
+    skipped it — the writer needs both to count objects the way iter_zst does.
+    """
+    try:
+        while True:
+            block = block_queue.get()
+            if block is None:
+                break
+            if isinstance(block, _WorkerError):
+                record_queue.put(block)  # forward the decompressor's failure
+                continue
+            results: list[dict | None] = []
+            for line in block.split(b"\n"):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    obj = _loads(line)
+                except ValueError:  # json.JSONDecodeError and orjson.JSONDecodeError
+                    continue
+                results.append(extract(obj))
+            record_queue.put(results)
+    except BaseException:
+        record_queue.put(_WorkerError("parser", traceback.format_exc()))
+        raise
+    finally:
+        record_queue.put(None)
+
+
+# ─── Stage 3: asyncio writer ──────────────────────────────────────────────────
+
+
+def _qsize(q) -> str:
+    try:
+        return str(q.qsize())
+    except NotImplementedError:  # macOS
+        return "?"
+
+
+def _next_item(record_queue, procs: list):
+    """Blocking get that fails instead of hanging if every child died without a sentinel."""
+    while True:
+        try:
+            return record_queue.get(timeout=1.0)
+        except queue.Empty:
+            if not any(p.is_alive() for p in procs):
+                raise RuntimeError("ingest pipeline processes exited unexpectedly")
+
+
+async def import_file_pipelined(
+    pool: asyncpg.Pool,
+    label: str,
+    path: str,
+    extract,            # callable(obj) -> dict | None; must be a module-level function
+    load,               # async callable(pool, records, dry_run) -> int
+    batch_size: int,
+    limit: int | None,
+    dry_run: bool,
+    workers: int,
+    read_size: int = READ_SIZE,
+) -> None:
+    """Same contract as ingest._import_file, with decode and parse in other processes."""
+    log.info("Importing %s from %s (pipelined, %d parser processes)…", label.lower(), path, workers)
+    ctx = mp.get_context("spawn")
+    depth = QUEUE_BLOCKS_PER_WORKER * workers
+    block_queue = ctx.Queue(maxsize=depth)
+    record_queue = ctx.Queue(maxsize=depth)
+
+    procs = [ctx.Process(target=_decompress_blocks, args=(path, block_queue, workers, read_size), daemon=True)]
+    procs += [
+        ctx.Process(target=_parse_blocks, args=(extract, block_queue, record_queue), daemon=True)
+        for _ in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+
+    batch: list[dict] = []
+    total_inserted = 0
+    total_loaded = 0
+    total_skipped = 0
+    parsed = 0  # decoded JSON objects consumed, the unit --limit counts in
+    finished = 0
+    t0 = time.monotonic()
+
+    completed = False
+    limit_reached = False
+
+    async def flush(records: list[dict]) -> None:
+        nonlocal total_inserted, total_loaded
+        total_inserted += await load(pool, records, dry_run)
+        total_loaded += len(records)
+
+    try:
+        while finished < workers:
+            item = await asyncio.to_thread(_next_item, record_queue, procs)
+            if item is None:
+                finished += 1
+                continue
+            if isinstance(item, _WorkerError):
+                raise RuntimeError(f"ingest {item.stage} process failed:\n{item.details}")
+            if limit:
+                item = item[: limit - parsed]
+            parsed += len(item)
+            for record in item:
+                if record is None:
+                    total_skipped += 1
+                else:
+                    batch.append(record)
+            while len(batch) >= batch_size:
+                await flush(batch[:batch_size])
+                del batch[:batch_size]
+                elapsed = time.monotonic() - t0
+                log.info(
+                    "%s inserted: %d  (skipped: %d, %.0fs, %.0f rows/s)  queues: blocks=%s/%d records=%s/%d",
+                    label, total_inserted, total_skipped, elapsed, total_loaded / elapsed,
+                    _qsize(block_queue), depth, _qsize(record_queue), depth,
+                )
+            if limit and parsed >= limit:
+                # The workers are still decoding the rest of the file; stop them below
+                limit_reached = True
+                break
+        if batch:
+            await flush(batch)
+        completed = True
+    finally:
+        for proc in procs:
+            if completed and not limit_reached:
+                await asyncio.to_thread(proc.join, JOIN_TIMEOUT)
+            if proc.is_alive():
+                proc.terminate()
+            proc.join()
+
+    failed = [proc for proc in procs if proc.exitcode != 0 and not limit_reached]
+    if failed:
+        raise RuntimeError(
+            "ingest pipeline processes exited abnormally: "
+            + ", ".join(f"{proc.name} (exit code {proc.exitcode})" for proc in failed)
+        )
+
+    elapsed = time.monotonic() - t0
+    log.info(
+        "%s import complete: %d inserted, %d skipped in %.0fs (%.0f rows/s, dry_run=%s).",
+        label, total_inserted, total_skipped, elapsed,
+        total_loaded / elapsed if elapsed > 0 else 0, dry_run,
+    )
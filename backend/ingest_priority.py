@@ -31,6 +31,12 @@ State file
   backend/ingest_state.json  — written atomically after every subreddit.
   Delete it or use --reset to restart from the beginning.
 
+  Besides the count of posts taken per subreddit ("offsets"), the state keeps a
+  decompressed byte checkpoint per file ("positions").  A restart reopens each
+  file at its checkpoint via a `<file>.zst.index.json` frame index (built once
+  per dump) instead of re-parsing every earlier record, and with --loop the
+  open cursors carry over between rounds so nothing is re-read at all.
+
 Logs
 ----
   logs/ingest_priority.log  — combined log (appended across runs)
@@ -104,7 +110,7 @@ def load_state() -> dict:
             return s
         except (json.JSONDecodeError, KeyError):
             log.warning("State file corrupt — starting fresh.")
-    return {"round": 1, "subreddit_index": 0, "offsets": {}}
+    return {"round": 1, "subreddit_index": 0, "offsets": {}, "positions": {}}
 
 
 def save_state(state: dict) -> None:
@@ -116,21 +122,59 @@ def save_state(state: dict) -> None:
 
 # ─── Per-subreddit ingestion ──────────────────────────────────────────────────
 
+# Open ZstCursor per subreddit, kept across rounds within one process.
+_cursors: dict = {}
+
+
+def _close_cursor(sub: str) -> None:
+    cursor = _cursors.pop(sub, None)
+    if cursor is not None:
+        cursor.close()
+
+
+def _open_cursor(sub: str, path: Path, offset: int, position: int | None):
+    """
+    Return a cursor positioned after the first `offset` valid posts of `path`.
+
+    Reuses the cursor left open by the previous round when it is still at the
+    checkpoint; otherwise reopens at the saved byte `position`.  State files
+    written before positions were tracked fall back to one last skip-by-count.
+    """
+    from ingest import ZstCursor, extract_post  # noqa: PLC0415
+
+    cursor = _cursors.get(sub)
+    if cursor is not None and position is not None and cursor.position == position:
+        return cursor
+    _close_cursor(sub)
+
+    if position is not None:
+        cursor = ZstCursor(str(path), position)
+    else:
+        cursor = ZstCursor(str(path))
+        if offset:
+            log.info("r/%s — no byte checkpoint yet, skipping %d posts once.", sub, offset)
+            cursor.skip(offset, extract_post)
+    _cursors[sub] = cursor
+    return cursor
+
 
 async def ingest_subreddit(
     sub: str,
     pool,
     posts_per_sub: int,
     offset: int,
+    position: int | None,
     round_num: int,
     dry_run: bool,
-) -> int:
+) -> tuple[int, int | None]:
     """
     Stream the next `posts_per_sub` valid posts from the submissions ZST file,
-    starting at `offset` (count of valid records already processed).
+    starting at `offset` (count of valid records already processed), which sits
+    at decompressed byte `position` when that checkpoint is known.
 
     Inserts them into the DB, then embeds any unembedded posts via OpenAI.
-    Returns the new offset.  Returns the same offset if the file is exhausted.
+    Returns the new (offset, position).  The offset is unchanged if the file
+    is exhausted.
     """
     from ingest import (  # noqa: PLC0415
         EMBED_BATCH_SIZE,
@@ -140,14 +184,13 @@ async def ingest_subreddit(
         embed_posts,
         extract_post,
         insert_posts,
-        iter_zst,
     )
 
     submissions_file = ZST_DIR / f"{sub}_submissions.zst"
 
     if not submissions_file.exists():
         log.warning("r/%s — %s not found, skipping.", sub, submissions_file.name)
-        return offset
+        return offset, position
 
     # Per-subreddit detail log
     sub_log = LOG_DIR / f"{sub}_r{round_num}.log"
@@ -161,29 +204,24 @@ async def ingest_subreddit(
     t0 = time.monotonic()
     log.info("── r/%s  round=%d  offset=%d ──", sub, round_num, offset)
 
-    # Stream: skip `offset` valid records, collect the next `posts_per_sub`
-    posts: list[dict] = []
-    seen = 0
-    for obj in iter_zst(str(submissions_file)):
-        p = extract_post(obj)
-        if p is None:
-            continue
-        if seen < offset:
-            seen += 1
-            continue
-        posts.append(p)
-        seen += 1
-        if len(posts) >= posts_per_sub:
-            break
+    # Stream the next `posts_per_sub` valid records from the checkpoint
+    try:
+        cursor = _open_cursor(sub, submissions_file, offset, position)
+        posts = cursor.take(posts_per_sub, extract_post)
+    except Exception:
+        _close_cursor(sub)
+        sub_handler.close()
+        raise
+    new_position = cursor.position
 
     if not posts:
         sub_logger.info("File exhausted at offset %d — nothing new.", offset)
         log.info("r/%s — exhausted at offset %d, skipping.", sub, offset)
         sub_handler.close()
-        return offset  # unchanged — signals caller to skip next round too
+        return offset, new_position  # unchanged offset — signals caller to skip next round too
 
     new_offset = offset + len(posts)
-    sub_logger.info("Got %d posts (offset %d → %d).", len(posts), offset, new_offset)
+    sub_logger.info("Got %d posts (offset %d → %d, byte %d).", len(posts), offset, new_offset, new_position)
 
     # Insert in chunks to keep memory flat
     inserted = 0
@@ -191,16 +229,16 @@ async def ingest_subreddit(
         inserted += await insert_posts(pool, posts[i : i + DB_INSERT_BATCH], dry_run)
     sub_logger.info("Inserted: %d posts.", inserted)
 
-    # Embed any unembedded posts.
-    # Concurrency=1 keeps us well under the 1M TPM rate limit.
+    # Embed any unembedded posts. The OpenAI backend paces itself against the
+    # RPM/TPM limits, so batches can be in flight concurrently.
     _check_embedding_backend()
-    await embed_posts(pool, EMBED_BATCH_SIZE, 1, dry_run)
+    await embed_posts(pool, EMBED_BATCH_SIZE, EMBED_CONCURRENCY, dry_run)
 
     elapsed = time.monotonic() - t0
     log.info("r/%s done in %.0fs — inserted=%d  new_offset=%d", sub, elapsed, inserted, new_offset)
 
     sub_handler.close()
-    return new_offset
+    return new_offset, new_position
 
 
 # ─── Main loop ────────────────────────────────────────────────────────────────
@@ -231,6 +269,7 @@ async def run(args: argparse.Namespace) -> None:
             round_num = state["round"]
             start_idx = state["subreddit_index"]
             offsets: dict[str, int] = state.get("offsets", {})
+            positions: dict[str, int] = state.setdefault("positions", {})
 
             log.info("═══ Round %d — starting at index %d / %d ═══",
                      round_num, start_idx, len(PRIORITY_SUBREDDITS))
@@ -246,18 +285,22 @@ async def run(args: argparse.Namespace) -> None:
 
                 sub = PRIORITY_SUBREDDITS[idx]
                 prev_offset = offsets.get(sub, 0)
+                prev_position = positions.get(sub, 0 if prev_offset == 0 else None)
 
                 try:
-                    new_offset = await ingest_subreddit(
+                    new_offset, new_position = await ingest_subreddit(
                         sub=sub,
                         pool=pool,
                         posts_per_sub=args.posts_per_sub,
                         offset=prev_offset,
+                        position=prev_position,
                         round_num=round_num,
                         dry_run=args.dry_run,
                     )
                 except Exception as exc:
                     log.error("r/%s FAILED: %s — will retry next run.", sub, exc, exc_info=True)
+                    # The batch may not have been stored, so re-read it from the checkpoint
+                    _close_cursor(sub)
                     # Save state pointing AT this subreddit so the next run retries it
                     state["subreddit_index"] = idx
                     save_state(state)
@@ -270,6 +313,8 @@ async def run(args: argparse.Namespace) -> None:
 
                 offsets[sub] = new_offset
                 state["offsets"] = offsets
+                if new_position is not None:
+                    positions[sub] = new_position
                 state["subreddit_index"] = idx + 1
                 save_state(state)
 
@@ -290,6 +335,8 @@ async def run(args: argparse.Namespace) -> None:
             save_state(state)
 
     finally:
+        for sub in list(_cursors):
+            _close_cursor(sub)
         await pool.close()
         log.info("Session finished. Total subreddit-batches processed: %d", total_processed)
 
@@ -16,16 +16,24 @@ from datetime import datetime
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from agent.claude_client import close_async_client, get_llm_cache_stats
 from database import close_pool, get_pool, init_pool
-from models import DatabaseHealthResponse, HealthResponse
+from models import (
+    DatabaseHealthResponse,
+    EmbeddingCacheStatsResponse,
+    HealthResponse,
+    LLMCacheStatsResponse,
+)
+from repositories.embeddings import get_query_cache_stats
 from routers import alerts, search, threads, agent, engage
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Manage app lifecycle: init DB pool on startup, close on shutdown."""
+    """Manage app lifecycle: init DB pool on startup, close it and the Claude client on shutdown."""
     await init_pool()
     yield
+    await close_async_client()
     await close_pool()
 
 
@@ -75,3 +83,15 @@ async def health_db() -> DatabaseHealthResponse:
             database="unavailable",
             detail=str(e),
         )
+
+
+@app.get("/health/embedding-cache", response_model=EmbeddingCacheStatsResponse)
+async def health_embedding_cache() -> EmbeddingCacheStatsResponse:
+    """Query-embedding cache counters (hits, misses, in-flight coalescing)."""
+    return EmbeddingCacheStatsResponse(**get_query_cache_stats())
+
+
+@app.get("/health/llm-cache", response_model=LLMCacheStatsResponse)
+async def health_llm_cache() -> LLMCacheStatsResponse:
+    """LLM response cache counters for the agent and engage routes."""
+    return LLMCacheStatsResponse(**get_llm_cache_stats())
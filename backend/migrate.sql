@@ -32,6 +32,52 @@ CREATE TABLE IF NOT EXISTS comment_embeddings (
     embedded_at TIMESTAMP NOT NULL DEFAULT NOW()
 );
 
+-- ── orphan_comments table ─────────────────────────────────────────────────────
+-- Comments whose post has not been imported yet (ingest.py --park-orphans).
+-- No FK to posts on purpose; ingest.py moves them into comments once the post exists.
+CREATE TABLE IF NOT EXISTS orphan_comments (
+    id               TEXT PRIMARY KEY,
+    post_id          TEXT NOT NULL,
+    parent_id        TEXT,
+    parent_type      TEXT,
+    author           TEXT,
+    body             TEXT NOT NULL,
+    created_utc      TIMESTAMP NOT NULL,
+    score            INTEGER,
+    controversiality INTEGER,
+    parked_at        TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- ── post_comment_activity table ───────────────────────────────────────────────
+-- Per-post cumulative hourly comment counts for the active-thread endpoints.
+CREATE TABLE IF NOT EXISTS post_comment_activity (
+    post_id     TEXT PRIMARY KEY REFERENCES posts(id) ON DELETE CASCADE,
+    hourly_cum  INTEGER[] NOT NULL
+);
+
+-- ── embedding_cache table ─────────────────────────────────────────────────────
+-- Vectors of already-embedded texts; ingest.py reuses them for duplicate texts.
+-- The vector column is untyped because rows are keyed per model; the model id
+-- (embeddings.embedding_model_id) includes the dimension.
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    content_hash BYTEA     NOT NULL,
+    model        TEXT      NOT NULL,
+    dim          INTEGER   NOT NULL,
+    embedding    vector    NOT NULL,
+    created_at   TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (content_hash, model)
+);
+
+-- ── llm_cache table ───────────────────────────────────────────────────────────
+-- Claude responses shared across API workers when LLM_CACHE_DB=1.
+CREATE TABLE IF NOT EXISTS llm_cache (
+    prompt_hash  BYTEA PRIMARY KEY,
+    model        TEXT      NOT NULL,
+    response     TEXT      NOT NULL,
+    created_at   TIMESTAMP NOT NULL DEFAULT NOW(),
+    expires_at   TIMESTAMP NOT NULL
+);
+
 -- ── Dimension migration (only needed if switching from 1536 → 768) ─────────
 -- Uncomment these if you previously ran with EMBEDDING_BACKEND=openai and are
 -- switching to the free local backend.  All embeddings will need to be
@@ -75,6 +121,14 @@ DO $$ BEGIN
     ALTER TABLE posts ADD COLUMN IF NOT EXISTS embedded_at TIMESTAMP;
 EXCEPTION WHEN duplicate_column THEN NULL; END $$;
 
+DO $$ BEGIN
+    ALTER TABLE posts ADD COLUMN IF NOT EXISTS month_bucket INTEGER;
+EXCEPTION WHEN duplicate_column THEN NULL; END $$;
+
+DO $$ BEGIN
+    ALTER TABLE posts ADD COLUMN IF NOT EXISTS week_bucket INTEGER;
+EXCEPTION WHEN duplicate_column THEN NULL; END $$;
+
 -- ── Add ON DELETE CASCADE to comments.post_id if missing ─────────────────────
 -- This is a constraint change; skip if the FK already has cascade.
 -- Uncomment and adapt if needed:
@@ -101,6 +155,7 @@ CREATE INDEX IF NOT EXISTS posts_created_utc_idx ON posts (created_utc);
 CREATE INDEX IF NOT EXISTS posts_activity_ratio_idx ON posts (activity_ratio DESC NULLS LAST);
 CREATE INDEX IF NOT EXISTS comments_post_id_idx ON comments (post_id);
 CREATE INDEX IF NOT EXISTS comments_created_utc_idx ON comments (created_utc);
+CREATE INDEX IF NOT EXISTS orphan_comments_post_id_idx ON orphan_comments (post_id);
 
 -- ── Rebuild reconstructed_text for any posts that are missing it ──────────────
 -- This is a one-time fix; safe to re-run.
@@ -113,3 +168,50 @@ SET reconstructed_text = CASE
         'Title: ' || title
     END
 WHERE reconstructed_text IS NULL;
+
+-- ── Backfill month_bucket / week_bucket ───────────────────────────────────────
+-- New rows get these from ingest.py at insert time; this fills older rows.
+-- month_bucket = YYYYMM, week_bucket = YYYYMMDD of the week's Monday.
+-- Safe to re-run (only touches rows still missing a bucket).
+
+UPDATE posts
+SET month_bucket = (EXTRACT(YEAR FROM created_utc) * 100 + EXTRACT(MONTH FROM created_utc))::int,
+    week_bucket  = TO_CHAR(DATE_TRUNC('week', created_utc), 'YYYYMMDD')::int
+WHERE month_bucket IS NULL OR week_bucket IS NULL;
+
+-- ── Backfill post_comment_activity ────────────────────────────────────────────
+-- ingest.py keeps this current for posts it loads comments for; this fills
+-- posts imported before the table existed. Safe to re-run (skips posts that
+-- already have a row). Same computation as ingest._COMMENT_ACTIVITY_SQL.
+
+WITH hist AS (
+    SELECT
+        c.post_id,
+        LEAST(
+            GREATEST(CEIL(EXTRACT(EPOCH FROM (p.last_comment_utc - c.created_utc)) / 3600.0), 1),
+            721
+        )::int   AS hour,
+        COUNT(*) AS n
+    FROM comments c
+    JOIN posts p ON p.id = c.post_id
+    WHERE p.last_comment_utc IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM post_comment_activity a WHERE a.post_id = c.post_id)
+    GROUP BY 1, 2
+), spans AS (
+    SELECT post_id, LEAST(MAX(hour), 720) AS len
+    FROM hist
+    GROUP BY post_id
+), cum AS (
+    SELECT
+        s.post_id,
+        g.h,
+        SUM(COALESCE(hist.n, 0)) OVER (PARTITION BY s.post_id ORDER BY g.h) AS cnt
+    FROM spans s
+    CROSS JOIN LATERAL generate_series(1, s.len) AS g(h)
+    LEFT JOIN hist ON hist.post_id = s.post_id AND hist.hour = g.h
+)
+INSERT INTO post_comment_activity (post_id, hourly_cum)
+SELECT post_id, array_agg(cnt::int ORDER BY h)
+FROM cum
+GROUP BY post_id
+ON CONFLICT (post_id) DO NOTHING;
@@ -135,6 +135,7 @@ class TopMatch(BaseModel):
     url: str | None
     similarity: float
     kind: str  # "post" | "comment"
+    title: str | None = None  # the post's title (for comments, the post commented on)
 
 
 class TopMatchesResponse(BaseModel):
@@ -164,6 +165,17 @@ class ActiveThreadsResponse(BaseModel):
     threads: list[ActiveThread]
 
 
+# --- Results page (all analytics from one vector scan) ---
+
+
+class ResultsPageResponse(BaseModel):
+    mentions: MentionsTrendResponse
+    growth: GrowthMomentumResponse
+    users: SubredditUsersResponse
+    top_matches: TopMatchesResponse
+    active_threads: ActiveThreadsResponse
+
+
 # --- Health ---
 
 
@@ -175,3 +187,25 @@ class HealthResponse(BaseModel):
 class DatabaseHealthResponse(BaseModel):
     database: str  # "ok" | "unavailable"
     detail: str | None = None
+
+
+class LLMCacheStatsResponse(BaseModel):
+    size: int
+    max_size: int
+    ttl_seconds: float
+    db_enabled: bool  # llm_cache table in use (LLM_CACHE_DB=1 and the table exists)
+    hits: int
+    db_hits: int     # served from llm_cache after an in-memory miss
+    misses: int
+    coalesced: int   # calls that joined an in-flight Claude call instead of starting one
+    hit_rate: float
+
+
+class EmbeddingCacheStatsResponse(BaseModel):
+    size: int
+    max_size: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    coalesced: int   # calls that joined an in-flight encode instead of starting one
+    hit_rate: float
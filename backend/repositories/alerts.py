@@ -4,13 +4,12 @@ Alerts repository — create and list user alerts with query embeddings.
 
 from models import AlertCreateResponse
 from database import get_pool
-from repositories.embeddings import embed_text, to_pg_vector
+from repositories.embeddings import embed_text
 
 
 async def create_alert(user_email: str, query: str) -> AlertCreateResponse:
     """Embed the query and INSERT a new alert row. Returns the created alert."""
     embedding = await embed_text(query)
-    vec = to_pg_vector(embedding)
     pool = await get_pool()
 
     sql = """
@@ -20,7 +19,7 @@ async def create_alert(user_email: str, query: str) -> AlertCreateResponse:
     """
 
     async with pool.acquire() as conn:
-        row = await conn.fetchrow(sql, user_email, query, vec)
+        row = await conn.fetchrow(sql, user_email, query, embedding)
 
     return AlertCreateResponse(
         id=row["id"],
@@ -3,8 +3,8 @@ Embedding backend for Nybblers.
 
 Controlled by two environment variables:
 
-  EMBEDDING_BACKEND   "local" (default) | "openai"
-  LOCAL_EMBEDDING_MODEL  sentence-transformers model name
+  EMBEDDING_BACKEND   "local" (default) | "onnx" | "openai"
+  LOCAL_EMBEDDING_MODEL  sentence-transformers model name (also used by "onnx")
                          default: BAAI/bge-base-en-v1.5  (768 dims, ~440 MB)
                          lighter:  BAAI/bge-small-en-v1.5 (384 dims, ~90 MB)
 
@@ -17,18 +17,67 @@ Local backend
   - Uses cosine similarity (vectors are L2-normalised).
   - EMBEDDING_DIM = 768
 
+ONNX backend
+  - The same BGE model run through ONNX Runtime on CPU — no PyTorch at query
+    time.  Vectors match the local backend (CLS pooling + L2 norm), so the
+    two are interchangeable without re-embedding; check with
+    compare_embeddings.py.
+  - Requires: pip install onnxruntime tokenizers huggingface_hub
+  - Loads onnx/model.onnx + tokenizer.json from the model's Hugging Face repo,
+    or from ONNX_MODEL_DIR (e.g. the output of
+    `optimum-cli export onnx --model BAAI/bge-base-en-v1.5 <dir>`).
+  - ONNX_QUANTIZE=1 uses a dynamically int8-quantized copy, written once to
+    ONNX_CACHE_DIR (default ~/.cache/nybblers/onnx); faster, slightly lossy.
+  - ONNX_THREADS sets intra-op threads (0 = onnxruntime default).
+  - EMBEDDING_DIM = 768
+
 OpenAI backend
   - Requires OPENAI_API_KEY.
   - text-embedding-3-small: $0.02 / 1 M tokens; Tier-1 limit 1 M TPM.
+  - Requests go through a client-side limiter: estimated tokens and requests
+    are drawn from OPENAI_TPM_LIMIT / OPENAI_RPM_LIMIT token buckets, and
+    in-flight requests adapt (up to OPENAI_EMBED_MAX_CONCURRENCY) from the
+    rate-limit headers and 429s.  Point OPENAI_BASE_URL at
+    fake_openai_server.py to exercise it locally.
   - EMBEDDING_DIM = 1536
 
+Query micro-batching (local and onnx backends)
+  Cache misses from embed_text() are queued for a dedicated encode thread,
+  which waits up to EMBED_MICROBATCH_MAX_WAIT_MS for more concurrent queries
+  and encodes up to EMBED_MICROBATCH_MAX_SIZE of them in one forward pass.
+  EMBED_MICROBATCH_MAX_SIZE=1 turns batching off.
+
+Bulk batching
+  plan_embedding_batches() groups a window of texts for embed_texts(): by
+  estimated token length for the CPU backends (padding makes a batch cost as
+  much as its longest text), and into token-budgeted requests for OpenAI
+  (OPENAI_EMBED_BATCH_TOKENS, default a tenth of OPENAI_TPM_LIMIT).
+
+Query cache
+  embed_text() (the API query path) goes through an LRU/TTL cache keyed by
+  normalised text + backend + model + dim, and concurrent calls for the same
+  query share a single encode.  Tune with QUERY_EMBED_CACHE_SIZE (entries,
+  0 disables) and QUERY_EMBED_CACHE_TTL (seconds).
+
+Vectors are returned as 1-D float32 NumPy arrays and bound to `vector`
+parameters as-is through the binary codec in database.register_vector_codec.
+
 IMPORTANT: The vector dimension written here must match the vector(N)
 in your database schema.  Pick one backend before running ingest and
 don't change it mid-way through (mixing dims breaks search).
 """
 
 import asyncio
+import hashlib
 import os
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import numpy as np
 
 # ── Backend detection ─────────────────────────────────────────────────────────
 
@@ -38,7 +87,9 @@ _BACKEND = os.environ.get("EMBEDDING_BACKEND", "local").strip().lower()
 _DIM_LOCAL = int(os.environ.get("EMBEDDING_DIM", "768"))
 _DIM_OPENAI = 1536
 
-EMBEDDING_DIM: int = _DIM_LOCAL if _BACKEND == "local" else _DIM_OPENAI
+_CPU_BACKENDS = ("local", "onnx")
+
+EMBEDDING_DIM: int = _DIM_LOCAL if _BACKEND in _CPU_BACKENDS else _DIM_OPENAI
 
 # ── Local (sentence-transformers) ─────────────────────────────────────────────
 
@@ -62,7 +113,7 @@ def _get_local_model():
     return _local_model
 
 
-def _encode_local(texts: list[str]) -> list[list[float]]:
+def _encode_local(texts: list[str]) -> list[np.ndarray]:
     """Synchronous local encode — run this in a thread via asyncio.to_thread."""
     model = _get_local_model()
     vecs = model.encode(
@@ -70,8 +121,209 @@ def _encode_local(texts: list[str]) -> list[list[float]]:
         normalize_embeddings=True,  # L2-normalise → cosine sim = dot product
         batch_size=64,
         show_progress_bar=False,
+        convert_to_numpy=True,
+    )
+    return list(vecs.astype(np.float32, copy=False))
+
+
+# ── ONNX Runtime (CPU) ────────────────────────────────────────────────────────
+
+_ONNX_MODEL_DIR = os.environ.get("ONNX_MODEL_DIR", "").strip()
+_ONNX_QUANTIZE = os.environ.get("ONNX_QUANTIZE", "0").strip().lower() in ("1", "true", "yes")
+_ONNX_THREADS = int(os.environ.get("ONNX_THREADS", "0"))
+_ONNX_CACHE_DIR = Path(os.environ.get("ONNX_CACHE_DIR", "~/.cache/nybblers/onnx")).expanduser()
+_ONNX_MAX_TOKENS = 512  # BGE max_seq_length
+_ONNX_BATCH_SIZE = 64
+
+_onnx = None  # (session, tokenizer, input names, output name), lazy-loaded on first use
+
+
+def _onnx_model_files() -> tuple[Path, Path]:
+    """Paths of model.onnx and tokenizer.json, downloading them on first use."""
+    if _ONNX_MODEL_DIR:
+        model_dir = Path(_ONNX_MODEL_DIR).expanduser()
+        model = model_dir / "model.onnx"
+        if not model.exists():
+            model = model_dir / "onnx" / "model.onnx"
+        return model, model_dir / "tokenizer.json"
+
+    from huggingface_hub import hf_hub_download  # noqa: PLC0415
+
+    return (
+        Path(hf_hub_download(_LOCAL_MODEL_NAME, "onnx/model.onnx")),
+        Path(hf_hub_download(_LOCAL_MODEL_NAME, "tokenizer.json")),
     )
-    return vecs.tolist()
+
+
+def _quantized_copy(model: Path) -> Path:
+    """
+    Dynamically int8-quantize `model` once and return the cached copy.  The cache
+    file is keyed on the source's resolved path, size and mtime, so a different
+    ONNX_MODEL_DIR or a re-exported/updated model is quantized afresh.
+    """
+    st = model.stat()
+    source = f"{model.resolve()}:{st.st_size}:{st.st_mtime_ns}"
+    key = hashlib.sha256(source.encode()).hexdigest()[:16]
+    target = _ONNX_CACHE_DIR / f"{_LOCAL_MODEL_NAME.replace('/', '--')}.{key}.int8.onnx"
+    if not target.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic  # noqa: PLC0415
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + ".tmp")
+        quantize_dynamic(str(model), str(tmp), weight_type=QuantType.QInt8)
+        tmp.replace(target)
+    return target
+
+
+def _get_onnx():
+    global _onnx
+    if _onnx is None:
+        try:
+            import onnxruntime as ort  # noqa: PLC0415
+            from tokenizers import Tokenizer  # noqa: PLC0415
+        except ImportError as exc:
+            raise RuntimeError(
+                "The onnx backend needs onnxruntime and tokenizers. "
+                "Run: pip install onnxruntime tokenizers huggingface_hub"
+            ) from exc
+
+        model, tokenizer_file = _onnx_model_files()
+        if _ONNX_QUANTIZE:
+            model = _quantized_copy(model)
+
+        opts = ort.SessionOptions()
+        if _ONNX_THREADS > 0:
+            opts.intra_op_num_threads = _ONNX_THREADS
+        session = ort.InferenceSession(str(model), opts, providers=["CPUExecutionProvider"])
+
+        tokenizer = Tokenizer.from_file(str(tokenizer_file))
+        tokenizer.enable_truncation(max_length=_ONNX_MAX_TOKENS)
+        tokenizer.enable_padding(pad_id=tokenizer.token_to_id("[PAD]") or 0, pad_token="[PAD]")
+
+        input_names = {i.name for i in session.get_inputs()}
+        output_names = [o.name for o in session.get_outputs()]
+        output = "last_hidden_state" if "last_hidden_state" in output_names else output_names[0]
+        _onnx = (session, tokenizer, input_names, output)
+    return _onnx
+
+
+def _encode_onnx(texts: list[str]) -> list[np.ndarray]:
+    """Synchronous ONNX encode — CLS pooling + L2 norm, as sentence-transformers does for BGE."""
+    session, tokenizer, input_names, output = _get_onnx()
+    vecs: list[np.ndarray | None] = [None] * len(texts)
+    # Batch texts of similar length together so little compute goes to padding
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    for start in range(0, len(order), _ONNX_BATCH_SIZE):
+        idx = order[start : start + _ONNX_BATCH_SIZE]
+        encodings = tokenizer.encode_batch([texts[i] for i in idx])
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = session.run([output], {k: v for k, v in feeds.items() if k in input_names})[0]
+        cls = hidden[:, 0, :].astype(np.float32)
+        cls /= np.maximum(np.linalg.norm(cls, axis=1, keepdims=True), 1e-12)
+        for i, vec in zip(idx, cls):
+            vecs[i] = vec
+    return vecs
+
+
+def _encode_cpu(texts: list[str]) -> list[np.ndarray]:
+    """Encode with whichever in-process backend is configured."""
+    return _encode_onnx(texts) if _BACKEND == "onnx" else _encode_local(texts)
+
+
+# ── Query micro-batching (local / onnx) ──────────────────────────────────────
+
+_MICROBATCH_MAX_SIZE = int(os.environ.get("EMBED_MICROBATCH_MAX_SIZE", "32"))
+_MICROBATCH_MAX_WAIT = float(os.environ.get("EMBED_MICROBATCH_MAX_WAIT_MS", "5")) / 1000.0
+
+# One thread owns the model for query encodes, so concurrent requests queue up
+# for it instead of running competing forward passes in the default pool.
+_encode_executor: ThreadPoolExecutor | None = None
+
+
+def _get_encode_executor() -> ThreadPoolExecutor:
+    global _encode_executor
+    if _encode_executor is None:
+        _encode_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed-query")
+    return _encode_executor
+
+
+class _MicroBatcher:
+    """
+    Queue of single-text encodes for one event loop.  A worker task takes the
+    first queued text, collects whatever else arrives within max_wait (up to
+    max_batch texts), encodes them together on the encode thread and resolves
+    each caller's future.  The worker exits when the queue is empty.
+    """
+
+    def __init__(self, max_batch: int, max_wait: float) -> None:
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: asyncio.Queue[tuple[str, asyncio.Future]] = asyncio.Queue()
+        self._worker: asyncio.Task | None = None
+
+    async def encode(self, text: str) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put_nowait((text, future))
+        if self._worker is None:
+            self._worker = loop.create_task(self._run())
+        return await future
+
+    async def _collect(self) -> list[tuple[str, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [self._queue.get_nowait()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while not self._queue.empty():
+                batch = [(t, f) for t, f in await self._collect() if not f.done()]
+                if not batch:
+                    continue  # every caller was cancelled
+                try:
+                    vecs = await loop.run_in_executor(
+                        _get_encode_executor(), _encode_cpu, [t for t, _ in batch],
+                    )
+                except Exception as exc:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(exc)
+                    continue
+                for (_, future), vec in zip(batch, vecs):
+                    if not future.done():
+                        future.set_result(vec)
+        finally:
+            self._worker = None
+
+
+_batchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _MicroBatcher]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_batcher() -> _MicroBatcher:
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
+    if batcher is None:
+        batcher = _batchers[loop] = _MicroBatcher(_MICROBATCH_MAX_SIZE, _MICROBATCH_MAX_WAIT)
+    return batcher
 
 
 # ── OpenAI ────────────────────────────────────────────────────────────────────
@@ -79,6 +331,11 @@ def _encode_local(texts: list[str]) -> list[list[float]]:
 _OPENAI_MODEL = "text-embedding-3-small"
 _MAX_CHARS = 24_000  # ~6 000 tokens; safe limit for both models
 
+_OPENAI_RPM_LIMIT = int(os.environ.get("OPENAI_RPM_LIMIT", "3000"))      # Tier 1
+_OPENAI_TPM_LIMIT = int(os.environ.get("OPENAI_TPM_LIMIT", "1000000"))   # Tier 1
+_OPENAI_MAX_CONCURRENCY = int(os.environ.get("OPENAI_EMBED_MAX_CONCURRENCY", "16"))
+_OPENAI_MAX_ATTEMPTS = 8
+
 _openai_client = None
 
 
@@ -90,43 +347,433 @@ def _get_openai():
         api_key = os.environ.get("OPENAI_API_KEY", "").strip()
         if not api_key:
             raise RuntimeError("OPENAI_API_KEY is not set — cannot use OpenAI backend.")
-        _openai_client = AsyncOpenAI(api_key=api_key, max_retries=10)
+        # Retries are ours (see _encode_openai) so 429s feed the rate limiter
+        # instead of being retried blindly inside the client.
+        _openai_client = AsyncOpenAI(api_key=api_key, max_retries=0)
     return _openai_client
 
 
-async def _encode_openai(texts: list[str]) -> list[list[float]]:
+def _parse_reset(value: str | None) -> float | None:
+    """Parse OpenAI reset/retry durations such as '1s', '6m0s', '20ms' or '0.5'."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total, number = 0.0, ""
+    i = 0
+    while i < len(value):
+        ch = value[i]
+        if ch.isdigit() or ch == ".":
+            number += ch
+        elif value.startswith("ms", i):
+            total += float(number or 0) / 1000
+            number = ""
+            i += 1
+        elif ch in "hms":
+            total += float(number or 0) * {"h": 3600, "m": 60, "s": 1}[ch]
+            number = ""
+        else:
+            return None
+        i += 1
+    return total
+
+
+class _TokenBucket:
+    """Holds up to `per_minute` units, refilled continuously at per_minute / 60 per second."""
+
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = float(max(1, per_minute))
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.capacity / 60.0)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60.0 / self.capacity
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= amount  # may go negative after a usage correction
+
+    def cap(self, remaining: float) -> None:
+        """Never believe we have more left than the server says we do."""
+        self._refill()
+        self.level = min(self.level, remaining)
+
+
+class _OpenAIRateLimiter:
+    """
+    Client-side RPM/TPM limiter with adaptive (AIMD) concurrency.
+
+    Each request reserves one request and its estimated tokens from the two
+    token buckets before it is sent, so a backfill runs at the configured tier
+    limits rather than discovering them through 429s.  Concurrency starts low,
+    grows by one after each `limit` successes while the server reports headroom,
+    and halves on a 429, which also pauses all requests for the server's
+    retry-after.  Rate-limit response headers cap the buckets, and the actual
+    prompt_tokens usage corrects each estimate.
+    """
+
+    def __init__(self, rpm: int, tpm: int, max_concurrency: int) -> None:
+        self._requests = _TokenBucket(rpm)
+        self._tokens = _TokenBucket(tpm)
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = min(2, self.max_concurrency)
+        self._active = 0
+        self._successes = 0
+        self._blocked_until = 0.0
+        self._admit = asyncio.Lock()      # admits one waiter at a time, in arrival order
+        self._released = asyncio.Event()
+        self.rate_limited = 0
+
+    async def acquire(self, tokens: int) -> float:
+        """Wait for a concurrency slot and RPM/TPM budget; returns the tokens reserved."""
+        tokens = min(float(tokens), self._tokens.capacity)  # an oversized request must still fit
+        async with self._admit:
+            while True:
+                wait = max(
+                    self._requests.wait_time(1),
+                    self._tokens.wait_time(tokens),
+                    self._blocked_until - time.monotonic(),
+                )
+                if self._active >= self.limit:
+                    self._released.clear()
+                    try:
+                        await asyncio.wait_for(self._released.wait(), timeout=max(wait, 1.0))
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self._requests.take(1)
+            self._tokens.take(tokens)
+            self._active += 1
+        return tokens
+
+    def _release(self) -> None:
+        self._active -= 1
+        self._released.set()
+
+    def _sync_headers(self, headers) -> float | None:
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+        remaining_requests = headers.get("x-ratelimit-remaining-requests")
+        if remaining_requests is not None:
+            self._requests.cap(float(remaining_requests))
+        if remaining_tokens is not None:
+            self._tokens.cap(float(remaining_tokens))
+            return float(remaining_tokens)
+        return None
+
+    def on_success(self, headers, reserved: float, used_tokens: int | None) -> None:
+        self._release()
+        if used_tokens is not None:
+            self._tokens.take(used_tokens - reserved)
+        remaining = self._sync_headers(headers)
+        headroom = remaining is None or remaining > 0.1 * self._tokens.capacity
+        self._successes += 1
+        if headroom and self._successes >= self.limit and self.limit < self.max_concurrency:
+            self.limit += 1
+            self._successes = 0
+
+    def on_rate_limited(self, headers) -> float:
+        """Shrink concurrency and pause admissions; returns the pause in seconds."""
+        self._release()
+        self.rate_limited += 1
+        self.limit = max(1, self.limit // 2)
+        self._successes = 0
+        self._sync_headers(headers)
+        retry_ms = headers.get("retry-after-ms")
+        pause = (
+            float(retry_ms) / 1000 if retry_ms
+            else _parse_reset(headers.get("retry-after"))
+            or _parse_reset(headers.get("x-ratelimit-reset-tokens"))
+            or 1.0
+        )
+        self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+        return pause
+
+    def on_error(self) -> None:
+        self._release()
+
+    def stats(self) -> dict:
+        return {"concurrency": self.limit, "active": self._active, "rate_limited": self.rate_limited}
+
+
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _OpenAIRateLimiter]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_limiter() -> _OpenAIRateLimiter:
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        limiter = _limiters[loop] = _OpenAIRateLimiter(
+            _OPENAI_RPM_LIMIT, _OPENAI_TPM_LIMIT, _OPENAI_MAX_CONCURRENCY,
+        )
+    return limiter
+
+
+async def _encode_openai(texts: list[str]) -> list[np.ndarray]:
+    import openai  # noqa: PLC0415
+
     client = _get_openai()
+    limiter = _get_limiter()
     truncated = [t[:_MAX_CHARS] for t in texts]
-    resp = await client.embeddings.create(model=_OPENAI_MODEL, input=truncated)
-    return [item.embedding for item in sorted(resp.data, key=lambda x: x.index)]
+    estimate = sum(estimate_tokens(t) for t in truncated)
+
+    for attempt in range(1, _OPENAI_MAX_ATTEMPTS + 1):
+        reserved = await limiter.acquire(estimate)
+        try:
+            raw = await client.embeddings.with_raw_response.create(model=_OPENAI_MODEL, input=truncated)
+            resp = raw.parse()
+        except openai.RateLimitError as exc:
+            limiter.on_rate_limited(exc.response.headers)
+            if attempt == _OPENAI_MAX_ATTEMPTS:
+                raise
+            continue
+        except (openai.APIConnectionError, openai.InternalServerError):
+            limiter.on_error()
+            if attempt == _OPENAI_MAX_ATTEMPTS:
+                raise
+            await asyncio.sleep(min(30.0, 0.5 * 2 ** attempt))
+            continue
+        except BaseException:
+            limiter.on_error()
+            raise
+        usage = getattr(resp, "usage", None)
+        limiter.on_success(raw.headers, reserved, usage.prompt_tokens if usage else None)
+        return [
+            np.asarray(item.embedding, dtype=np.float32)
+            for item in sorted(resp.data, key=lambda x: x.index)
+        ]
+    raise AssertionError("unreachable")
+
+
+def get_openai_limiter_stats() -> dict:
+    """Current adaptive concurrency and 429 count of this loop's OpenAI limiter."""
+    return _get_limiter().stats()
+
+
+def _model_name() -> str:
+    return _LOCAL_MODEL_NAME if _BACKEND in _CPU_BACKENDS else _OPENAI_MODEL
+
+
+# ── Query-embedding cache ─────────────────────────────────────────────────────
+
+_QUERY_CACHE_SIZE = int(os.environ.get("QUERY_EMBED_CACHE_SIZE", "1024"))
+_QUERY_CACHE_TTL = float(os.environ.get("QUERY_EMBED_CACHE_TTL", "3600"))
+
+
+class _QueryEmbeddingCache:
+    """
+    LRU + TTL cache of query vectors.  A miss starts one encode task; any call
+    for the same key that arrives while it is running awaits that task instead
+    of starting another.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple, tuple[float, np.ndarray]] = OrderedDict()
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_compute(
+        self,
+        key: tuple,
+        compute: Callable[[], Awaitable[np.ndarray]],
+    ) -> np.ndarray:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, vec = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vec
+            del self._entries[key]
+
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        if task is not None and task.get_loop() is loop:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.misses += 1
+        task = loop.create_task(compute())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finish(key, t))
+        # shield: a cancelled caller must not cancel the encode other callers share
+        return await asyncio.shield(task)
+
+    def _finish(self, key: tuple, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, task.result())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "max_size": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+
+_query_cache = _QueryEmbeddingCache(_QUERY_CACHE_SIZE, _QUERY_CACHE_TTL)
+
+
+def _normalize_query(text: str) -> str:
+    """
+    Cache key for a query: runs of whitespace collapsed, so trivially different
+    queries share an entry.  Only the key is normalized; the encoded text is the
+    stripped original, as embed_texts() sends it.
+    """
+    return " ".join(text.split())
+
+
+def get_query_cache_stats() -> dict:
+    """Hit/miss counters for the query-embedding cache."""
+    return _query_cache.stats()
+
+
+# ── Bulk batch planning ───────────────────────────────────────────────────────
+
+# Token-length bucket upper bounds for the CPU backends; BGE truncates at 512.
+_LENGTH_BUCKETS = (32, 64, 128, 256, _ONNX_MAX_TOKENS)
+
+_OPENAI_MAX_INPUTS = 2048           # API cap on inputs per request
+_OPENAI_REQUEST_TOKENS = 300_000    # API cap on total tokens per request
+_OPENAI_BATCH_TOKENS = int(os.environ.get(
+    "OPENAI_EMBED_BATCH_TOKENS", str(min(_OPENAI_REQUEST_TOKENS, _OPENAI_TPM_LIMIT // 10)),
+))
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) of a text after truncation."""
+    return min(len(text), _MAX_CHARS) // 4 + 1
+
+
+def _length_bucket(tokens: int) -> str:
+    for bound in _LENGTH_BUCKETS:
+        if tokens <= bound:
+            return f"<={bound} tok"
+    return f">{_LENGTH_BUCKETS[-1]} tok"
+
+
+def plan_embedding_batches(texts: list[str], batch_size: int) -> list[tuple[str, list[int]]]:
+    """
+    Split a window of texts into (bucket label, indices) batches for embed_texts().
+
+    CPU backends: texts are sorted by estimated length and cut into
+    `batch_size` batches within each length bucket, so short titles never pad
+    out to a long selftext.  OpenAI: texts are packed, shortest first, into
+    requests of at most OPENAI_EMBED_BATCH_TOKENS estimated tokens (labelled
+    by the bucket of their longest text).
+    """
+    tokens = [estimate_tokens(t) for t in texts]
+    order = sorted(range(len(texts)), key=tokens.__getitem__)
+    batches: list[tuple[str, list[int]]] = []
+
+    if _BACKEND in _CPU_BACKENDS:
+        current: list[int] = []
+        for i in order:
+            label = _length_bucket(tokens[i])
+            if current and (len(current) >= batch_size or label != _length_bucket(tokens[current[0]])):
+                batches.append((_length_bucket(tokens[current[0]]), current))
+                current = []
+            current.append(i)
+        if current:
+            batches.append((_length_bucket(tokens[current[0]]), current))
+        return batches
+
+    budget = max(1, _OPENAI_BATCH_TOKENS)
+    current, used = [], 0
+    for i in order:
+        if current and (used + tokens[i] > budget or len(current) >= _OPENAI_MAX_INPUTS):
+            batches.append((_length_bucket(tokens[current[-1]]), current))
+            current, used = [], 0
+        current.append(i)
+        used += tokens[i]
+    if current:
+        batches.append((_length_bucket(tokens[current[-1]]), current))
+    return batches
+
+
+# ── Persistent embedding cache keys ─────────────────────────────────────────
+# ingest.py keeps vectors for already-embedded texts in the embedding_cache table,
+# keyed on (content_hash, model) so duplicate texts are copied instead of re-encoded.
+# The model id includes the dimension, so a run with another EMBEDDING_DIM is
+# never served vectors of the wrong size.
+
+
+def embedding_model_id() -> str:
+    """Identifies the vectors this configuration produces (backend, model, dim, int8)."""
+    model_id = f"{_BACKEND}:{_model_name()}:{EMBEDDING_DIM}"
+    if _BACKEND == "onnx" and _ONNX_QUANTIZE:
+        model_id += ":int8"
+    return model_id
+
+
+def content_hash(text: str) -> bytes:
+    """SHA-256 of the text exactly as embed_texts() would send it to the model."""
+    return hashlib.sha256(text.strip()[:_MAX_CHARS].encode()).digest()
 
 
 # ── Public API ────────────────────────────────────────────────────────────────
 
 
-async def embed_text(text: str) -> list[float]:
-    """Embed a single string and return a float vector."""
-    results = await embed_texts([text.strip()])
-    return results[0]
+async def embed_text(text: str) -> np.ndarray:
+    """
+    Embed a single query string and return a float vector.
+    Served from the query cache when the same text was embedded recently.
+    """
+    stripped = text.strip()
+
+    async def _compute() -> np.ndarray:
+        if _BACKEND in _CPU_BACKENDS and _MICROBATCH_MAX_SIZE > 1:
+            vec = await _get_batcher().encode(stripped[:_MAX_CHARS])
+        else:
+            vec = (await embed_texts([stripped]))[0]
+        vec.setflags(write=False)  # shared by every caller that hits the cache
+        return vec
+
+    if _QUERY_CACHE_SIZE <= 0:
+        return await _compute()
+    key = (_normalize_query(text), _BACKEND, _model_name(), EMBEDDING_DIM)
+    return await _query_cache.get_or_compute(key, _compute)
 
 
-async def embed_texts(texts: list[str]) -> list[list[float]]:
+async def embed_texts(texts: list[str]) -> list[np.ndarray]:
     """
-    Embed a list of strings in one shot and return a list of float vectors
+    Embed a list of strings in one shot and return a list of float32 vectors
     in the same order.  Prefer this over looping embed_text() — the local
     backend batches internally for much better throughput.
     """
     if not texts:
         return []
     cleaned = [t.strip()[:_MAX_CHARS] for t in texts]
-    if _BACKEND == "local":
-        return await asyncio.to_thread(_encode_local, cleaned)
+    if _BACKEND in _CPU_BACKENDS:
+        return await asyncio.to_thread(_encode_cpu, cleaned)
     return await _encode_openai(cleaned)
 
-
-def to_pg_vector(embedding: list[float]) -> str:
-    """
-    Convert a float list to the pgvector wire format '[x,y,z,...]'.
-    asyncpg passes this as a text literal; Postgres casts it via ::vector.
-    """
-    return "[" + ",".join(map(str, embedding)) + "]"
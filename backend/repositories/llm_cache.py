@@ -0,0 +1,32 @@
+"""
+LLM response cache repository — the optional Postgres tier behind the agent's
+in-memory response cache (see agent/claude_client.py, LLM_CACHE_DB=1).
+"""
+
+from database import get_pool
+
+
+async def get_response(prompt_hash: bytes) -> str | None:
+    """Return the cached response for this prompt hash, or None if absent or expired."""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        return await conn.fetchval(
+            "SELECT response FROM llm_cache WHERE prompt_hash = $1 AND expires_at > NOW()",
+            prompt_hash,
+        )
+
+
+async def put_response(prompt_hash: bytes, model: str, response: str, ttl_seconds: float) -> None:
+    """Upsert a response; it expires ttl_seconds from now."""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        await conn.execute(
+            """
+            INSERT INTO llm_cache (prompt_hash, model, response, expires_at)
+            VALUES ($1, $2, $3, NOW() + make_interval(secs => $4))
+            ON CONFLICT (prompt_hash) DO UPDATE
+            SET response = EXCLUDED.response, created_at = NOW(), expires_at = EXCLUDED.expires_at
+            """,
+            prompt_hash, model, response, float(ttl_seconds),
+        )
+
@@ -1,8 +1,19 @@
 """
 Post repository — real asyncpg + pgvector queries.
 All functions embed the query text via OpenAI before searching.
+
+Vector searches never filter on `embedding <=> $1 < threshold` directly —
+pgvector cannot serve that predicate from the HNSW index, so it turns into a
+sequential scan computing a distance for every row.  Instead each query runs
+an ordered ANN scan (ORDER BY distance LIMIT n), which the index does serve,
+and applies SIMILARITY_THRESHOLD to those candidates afterwards.  Top-k
+queries use their own limit as n; aggregates use ANN_CANDIDATE_LIMIT.
 """
 
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 from database import get_pool
@@ -12,6 +23,7 @@ from models import (
     Comment,
     GrowthMomentumResponse,
     MentionsTrendResponse,
+    ResultsPageResponse,
     SearchResponse,
     SearchResultItem,
     SubredditUsersResponse,
@@ -20,45 +32,174 @@ from models import (
     TopMatch,
     TopMatchesResponse,
 )
-from repositories.embeddings import embed_text, to_pg_vector
+from repositories.embeddings import embed_text, embed_texts
+
+log = logging.getLogger(__name__)
 
 # Cosine distance threshold — lower = more similar (0 = identical, 2 = opposite)
 SIMILARITY_THRESHOLD = 0.7
 
+# Bounded candidate retrieval for threshold/aggregate queries (see module docstring).
+# hnsw.ef_search is the HNSW search beam; pgvector caps it at 1000.  With
+# pgvector >= 0.8 iterative scans let the index keep producing rows past
+# ef_search until the LIMIT (or a post-filter such as subreddit) is satisfied;
+# without them the index returns at most ef_search rows, so the candidate cap
+# is clamped to the ef_search actually set (see _candidate_limit).
+HNSW_EF_SEARCH = int(os.environ.get("HNSW_EF_SEARCH", "200"))
+ANN_CANDIDATE_LIMIT = int(os.environ.get("ANN_CANDIDATE_LIMIT", "2000"))
+_MAX_EF_SEARCH = 1000  # pgvector's upper bound for hnsw.ef_search
+
+_iterative_scan: bool | None = None  # detected once from pg_extension
+_warned_candidate_clamp = False
+
+# Integer time buckets written at ingest time (YYYYMM and the YYYYMMDD of the
+# week's Monday).  The COALESCE only does date work for rows migrate.sql has not
+# backfilled yet; labels are formatted in Python once per bucket.
+_MONTH_BUCKET_SQL = (
+    "COALESCE(month_bucket, (EXTRACT(YEAR FROM created_utc) * 100"
+    " + EXTRACT(MONTH FROM created_utc))::int)"
+)
+_WEEK_BUCKET_SQL = (
+    "COALESCE(week_bucket, TO_CHAR(DATE_TRUNC('week', created_utc), 'YYYYMMDD')::int)"
+)
+
+
+def _recent_comments_sql(post: str, hours: str) -> str:
+    """
+    Comments posted within `hours` before `post`.last_comment_utc, read from
+    post_comment_activity (LEFT JOINed as `a`).  Posts without an activity row —
+    stats not built yet, or comments that arrived since — fall back to counting
+    their comments, so a stale table never hides an active thread.
+    """
+    return (
+        f"COALESCE(a.hourly_cum[LEAST({hours}, cardinality(a.hourly_cum))], ("
+        f"SELECT COUNT(*) FROM comments c WHERE c.post_id = {post}.id"
+        f" AND c.created_utc >= {post}.last_comment_utc - {hours} * INTERVAL '1 hour'))::int"
+    )
+
+
+async def _supports_iterative_scan(conn) -> bool:
+    global _iterative_scan
+    if _iterative_scan is None:
+        version = await conn.fetchval(
+            "SELECT extversion FROM pg_extension WHERE extname = 'vector'"
+        )
+        try:
+            parts = tuple(int(x) for x in (version or "0").split(".")[:2])
+        except ValueError:
+            parts = (0, 0)
+        _iterative_scan = parts >= (0, 8)
+    return _iterative_scan
+
+
+@asynccontextmanager
+async def _ann_connection():
+    """
+    Acquire a connection configured for ordered ANN scans.
+    Settings are SET LOCAL inside a transaction so they never leak back into the pool.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            if await _supports_iterative_scan(conn):
+                await conn.execute(
+                    "SELECT set_config('hnsw.ef_search', $1, true), "
+                    "set_config('hnsw.iterative_scan', 'relaxed_order', true)",
+                    str(HNSW_EF_SEARCH),
+                )
+            else:
+                # No iterative scans: the index returns at most ef_search rows,
+                # so widen the beam to cover the candidate cap.
+                await conn.execute(
+                    "SELECT set_config('hnsw.ef_search', $1, true)",
+                    str(_fixed_ef_search()),
+                )
+            yield conn
+
+
+def _fixed_ef_search() -> int:
+    return min(_MAX_EF_SEARCH, max(HNSW_EF_SEARCH, ANN_CANDIDATE_LIMIT))
+
+
+def _candidate_limit() -> int:
+    """
+    LIMIT for aggregate candidate scans inside _ann_connection().
+    Without iterative scans a larger LIMIT would silently return only ef_search
+    rows, so it is clamped to that and the clamp is logged once.
+    """
+    global _warned_candidate_clamp
+    if _iterative_scan:
+        return ANN_CANDIDATE_LIMIT
+    limit = min(ANN_CANDIDATE_LIMIT, _fixed_ef_search())
+    if limit < ANN_CANDIDATE_LIMIT and not _warned_candidate_clamp:
+        _warned_candidate_clamp = True
+        log.warning(
+            "pgvector < 0.8 has no iterative HNSW scans: ANN_CANDIDATE_LIMIT=%d clamped to "
+            "hnsw.ef_search=%d, so trend/aggregate counts cover at most %d candidates per query",
+            ANN_CANDIDATE_LIMIT, limit, limit,
+        )
+    return limit
+
 
 async def search_posts(
     query_text: str,
     subreddit: str | None = None,
     limit: int = 20,
 ) -> SearchResponse:
-    """Embed query, run pgvector cosine similarity search on posts, return SearchResponse."""
+    """
+    Embed query, run pgvector cosine similarity search on posts, return SearchResponse.
+
+    The subreddit filter runs inside the ANN scan.  Without iterative scans
+    (pgvector < 0.8) that scan stops after ef_search rows, so a selective
+    subreddit could come back short or empty; there the subreddit's posts are
+    materialized first and ranked exactly instead.
+    """
     embedding = await embed_text(query_text)
-    pool = await get_pool()
 
     base_sql = """
+        {subreddit_posts}
         SELECT
             id, title, subreddit, created_utc, num_comments,
             COALESCE(activity_ratio, 0.0) AS activity_ratio,
             last_comment_utc,
-            1 - (embedding <=> $1::vector) AS similarity_score,
+            1 - distance AS similarity_score,
             COALESCE(reconstructed_text, body, title) AS snippet
-        FROM posts
-        WHERE embedding IS NOT NULL
-          AND embedding <=> $1::vector < $2
-        {subreddit_filter}
-        ORDER BY embedding <=> $1::vector
-        LIMIT $3
-    """
-    vec = to_pg_vector(embedding)
-    params: list = [vec, SIMILARITY_THRESHOLD, limit]
-    subreddit_filter = ""
+        FROM (
+            SELECT
+                id, title, subreddit, created_utc, num_comments, activity_ratio,
+                last_comment_utc, reconstructed_text, body,
+                embedding <=> $1::vector AS distance
+            FROM {source}
+            WHERE embedding IS NOT NULL
+            {subreddit_filter}
+            ORDER BY embedding <=> $1::vector
+            LIMIT $3
+        ) candidates
+        WHERE distance < $2
+        ORDER BY distance
+    """
+    params: list = [embedding, SIMILARITY_THRESHOLD, limit]
     if subreddit:
-        subreddit_filter = "AND subreddit = $4"
         params.append(subreddit)
 
-    sql = base_sql.format(subreddit_filter=subreddit_filter)
-
-    async with pool.acquire() as conn:
+    async with _ann_connection() as conn:
+        if not subreddit:
+            sql = base_sql.format(subreddit_posts="", source="posts", subreddit_filter="")
+        elif _iterative_scan:
+            sql = base_sql.format(
+                subreddit_posts="", source="posts", subreddit_filter="AND subreddit = $4",
+            )
+        else:
+            # MATERIALIZED keeps the HNSW index out of it: an exact scan of one subreddit
+            sql = base_sql.format(
+                subreddit_posts="""
+                    WITH subreddit_posts AS MATERIALIZED (
+                        SELECT * FROM posts WHERE subreddit = $4 AND embedding IS NOT NULL
+                    )
+                """,
+                source="subreddit_posts",
+                subreddit_filter="",
+            )
         rows = await conn.fetch(sql, *params)
 
     results = [
@@ -87,25 +228,27 @@ async def get_top_matches(
     Posts come from `posts` table; comments from `comments` JOIN `comment_embeddings`.
     """
     embedding = await embed_text(query_text)
-    vec = to_pg_vector(embedding)
-    pool = await get_pool()
 
     # Top matching posts
     post_sql = """
-        SELECT
-            p.id,
-            p.subreddit,
-            p.author,
-            COALESCE(p.body, p.title) AS body,
-            COALESCE(p.score, 0) AS score,
-            p.url,
-            1 - (p.embedding <=> $1::vector) AS similarity,
-            'post' AS kind
-        FROM posts p
-        WHERE p.embedding IS NOT NULL
-          AND p.embedding <=> $1::vector < $2
-        ORDER BY p.embedding <=> $1::vector
-        LIMIT $3
+        SELECT id, subreddit, author, title, body, score, url, 1 - distance AS similarity, 'post' AS kind
+        FROM (
+            SELECT
+                p.id,
+                p.subreddit,
+                p.author,
+                p.title,
+                COALESCE(p.body, p.title) AS body,
+                COALESCE(p.score, 0) AS score,
+                p.url,
+                p.embedding <=> $1::vector AS distance
+            FROM posts p
+            WHERE p.embedding IS NOT NULL
+            ORDER BY p.embedding <=> $1::vector
+            LIMIT $3
+        ) candidates
+        WHERE distance < $2
+        ORDER BY distance
     """
 
     # Top matching comments (via comment_embeddings)
@@ -114,54 +257,99 @@ async def get_top_matches(
             c.id,
             p.subreddit,
             c.author,
+            p.title,
             c.body,
             COALESCE(c.score, 0) AS score,
             NULL AS url,
-            1 - (ce.embedding <=> $1::vector) AS similarity,
+            1 - ce.distance AS similarity,
             'comment' AS kind
-        FROM comments c
-        JOIN comment_embeddings ce ON ce.comment_id = c.id
+        FROM (
+            SELECT comment_id, embedding <=> $1::vector AS distance
+            FROM comment_embeddings
+            ORDER BY embedding <=> $1::vector
+            LIMIT $3
+        ) ce
+        JOIN comments c ON c.id = ce.comment_id
         LEFT JOIN posts p ON p.id = c.post_id
-        WHERE ce.embedding <=> $1::vector < $2
-        ORDER BY ce.embedding <=> $1::vector
-        LIMIT $3
+        WHERE ce.distance < $2
+        ORDER BY ce.distance
     """
 
-    async with pool.acquire() as conn:
-        post_rows = await conn.fetch(post_sql, vec, SIMILARITY_THRESHOLD, limit)
-        comment_rows = await conn.fetch(comment_sql, vec, SIMILARITY_THRESHOLD, limit)
+    async with _ann_connection() as conn:
+        post_rows = await conn.fetch(post_sql, embedding, SIMILARITY_THRESHOLD, limit)
+        comment_rows = await conn.fetch(comment_sql, embedding, SIMILARITY_THRESHOLD, limit)
 
-    combined: list[TopMatch] = []
-    for row in post_rows:
-        combined.append(
-            TopMatch(
-                id=row["id"],
-                subreddit=row["subreddit"],
-                author=row["author"],
-                body=(row["body"] or "")[:500],
-                score=row["score"],
-                url=row["url"],
-                similarity=float(row["similarity"]),
-                kind="post",
-            )
-        )
-    for row in comment_rows:
-        combined.append(
-            TopMatch(
-                id=row["id"],
-                subreddit=row["subreddit"],
-                author=row["author"],
-                body=(row["body"] or "")[:500],
-                score=row["score"],
-                url=None,
-                similarity=float(row["similarity"]),
-                kind="comment",
-            )
+    return TopMatchesResponse(matches=_combine_top_matches(post_rows, comment_rows, limit))
+
+
+async def get_top_matches_batch(
+    query_texts: list[str],
+    limit: int = 10,
+) -> list[TopMatchesResponse]:
+    """
+    get_top_matches() for several queries at once, one response per query in order.
+    The queries are embedded in one batch and searched in one round trip: each
+    query vector is bound as its own $n::vector (the same codec path as every
+    single-query search) into a VALUES list, and each row drives its own LATERAL
+    ANN scan, so every query still gets an index-ordered top-`limit` of posts and
+    of comments.
+    """
+    if not query_texts:
+        return []
+    embeddings = await embed_texts(query_texts)
+    values = ", ".join(f"({i}, ${i + 3}::vector)" for i in range(len(embeddings)))
+
+    sql = f"""
+        WITH q (qi, embedding) AS (
+            VALUES {values}
         )
+        SELECT q.qi, m.id, m.subreddit, m.author, m.title, m.body, m.score, m.url,
+               1 - m.distance AS similarity, 'post' AS kind
+        FROM q
+        CROSS JOIN LATERAL (
+            SELECT
+                p.id,
+                p.subreddit,
+                p.author,
+                p.title,
+                COALESCE(p.body, p.title) AS body,
+                COALESCE(p.score, 0) AS score,
+                p.url,
+                p.embedding <=> q.embedding AS distance
+            FROM posts p
+            WHERE p.embedding IS NOT NULL
+            ORDER BY p.embedding <=> q.embedding
+            LIMIT $2
+        ) m
+        WHERE m.distance < $1
+
+        UNION ALL
+
+        SELECT q.qi, c.id, p.subreddit, c.author, p.title, c.body, COALESCE(c.score, 0),
+               NULL, 1 - ce.distance, 'comment'
+        FROM q
+        CROSS JOIN LATERAL (
+            SELECT e.comment_id, e.embedding <=> q.embedding AS distance
+            FROM comment_embeddings e
+            ORDER BY e.embedding <=> q.embedding
+            LIMIT $2
+        ) ce
+        JOIN comments c ON c.id = ce.comment_id
+        LEFT JOIN posts p ON p.id = c.post_id
+        WHERE ce.distance < $1
+    """
 
-    # Sort combined by similarity descending, return top `limit`
-    combined.sort(key=lambda m: m.similarity, reverse=True)
-    return TopMatchesResponse(matches=combined[:limit])
+    async with _ann_connection() as conn:
+        rows = await conn.fetch(sql, SIMILARITY_THRESHOLD, limit, *embeddings)
+
+    post_rows: list[list] = [[] for _ in query_texts]
+    comment_rows: list[list] = [[] for _ in query_texts]
+    for row in rows:
+        (post_rows if row["kind"] == "post" else comment_rows)[row["qi"]].append(row)
+    return [
+        TopMatchesResponse(matches=_combine_top_matches(posts, comments, limit))
+        for posts, comments in zip(post_rows, comment_rows)
+    ]
 
 
 async def get_mentions_over_time(query_text: str) -> MentionsTrendResponse:
@@ -170,32 +358,25 @@ async def get_mentions_over_time(query_text: str) -> MentionsTrendResponse:
     Returns a time series sorted oldest-first.
     """
     embedding = await embed_text(query_text)
-    vec = to_pg_vector(embedding)
-    pool = await get_pool()
 
-    sql = """
-        SELECT
-            TO_CHAR(created_utc, 'YYYY-MM') AS month,
-            COUNT(*) AS cnt
-        FROM posts
-        WHERE embedding IS NOT NULL
-          AND embedding <=> $1::vector < $2
-        GROUP BY month
-        ORDER BY month
+    sql = f"""
+        SELECT bucket, COUNT(*) AS cnt
+        FROM (
+            SELECT {_MONTH_BUCKET_SQL} AS bucket, embedding <=> $1::vector AS distance
+            FROM posts
+            WHERE embedding IS NOT NULL
+            ORDER BY embedding <=> $1::vector
+            LIMIT $3
+        ) candidates
+        WHERE distance < $2
+        GROUP BY bucket
+        ORDER BY bucket
     """
 
-    async with pool.acquire() as conn:
-        rows = await conn.fetch(sql, vec, SIMILARITY_THRESHOLD)
+    async with _ann_connection() as conn:
+        rows = await conn.fetch(sql, embedding, SIMILARITY_THRESHOLD, _candidate_limit())
 
-    points = [
-        TimePoint(
-            date=f"{row['month']}-01",
-            label=_format_month_label(row["month"]),
-            value=int(row["cnt"]),
-        )
-        for row in rows
-    ]
-    return MentionsTrendResponse(points=points)
+    return MentionsTrendResponse(points=_monthly_points(rows))
 
 
 async def get_users_by_subreddit(
@@ -207,34 +388,27 @@ async def get_users_by_subreddit(
     Returns { subreddit: [username, ...] }.
     """
     embedding = await embed_text(query_text)
-    vec = to_pg_vector(embedding)
-    pool = await get_pool()
 
     sql = """
         SELECT subreddit, author
-        FROM posts
-        WHERE embedding IS NOT NULL
-          AND embedding <=> $1::vector < $2
-          AND author IS NOT NULL
-          AND author <> '[deleted]'
-          AND author <> 'AutoModerator'
-        ORDER BY embedding <=> $1::vector
-        LIMIT $3
+        FROM (
+            SELECT subreddit, author, embedding <=> $1::vector AS distance
+            FROM posts
+            WHERE embedding IS NOT NULL
+              AND author IS NOT NULL
+              AND author <> '[deleted]'
+              AND author <> 'AutoModerator'
+            ORDER BY embedding <=> $1::vector
+            LIMIT $3
+        ) candidates
+        WHERE distance < $2
+        ORDER BY distance
     """
 
-    async with pool.acquire() as conn:
-        rows = await conn.fetch(sql, vec, SIMILARITY_THRESHOLD, limit)
+    async with _ann_connection() as conn:
+        rows = await conn.fetch(sql, embedding, SIMILARITY_THRESHOLD, limit)
 
-    subreddits: dict[str, list[str]] = {}
-    seen: set[tuple[str, str]] = set()
-    for row in rows:
-        sub = f"r/{row['subreddit']}"
-        author = row["author"]
-        if (sub, author) not in seen:
-            seen.add((sub, author))
-            subreddits.setdefault(sub, []).append(author)
-
-    return SubredditUsersResponse(subreddits=subreddits)
+    return SubredditUsersResponse(subreddits=_group_authors(rows))
 
 
 async def get_growth_data(query_text: str) -> GrowthMomentumResponse:
@@ -242,54 +416,37 @@ async def get_growth_data(query_text: str) -> GrowthMomentumResponse:
     Weekly and monthly time series of post counts similar to the query.
     """
     embedding = await embed_text(query_text)
-    vec = to_pg_vector(embedding)
-    pool = await get_pool()
-
-    monthly_sql = """
-        SELECT
-            TO_CHAR(created_utc, 'YYYY-MM') AS period,
-            COUNT(*) AS cnt
-        FROM posts
-        WHERE embedding IS NOT NULL
-          AND embedding <=> $1::vector < $2
-        GROUP BY period
-        ORDER BY period
-    """
 
-    weekly_sql = """
+    # Both series from one candidate scan: GROUPING(month_bucket) = 1 marks weekly rows.
+    sql = f"""
         SELECT
-            TO_CHAR(DATE_TRUNC('week', created_utc), 'YYYY-MM-DD') AS period,
+            GROUPING(month_bucket) = 1 AS is_weekly,
+            COALESCE(month_bucket, week_bucket) AS bucket,
             COUNT(*) AS cnt
-        FROM posts
-        WHERE embedding IS NOT NULL
-          AND embedding <=> $1::vector < $2
-        GROUP BY period
-        ORDER BY period
+        FROM (
+            SELECT
+                {_MONTH_BUCKET_SQL} AS month_bucket,
+                {_WEEK_BUCKET_SQL} AS week_bucket,
+                embedding <=> $1::vector AS distance
+            FROM posts
+            WHERE embedding IS NOT NULL
+            ORDER BY embedding <=> $1::vector
+            LIMIT $3
+        ) candidates
+        WHERE distance < $2
+        GROUP BY GROUPING SETS ((month_bucket), (week_bucket))
+        ORDER BY bucket
     """
 
-    async with pool.acquire() as conn:
-        monthly_rows = await conn.fetch(monthly_sql, vec, SIMILARITY_THRESHOLD)
-        weekly_rows = await conn.fetch(weekly_sql, vec, SIMILARITY_THRESHOLD)
-
-    monthly = [
-        TimePoint(
-            date=f"{row['period']}-01",
-            label=_format_month_label(row["period"]),
-            value=int(row["cnt"]),
-        )
-        for row in monthly_rows
-    ]
-
-    weekly = [
-        TimePoint(
-            date=row["period"],
-            label=_format_week_label(row["period"]),
-            value=int(row["cnt"]),
-        )
-        for row in weekly_rows
-    ]
+    async with _ann_connection() as conn:
+        rows = await conn.fetch(sql, embedding, SIMILARITY_THRESHOLD, _candidate_limit())
+    monthly_rows = [r for r in rows if not r["is_weekly"]]
+    weekly_rows = [r for r in rows if r["is_weekly"]]
 
-    return GrowthMomentumResponse(weekly=weekly, monthly=monthly)
+    return GrowthMomentumResponse(
+        weekly=_weekly_points(weekly_rows),
+        monthly=_monthly_points(monthly_rows),
+    )
 
 
 async def get_thread(thread_id: str) -> ThreadDetail | None:
@@ -363,7 +520,7 @@ async def get_threads_activity(
 
     pool = await get_pool()
 
-    sql = """
+    sql = f"""
         WITH active AS (
             SELECT
                 p.id,
@@ -373,15 +530,11 @@ async def get_threads_activity(
                 p.last_comment_utc,
                 COALESCE(p.score, 0)        AS score,
                 COALESCE(p.num_comments, 0) AS num_comments,
-                COUNT(c.id) FILTER (
-                    WHERE c.created_utc >= p.last_comment_utc - ($2 * INTERVAL '1 hour')
-                ) AS recent_comments
+                {_recent_comments_sql("p", "$2")} AS recent_comments
             FROM posts p
-            LEFT JOIN comments c ON c.post_id = p.id
+            LEFT JOIN post_comment_activity a ON a.post_id = p.id
             WHERE p.id = ANY($1)
               AND p.last_comment_utc IS NOT NULL
-            GROUP BY p.id, p.title, p.subreddit, p.url,
-                     p.last_comment_utc, p.score, p.num_comments
         )
         SELECT *, recent_comments::float / GREATEST(1, $2) AS velocity
         FROM active
@@ -389,31 +542,9 @@ async def get_threads_activity(
     """
 
     async with pool.acquire() as conn:
-        rows = await conn.fetch(sql, post_ids, float(window_hours))
+        rows = await conn.fetch(sql, post_ids, window_hours)
 
-    threads = [
-        ActiveThread(
-            id=r["id"],
-            title=r["title"],
-            subreddit=r["subreddit"],
-            url=r["url"],
-            last_comment_utc=r["last_comment_utc"],
-            score=r["score"],
-            num_comments=r["num_comments"],
-            recent_comments=int(r["recent_comments"]),
-            velocity=float(r["velocity"]),
-            estimated_impressions=r["score"] * 4 + r["num_comments"] * 100,
-        )
-        for r in rows
-    ]
-
-    total_impressions = sum(t.estimated_impressions for t in threads)
-    return ActiveThreadsResponse(
-        active_count=len(threads),
-        total_estimated_impressions=total_impressions,
-        window_hours=window_hours,
-        threads=threads,
-    )
+    return _active_threads_response(rows, window_hours)
 
 
 async def get_active_threads(
@@ -430,14 +561,15 @@ async def get_active_threads(
     This is relative to the thread's own activity peak (not today's date),
     so it works correctly with Pushshift dump data.
 
+    Window counts come from post_comment_activity.hourly_cum (maintained at
+    ingest time), so comments are only scanned for posts it has no row for.
+
     Velocity = recent_comments / window_hours — higher means faster discussion.
     """
     embedding = await embed_text(query_text)
-    vec = to_pg_vector(embedding)
-    pool = await get_pool()
 
-    sql = """
-        WITH active AS (
+    sql = f"""
+        WITH windowed AS (
             SELECT
                 p.id,
                 p.title,
@@ -446,31 +578,263 @@ async def get_active_threads(
                 p.last_comment_utc,
                 COALESCE(p.score, 0)        AS score,
                 COALESCE(p.num_comments, 0) AS num_comments,
-                COUNT(c.id) FILTER (
-                    WHERE c.created_utc >= p.last_comment_utc - ($3 * INTERVAL '1 hour')
-                ) AS recent_comments
-            FROM posts p
-            JOIN comments c ON c.post_id = p.id
-            WHERE p.embedding IS NOT NULL
-              AND p.embedding <=> $1::vector < $2
+                {_recent_comments_sql("p", "$3")} AS recent_comments
+            FROM (
+                SELECT id, embedding <=> $1::vector AS distance
+                FROM posts
+                WHERE embedding IS NOT NULL
+                ORDER BY embedding <=> $1::vector
+                LIMIT $6
+            ) candidates
+            JOIN posts p ON p.id = candidates.id
+            LEFT JOIN post_comment_activity a ON a.post_id = p.id
+            WHERE candidates.distance < $2
               AND p.last_comment_utc IS NOT NULL
-            GROUP BY p.id, p.title, p.subreddit, p.url,
-                     p.last_comment_utc, p.score, p.num_comments
-            HAVING COUNT(c.id) FILTER (
-                WHERE c.created_utc >= p.last_comment_utc - ($3 * INTERVAL '1 hour')
-            ) >= $4
         )
         SELECT
             *,
             recent_comments::float / GREATEST(1, $3) AS velocity
-        FROM active
+        FROM windowed
+        WHERE recent_comments >= $4
         ORDER BY velocity DESC
         LIMIT $5
     """
 
-    async with pool.acquire() as conn:
-        rows = await conn.fetch(sql, vec, SIMILARITY_THRESHOLD, float(window_hours), min_comments, limit)
+    async with _ann_connection() as conn:
+        rows = await conn.fetch(
+            sql,
+            embedding,
+            SIMILARITY_THRESHOLD,
+            window_hours,
+            min_comments,
+            limit,
+            _candidate_limit(),
+        )
+
+    return _active_threads_response(rows, window_hours)
+
+
+async def get_results_page(
+    query_text: str,
+    top_limit: int = 10,
+    users_limit: int = 50,
+    window_hours: int = 24,
+    min_comments: int = 3,
+    threads_limit: int = 20,
+) -> ResultsPageResponse:
+    """
+    Everything the results page needs in one round trip.
+
+    The matching post set is materialized once in a CTE and the monthly/weekly
+    series, author map, top matches and active threads are all derived from it,
+    instead of each analytics endpoint rescanning `posts` with the same predicate.
+    """
+    embedding = await embed_text(query_text)
+
+    sql = f"""
+        WITH matched AS MATERIALIZED (
+            SELECT *
+            FROM (
+                SELECT
+                    id, title, subreddit, author, url, last_comment_utc,
+                    {_MONTH_BUCKET_SQL}        AS month_bucket,
+                    {_WEEK_BUCKET_SQL}         AS week_bucket,
+                    COALESCE(body, title)      AS body,
+                    COALESCE(score, 0)         AS score,
+                    COALESCE(num_comments, 0)  AS num_comments,
+                    embedding <=> $1::vector   AS distance
+                FROM posts
+                WHERE embedding IS NOT NULL
+                ORDER BY embedding <=> $1::vector
+                LIMIT $8
+            ) candidates
+            WHERE distance < $2
+        ),
+        monthly AS (
+            SELECT month_bucket AS bucket, COUNT(*) AS cnt
+            FROM matched
+            GROUP BY month_bucket
+        ),
+        weekly AS (
+            SELECT week_bucket AS bucket, COUNT(*) AS cnt
+            FROM matched
+            GROUP BY week_bucket
+        ),
+        users AS (
+            SELECT subreddit, author, distance
+            FROM matched
+            WHERE author IS NOT NULL
+              AND author <> '[deleted]'
+              AND author <> 'AutoModerator'
+            ORDER BY distance
+            LIMIT $3
+        ),
+        top_posts AS (
+            SELECT id, subreddit, author, title, body, score, url, 1 - distance AS similarity
+            FROM matched
+            ORDER BY distance
+            LIMIT $4
+        ),
+        top_comments AS (
+            SELECT
+                c.id,
+                p.subreddit,
+                c.author,
+                p.title,
+                c.body,
+                COALESCE(c.score, 0) AS score,
+                1 - ce.distance AS similarity
+            FROM (
+                SELECT comment_id, embedding <=> $1::vector AS distance
+                FROM comment_embeddings
+                ORDER BY embedding <=> $1::vector
+                LIMIT $4
+            ) ce
+            JOIN comments c ON c.id = ce.comment_id
+            LEFT JOIN posts p ON p.id = c.post_id
+            WHERE ce.distance < $2
+        ),
+        windowed AS (
+            SELECT
+                m.id, m.title, m.subreddit, m.url, m.last_comment_utc,
+                m.score, m.num_comments,
+                {_recent_comments_sql("m", "$5")} AS recent_comments
+            FROM matched m
+            LEFT JOIN post_comment_activity a ON a.post_id = m.id
+            WHERE m.last_comment_utc IS NOT NULL
+        ),
+        active_top AS (
+            SELECT *, recent_comments::float / GREATEST(1, $5) AS velocity
+            FROM windowed
+            WHERE recent_comments >= $6
+            ORDER BY velocity DESC
+            LIMIT $7
+        )
+        SELECT
+            (SELECT COALESCE(json_agg(monthly ORDER BY bucket), '[]') FROM monthly)       AS monthly,
+            (SELECT COALESCE(json_agg(weekly ORDER BY bucket), '[]') FROM weekly)         AS weekly,
+            (SELECT COALESCE(json_agg(users ORDER BY distance), '[]') FROM users)         AS users,
+            (SELECT COALESCE(json_agg(top_posts), '[]') FROM top_posts)                   AS top_posts,
+            (SELECT COALESCE(json_agg(top_comments), '[]') FROM top_comments)             AS top_comments,
+            (SELECT COALESCE(json_agg(active_top ORDER BY velocity DESC), '[]') FROM active_top) AS active
+    """
+
+    async with _ann_connection() as conn:
+        row = await conn.fetchrow(
+            sql,
+            embedding,
+            SIMILARITY_THRESHOLD,
+            users_limit,
+            top_limit,
+            window_hours,
+            min_comments,
+            threads_limit,
+            _candidate_limit(),
+        )
+
+    monthly = _monthly_points(json.loads(row["monthly"]))
+    return ResultsPageResponse(
+        mentions=MentionsTrendResponse(points=monthly),
+        growth=GrowthMomentumResponse(
+            weekly=_weekly_points(json.loads(row["weekly"])),
+            monthly=monthly,
+        ),
+        users=SubredditUsersResponse(subreddits=_group_authors(json.loads(row["users"]))),
+        top_matches=TopMatchesResponse(
+            matches=_combine_top_matches(
+                json.loads(row["top_posts"]),
+                json.loads(row["top_comments"]),
+                top_limit,
+            )
+        ),
+        active_threads=_active_threads_response(json.loads(row["active"]), window_hours),
+    )
+
+
+# --- Helpers ---
+
+
+def _monthly_points(rows) -> list[TimePoint]:
+    """Rows of (bucket YYYYMM, cnt) → TimePoints, in row order."""
+    points = []
+    for row in rows:
+        year, month = divmod(int(row["bucket"]), 100)
+        points.append(
+            TimePoint(
+                date=f"{year:04d}-{month:02d}-01",
+                label=_format_month_label(year, month),
+                value=int(row["cnt"]),
+            )
+        )
+    return points
+
+
+def _weekly_points(rows) -> list[TimePoint]:
+    """Rows of (bucket YYYYMMDD of the week's Monday, cnt) → TimePoints, in row order."""
+    points = []
+    for row in rows:
+        year, rest = divmod(int(row["bucket"]), 10_000)
+        month, day = divmod(rest, 100)
+        points.append(
+            TimePoint(
+                date=f"{year:04d}-{month:02d}-{day:02d}",
+                label=_format_week_label(year, month, day),
+                value=int(row["cnt"]),
+            )
+        )
+    return points
+
+
+def _group_authors(rows) -> dict[str, list[str]]:
+    """Rows of (subreddit, author) → { 'r/sub': [author, ...] }, de-duplicated in row order."""
+    subreddits: dict[str, list[str]] = {}
+    seen: set[tuple[str, str]] = set()
+    for row in rows:
+        sub = f"r/{row['subreddit']}"
+        author = row["author"]
+        if (sub, author) not in seen:
+            seen.add((sub, author))
+            subreddits.setdefault(sub, []).append(author)
+    return subreddits
+
+
+def _combine_top_matches(post_rows, comment_rows, limit: int) -> list[TopMatch]:
+    """Merge post and comment matches, sorted by similarity descending, top `limit`."""
+    combined: list[TopMatch] = []
+    for row in post_rows:
+        combined.append(
+            TopMatch(
+                id=row["id"],
+                subreddit=row["subreddit"],
+                author=row["author"],
+                body=(row["body"] or "")[:500],
+                score=row["score"],
+                url=row["url"],
+                similarity=float(row["similarity"]),
+                kind="post",
+                title=row.get("title"),
+            )
+        )
+    for row in comment_rows:
+        combined.append(
+            TopMatch(
+                id=row["id"],
+                subreddit=row["subreddit"],
+                author=row["author"],
+                body=(row["body"] or "")[:500],
+                score=row["score"],
+                url=None,
+                similarity=float(row["similarity"]),
+                kind="comment",
+                title=row.get("title"),
+            )
+        )
+
+    combined.sort(key=lambda m: m.similarity, reverse=True)
+    return combined[:limit]
 
+
+def _active_threads_response(rows, window_hours: int) -> ActiveThreadsResponse:
     threads = [
         ActiveThread(
             id=r["id"],
@@ -496,22 +860,18 @@ async def get_active_threads(
     )
 
 
-# --- Helpers ---
-
 
-def _format_month_label(ym: str) -> str:
-    """Turn '2023-06' → 'Jun 23'."""
+def _format_month_label(year: int, month: int) -> str:
+    """Turn (2023, 6) → 'Jun 23'."""
     try:
-        dt = datetime.strptime(ym, "%Y-%m")
-        return dt.strftime("%b %y")
+        return datetime(year, month, 1).strftime("%b %y")
     except ValueError:
-        return ym
+        return f"{year:04d}-{month:02d}"
 
 
-def _format_week_label(date_str: str) -> str:
-    """Turn '2023-06-05' → 'Jun 05'."""
+def _format_week_label(year: int, month: int, day: int) -> str:
+    """Turn (2023, 6, 5) → 'Jun 05'."""
     try:
-        dt = datetime.strptime(date_str, "%Y-%m-%d")
-        return dt.strftime("%b %d")
+        return datetime(year, month, day).strftime("%b %d")
     except ValueError:
-        return date_str
+        return f"{year:04d}-{month:02d}-{day:02d}"
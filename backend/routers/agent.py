@@ -25,18 +25,19 @@ def agent_status() -> dict:
 
 
 @router.get("/ping")
-def agent_ping() -> dict:
+async def agent_ping() -> dict:
     """
     Send one minimal request to Claude to verify basic connectivity.
     Returns {"ok": true, "message": "Claude is reachable"} on success.
     Use this to confirm the API key works and the app can talk to Claude.
     """
-    from agent.claude_client import complete
+    from agent.claude_client import complete_async
     try:
-        reply = complete(
+        reply = await complete_async(
             system="You are a connectivity test. Reply with exactly: OK",
             user="Say OK.",
             max_tokens=10,
+            timeout=15,
         )
         return {"ok": True, "message": "Claude is reachable", "reply": (reply or "").strip()[:50]}
     except RuntimeError as e:
@@ -49,13 +50,15 @@ def agent_ping() -> dict:
 
 
 @router.post("/run", response_model=AgentResponse)
-def agent_run(request: AgentRequest) -> AgentResponse:
+async def agent_run(request: AgentRequest, no_cache: bool = False) -> AgentResponse:
     """
     Run the agent for one action. Input: AgentRequest. Output: AgentResponse.
-    Actions: enhance_idea (AI Enhance).
+    Actions: enhance_idea (AI Enhance). Runs on the app's event loop, so searches
+    share the asyncpg pool from database.py.
+    Identical requests reuse cached Claude output; pass ?no_cache=true to force a fresh call.
     """
     try:
-        return run(request)
+        return await run(request, use_cache=not no_cache)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except RuntimeError as e:
@@ -2,13 +2,31 @@
 Engage router: endpoints for the engagement campaign feature.
 """
 
+import asyncio
+import json
+from typing import AsyncIterator
+
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
-from agent.claude_client import complete
+from agent.claude_client import complete_async, stream_async
 
 router = APIRouter()
 
+DRAFT_MAX_TOKENS = 300
+DRAFT_TIMEOUT = 30  # seconds per Claude call
+MAX_BATCH_THREADS = 50
+
+_DRAFT_SYSTEM = (
+    "You are writing a Reddit reply where the user is recommending their own product or business to someone in the thread. "
+    "The reply must specifically mention and recommend the exact product/tool the user described — by name if they gave one (e.g. FreeVoice). "
+    "Write as the user: first-person, genuine, helpful (e.g. 'I built...', 'I use X for...', 'Something like [their product] could help because...'). "
+    "Do not recommend other tools or platforms; the reply is about the user's own product fitting the thread. "
+    "Be concise (2-4 sentences), conversational, and natural — not salesy. "
+    "Return only the reply text — no preamble, no quotes around it."
+)
+
 
 class DraftReplyRequest(BaseModel):
     thread_title: str
@@ -20,35 +38,146 @@ class DraftReplyResponse(BaseModel):
     draft: str
 
 
+class DraftThread(BaseModel):
+    thread_title: str
+    thread_subreddit: str
+
+
+class DraftRepliesRequest(BaseModel):
+    query: str  # user's search topic / product idea, shared by every thread
+    threads: list[DraftThread] = Field(min_length=1, max_length=MAX_BATCH_THREADS)
+    stream: bool = False  # True: text/event-stream with one event per thread as it finishes
+
+
+class DraftReplyItem(BaseModel):
+    index: int  # position in the request's threads
+    draft: str | None = None
+    error: str | None = None
+
+
+class DraftRepliesResponse(BaseModel):
+    drafts: list[DraftReplyItem]
+
+
+def _draft_user_message(query: str, thread_title: str, thread_subreddit: str) -> str:
+    return (
+        f"The user's own product/business (they are recommending this in the reply): {query}\n\n"
+        f'Thread they are replying to: r/{thread_subreddit} — "{thread_title}"\n\n'
+        "Write a reply where the user recommends their product above in a natural, helpful way that fits this thread. Mention their product by name or clearly. Do not suggest other tools."
+    )
+
+
+def _http_error(e: Exception) -> HTTPException:
+    """Map a Claude client error to the HTTP error the engage endpoints return."""
+    if isinstance(e, RuntimeError):
+        if "API key" in str(e) or "ANTHROPIC_API_KEY" in str(e):
+            return HTTPException(
+                status_code=503,
+                detail="AI draft not configured (missing ANTHROPIC_API_KEY). Set it in backend .env.",
+            )
+        return HTTPException(status_code=502, detail=str(e))
+    return HTTPException(status_code=502, detail=f"Claude API error: {e!s}")
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
 @router.post("/draft-reply", response_model=DraftReplyResponse)
-def draft_reply(req: DraftReplyRequest) -> DraftReplyResponse:
+async def draft_reply(req: DraftReplyRequest, no_cache: bool = False) -> DraftReplyResponse:
     """
     Generate an AI-drafted Reddit reply where the user recommends their own product.
     Uses Claude with a prompt that centers on the user's input (req.query = business idea/product)
     and writes a first-person reply that mentions/recommends that product in the thread.
+    A repeat of the same thread + query returns the cached draft; ?no_cache=true redrafts.
     """
-    system = (
-        "You are writing a Reddit reply where the user is recommending their own product or business to someone in the thread. "
-        "The reply must specifically mention and recommend the exact product/tool the user described — by name if they gave one (e.g. FreeVoice). "
-        "Write as the user: first-person, genuine, helpful (e.g. 'I built...', 'I use X for...', 'Something like [their product] could help because...'). "
-        "Do not recommend other tools or platforms; the reply is about the user's own product fitting the thread. "
-        "Be concise (2-4 sentences), conversational, and natural — not salesy. "
-        "Return only the reply text — no preamble, no quotes around it."
-    )
-    user = (
-        f"The user's own product/business (they are recommending this in the reply): {req.query}\n\n"
-        f'Thread they are replying to: r/{req.thread_subreddit} — "{req.thread_title}"\n\n'
-        "Write a reply where the user recommends their product above in a natural, helpful way that fits this thread. Mention their product by name or clearly. Do not suggest other tools."
-    )
+    user = _draft_user_message(req.query, req.thread_title, req.thread_subreddit)
     try:
-        draft = complete(system=system, user=user, max_tokens=300)
+        draft = await complete_async(
+            system=_DRAFT_SYSTEM, user=user, max_tokens=DRAFT_MAX_TOKENS, timeout=DRAFT_TIMEOUT,
+            use_cache=not no_cache,
+        )
         return DraftReplyResponse(draft=draft)
-    except RuntimeError as e:
-        if "API key" in str(e) or "ANTHROPIC_API_KEY" in str(e):
-            raise HTTPException(
-                status_code=503,
-                detail="AI draft not configured (missing ANTHROPIC_API_KEY). Set it in backend .env.",
-            )
-        raise HTTPException(status_code=502, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Claude API error: {e!s}")
+        raise _http_error(e)
+
+
+@router.post("/draft-reply/stream")
+async def draft_reply_stream(req: DraftReplyRequest, no_cache: bool = False) -> StreamingResponse:
+    """
+    Same as /draft-reply, streamed as Server-Sent Events while Claude writes:
+      event: delta  data: {"text": "..."}      one per text chunk
+      event: done   data: {"draft": "..."}     the full reply (stripped)
+      event: error  data: {"detail": "..."}    if Claude fails mid-stream
+    Errors before the first chunk (e.g. missing API key) return 503/502 like /draft-reply.
+    A cached draft arrives as a single delta; ?no_cache=true redrafts.
+    """
+    user = _draft_user_message(req.query, req.thread_title, req.thread_subreddit)
+    chunks = stream_async(
+        system=_DRAFT_SYSTEM, user=user, max_tokens=DRAFT_MAX_TOKENS, timeout=DRAFT_TIMEOUT,
+        use_cache=not no_cache,
+    )
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        raise HTTPException(status_code=502, detail="Anthropic returned empty response")
+    except Exception as e:
+        raise _http_error(e)
+
+    async def events() -> AsyncIterator[str]:
+        parts = [first]
+        try:
+            yield _sse("delta", {"text": first})
+            async for text in chunks:
+                parts.append(text)
+                yield _sse("delta", {"text": text})
+            yield _sse("done", {"draft": "".join(parts).strip()})
+        except Exception as e:
+            yield _sse("error", {"detail": _http_error(e).detail})
+        finally:
+            await chunks.aclose()  # releases the concurrency slot if the client disconnects
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+
+@router.post("/draft-replies", response_model=DraftRepliesResponse)
+async def draft_replies(req: DraftRepliesRequest, no_cache: bool = False):
+    """
+    Draft replies for several threads at once. Claude calls run concurrently,
+    bounded by the shared limiter (ANTHROPIC_MAX_CONCURRENCY) that every route uses.
+    A failed thread gets an `error` instead of a `draft`; the others still return.
+    With stream=true the response is Server-Sent Events instead: one
+    `event: draft` (a DraftReplyItem) per thread in completion order, then `event: done`.
+    Threads drafted before (same query) come from the cache; ?no_cache=true redrafts all.
+    """
+
+    async def draft_one(index: int, thread: DraftThread) -> DraftReplyItem:
+        user = _draft_user_message(req.query, thread.thread_title, thread.thread_subreddit)
+        try:
+            draft = await complete_async(
+                system=_DRAFT_SYSTEM, user=user, max_tokens=DRAFT_MAX_TOKENS, timeout=DRAFT_TIMEOUT,
+                use_cache=not no_cache,
+            )
+            return DraftReplyItem(index=index, draft=draft)
+        except Exception as e:
+            return DraftReplyItem(index=index, error=_http_error(e).detail)
+
+    if not req.stream:
+        drafts = await asyncio.gather(*(draft_one(i, t) for i, t in enumerate(req.threads)))
+        return DraftRepliesResponse(drafts=list(drafts))
+
+    async def events() -> AsyncIterator[str]:
+        tasks = [asyncio.create_task(draft_one(i, t)) for i, t in enumerate(req.threads)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                yield _sse("draft", item.model_dump())
+            yield _sse("done", {"count": len(tasks)})
+        finally:
+            for task in tasks:
+                task.cancel()  # client disconnected: stop drafting the rest
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=_SSE_HEADERS)
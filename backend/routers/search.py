@@ -11,6 +11,7 @@ from models import (
     ActiveThreadsResponse,
     GrowthMomentumResponse,
     MentionsTrendResponse,
+    ResultsPageResponse,
     SearchRequest,
     SearchResponse,
     SubredditUsersResponse,
@@ -111,3 +112,30 @@ async def active_threads(
         )
     except RuntimeError as exc:
         raise HTTPException(status_code=503, detail=str(exc))
+
+
+@router.get("/results-page", response_model=ResultsPageResponse)
+async def results_page(
+    q: str = Query(..., description="Search query"),
+    top_limit: int = Query(default=10, ge=1, le=50),
+    users_limit: int = Query(default=50, ge=1, le=200),
+    window_hours: int = Query(default=24, ge=1, le=720, description="Activity window in hours"),
+    min_comments: int = Query(default=3, ge=1, description="Minimum comments within the window"),
+    threads_limit: int = Query(default=20, ge=1, le=50),
+) -> ResultsPageResponse:
+    """
+    All results-page analytics (mentions, growth, users, top matches, active threads)
+    computed from a single scan of the matching posts.
+    """
+    _require_pool()
+    try:
+        return await posts_repo.get_results_page(
+            query_text=q,
+            top_limit=top_limit,
+            users_limit=users_limit,
+            window_hours=window_hours,
+            min_comments=min_comments,
+            threads_limit=threads_limit,
+        )
+    except RuntimeError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
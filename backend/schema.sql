@@ -28,7 +28,11 @@ CREATE TABLE IF NOT EXISTS posts (
   activity_ratio       FLOAT,
   embedding            vector(768),
   embedded_at          TIMESTAMP,
-  reconstructed_text   TEXT
+  reconstructed_text   TEXT,
+  -- Integer time buckets for trend queries, filled at insert time by ingest.py:
+  --   month_bucket = YYYYMM, week_bucket = YYYYMMDD of the week's Monday
+  month_bucket         INTEGER,
+  week_bucket          INTEGER
 );
 
 CREATE TABLE IF NOT EXISTS comments (
@@ -51,6 +55,54 @@ CREATE TABLE IF NOT EXISTS comment_embeddings (
   embedded_at TIMESTAMP NOT NULL DEFAULT NOW()
 );
 
+-- Comments whose post has not been imported yet (ingest.py --park-orphans).
+-- No FK to posts on purpose; ingest.py moves them into comments once the post exists.
+CREATE TABLE IF NOT EXISTS orphan_comments (
+  id               TEXT PRIMARY KEY,
+  post_id          TEXT NOT NULL,
+  parent_id        TEXT,
+  parent_type      TEXT,
+  author           TEXT,
+  body             TEXT NOT NULL,
+  created_utc      TIMESTAMP NOT NULL,
+  score            INTEGER,
+  controversiality INTEGER,
+  parked_at        TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Per-post comment-activity windows, maintained by ingest.py's update_activity_stats:
+-- hourly_cum[h] = comments posted within h hours before posts.last_comment_utc
+-- (h = 1..720, truncated after the oldest comment's hour). The active-thread
+-- queries read hourly_cum[LEAST(window_hours, cardinality(hourly_cum))].
+CREATE TABLE IF NOT EXISTS post_comment_activity (
+  post_id     TEXT PRIMARY KEY REFERENCES posts(id) ON DELETE CASCADE,
+  hourly_cum  INTEGER[] NOT NULL
+);
+
+-- Vectors of texts ingest.py has already embedded, keyed on sha256 of the text and
+-- the backend/model/dim that produced them (embedding_model_id()), so duplicate texts (crossposts, reposted
+-- titles, boilerplate comments) are copied instead of re-encoded.
+CREATE TABLE IF NOT EXISTS embedding_cache (
+  content_hash BYTEA     NOT NULL,
+  model        TEXT      NOT NULL,
+  dim          INTEGER   NOT NULL,
+  embedding    vector    NOT NULL,
+  created_at   TIMESTAMP NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (content_hash, model)
+);
+
+-- Claude responses for the agent/engage routes when LLM_CACHE_DB=1, keyed on
+-- sha256(system prompt, user message, model, temperature, max_tokens).
+-- Expired rows are ignored and overwritten; prune with
+--   DELETE FROM llm_cache WHERE expires_at <= NOW();
+CREATE TABLE IF NOT EXISTS llm_cache (
+  prompt_hash  BYTEA PRIMARY KEY,
+  model        TEXT      NOT NULL,
+  response     TEXT      NOT NULL,
+  created_at   TIMESTAMP NOT NULL DEFAULT NOW(),
+  expires_at   TIMESTAMP NOT NULL
+);
+
 CREATE TABLE IF NOT EXISTS alerts (
   id               UUID PRIMARY KEY DEFAULT gen_random_uuid(),
   user_email       TEXT NOT NULL,
@@ -63,7 +115,8 @@ CREATE TABLE IF NOT EXISTS alerts (
 -- ── Indexes ───────────────────────────────────────────────────────────────────
 
 -- HNSW indexes for fast approximate nearest-neighbour search (pgvector >= 0.5).
--- Build these AFTER bulk data load for best performance.
+-- Build these AFTER bulk data load for best performance
+-- (ingest.py --defer-indexes drops them for the load and builds them once at the end).
 -- m=16 and ef_construction=64 are solid defaults for up to a few million rows.
 CREATE INDEX IF NOT EXISTS posts_embedding_hnsw
     ON posts USING hnsw (embedding vector_cosine_ops)
@@ -79,3 +132,4 @@ CREATE INDEX IF NOT EXISTS posts_created_utc_idx ON posts (created_utc);
 CREATE INDEX IF NOT EXISTS posts_activity_ratio_idx ON posts (activity_ratio DESC NULLS LAST);
 CREATE INDEX IF NOT EXISTS comments_post_id_idx ON comments (post_id);
 CREATE INDEX IF NOT EXISTS comments_created_utc_idx ON comments (created_utc);
+CREATE INDEX IF NOT EXISTS orphan_comments_post_id_idx ON orphan_comments (post_id);
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Backend modules import each other as top-level packages (models, repositories, agent)
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Postgres with pgvector for the tests that run real SQL; they are skipped without it.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "").strip()
+
+
+async def _connect(**kwargs):
+    import asyncpg
+
+    return await asyncpg.connect(TEST_DATABASE_URL, **kwargs)
+
+
+@pytest.fixture
+def pg(monkeypatch):
+    """
+    A throwaway Postgres schema built from schema.sql.  Returns run(body, **settings):
+    opens a pool on that schema (vector codec registered, installed as
+    database._pool, extra server settings such as enable_seqscan="off" applied),
+    awaits body(pool) on a fresh event loop and returns its result.
+    """
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    import asyncpg
+
+    import database
+
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+
+    async def create() -> None:
+        conn = await _connect()
+        try:
+            await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+            await conn.execute(f"CREATE SCHEMA {schema}")
+            await conn.execute(f"SET search_path TO {schema}, public")
+            await conn.execute((BACKEND_DIR / "schema.sql").read_text())
+        finally:
+            await conn.close()
+
+    async def drop() -> None:
+        conn = await _connect()
+        try:
+            await conn.execute(f"DROP SCHEMA {schema} CASCADE")
+        finally:
+            await conn.close()
+
+    def run(body, **settings):
+        async def main():
+            pool = await asyncpg.create_pool(
+                TEST_DATABASE_URL,
+                min_size=1,
+                max_size=4,
+                server_settings={"search_path": f"{schema}, public", **settings},
+                init=database.register_vector_codec,
+            )
+            monkeypatch.setattr(database, "_pool", pool)
+            try:
+                return await body(pool)
+            finally:
+                await pool.close()
+
+        return asyncio.run(main())
+
+    asyncio.run(create())
+    try:
+        yield run
+    finally:
+        asyncio.run(drop())
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import types
+
+import pytest
+
+from agent import claude_client as cc
+
+
+class FakeClock:
+    """Stands in for the `time` module inside agent.claude_client."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class StubMessages:
+    """messages.create() of a stub AsyncAnthropic: replies come from a queue or a function."""
+
+    def __init__(self, replies) -> None:
+        self.replies = replies
+        self.calls: list[dict] = []
+        self.release: asyncio.Event | None = None
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.release is not None:
+            await self.release.wait()
+        text = self.replies(kwargs) if callable(self.replies) else self.replies.pop(0)
+        return types.SimpleNamespace(content=[types.SimpleNamespace(text=text)])
+
+
+@pytest.fixture
+def claude(monkeypatch):
+    """Route the async helpers to a stub client and give them an empty in-memory cache."""
+    messages = StubMessages(lambda kwargs: json.dumps({"echo": kwargs["messages"][0]["content"]}))
+    client = types.SimpleNamespace(messages=messages)
+    monkeypatch.setattr(cc, "_get_async_client", lambda: (client, asyncio.Semaphore(4)))
+    monkeypatch.setattr(cc, "_response_cache", cc._ResponseCache(maxsize=8, ttl=60, use_db=False))
+    return messages
+
+
+# ── _ResponseCache ───────────────────────────────────────────────────────────
+
+
+def test_response_cache_lru_eviction():
+    cache = cc._ResponseCache(maxsize=2, ttl=60, use_db=False)
+    computed = []
+
+    def compute_for(key):
+        async def compute():
+            computed.append(key)
+            return f"reply {key}"
+        return compute
+
+    async def main():
+        for key in (b"a", b"b", b"a", b"c", b"a", b"b"):  # "c" evicts "b", the least recent
+            await cache.get_or_compute(key, "m", compute_for(key))
+
+    asyncio.run(main())
+    assert computed == [b"a", b"b", b"c", b"b"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 4, 2)
+
+
+def test_response_cache_ttl_expiry(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cc, "time", clock)
+    cache = cc._ResponseCache(maxsize=8, ttl=10, use_db=False)
+    calls = []
+
+    async def compute():
+        calls.append(clock.now)
+        return "reply"
+
+    async def main():
+        await cache.get_or_compute(b"k", "m", compute)
+        clock.now += 9
+        await cache.get_or_compute(b"k", "m", compute)
+        clock.now += 2
+        await cache.get_or_compute(b"k", "m", compute)
+
+    asyncio.run(main())
+    assert calls == [1000.0, 1011.0]
+
+
+# ── complete_json_async ──────────────────────────────────────────────────────
+
+
+def test_complete_json_async_caches_on_prompt_and_settings(claude):
+    async def main():
+        first = await cc.complete_json_async("sys", "idea", use_cache=True)
+        again = await cc.complete_json_async("sys", "idea", use_cache=True)
+        warmer = await cc.complete_json_async("sys", "idea", temperature=0.7, use_cache=True)
+        uncached = await cc.complete_json_async("sys", "idea")
+        return first, again, warmer, uncached
+
+    first, again, warmer, uncached = asyncio.run(main())
+    assert first == again == warmer == uncached == {"echo": "idea"}
+    assert [c["temperature"] for c in claude.calls] == [cc.TEMPERATURE, 0.7, cc.TEMPERATURE]
+
+
+def test_complete_json_async_coalesces_identical_inflight_calls(claude):
+    async def main():
+        claude.release = asyncio.Event()
+        tasks = [
+            asyncio.create_task(cc.complete_json_async("sys", "idea", use_cache=True)) for _ in range(5)
+        ]
+        await asyncio.sleep(0)
+        claude.release.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(main())
+    assert len(claude.calls) == 1
+    assert results == [{"echo": "idea"}] * 5
+    assert cc.get_llm_cache_stats()["coalesced"] == 4
+
+
+def test_complete_json_async_never_caches_invalid_json(claude):
+    claude.replies = ["Sure! Here is the JSON you asked for:", '{"ok": true}']
+
+    async def main():
+        with pytest.raises(ValueError):
+            await cc.complete_json_async("sys", "idea", use_cache=True)
+        second = await cc.complete_json_async("sys", "idea", use_cache=True)
+        third = await cc.complete_json_async("sys", "idea", use_cache=True)
+        return second, third
+
+    second, third = asyncio.run(main())
+    assert second == third == {"ok": True}
+    assert len(claude.calls) == 2
+    assert cc.get_llm_cache_stats()["size"] == 1
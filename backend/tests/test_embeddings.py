@@ -0,0 +1,432 @@
+import asyncio
+import os
+import sys
+import threading
+import types
+
+import numpy as np
+import pytest
+
+from repositories import embeddings as emb
+
+
+class FakeClock:
+    """Stands in for the `time` module inside repositories.embeddings."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def _vec(value: float) -> np.ndarray:
+    return np.full(4, value, dtype=np.float32)
+
+
+# ── _QueryEmbeddingCache ─────────────────────────────────────────────────────
+
+
+def test_query_cache_hit_and_lru_eviction():
+    cache = emb._QueryEmbeddingCache(maxsize=2, ttl=60)
+    computed = []
+
+    def compute_for(key):
+        async def compute():
+            computed.append(key)
+            return _vec(len(computed))
+        return compute
+
+    async def main():
+        await cache.get_or_compute(("a",), compute_for("a"))
+        await cache.get_or_compute(("b",), compute_for("b"))
+        await cache.get_or_compute(("a",), compute_for("a"))  # hit; "b" is now least recent
+        await cache.get_or_compute(("c",), compute_for("c"))  # evicts "b"
+        await cache.get_or_compute(("a",), compute_for("a"))
+        await cache.get_or_compute(("b",), compute_for("b"))
+
+    asyncio.run(main())
+    assert computed == ["a", "b", "c", "b"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 4, 2)
+
+
+def test_query_cache_ttl_expiry(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(emb, "time", clock)
+    cache = emb._QueryEmbeddingCache(maxsize=8, ttl=10)
+    calls = []
+
+    async def compute():
+        calls.append(clock.now)
+        return _vec(1)
+
+    async def main():
+        await cache.get_or_compute(("q",), compute)
+        clock.now += 9
+        await cache.get_or_compute(("q",), compute)
+        clock.now += 2
+        await cache.get_or_compute(("q",), compute)
+
+    asyncio.run(main())
+    assert calls == [1000.0, 1011.0]
+
+
+def test_query_cache_coalesces_inflight_calls():
+    cache = emb._QueryEmbeddingCache(maxsize=8, ttl=60)
+    calls = 0
+
+    async def main():
+        release = asyncio.Event()
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return _vec(7)
+
+        tasks = [asyncio.create_task(cache.get_or_compute(("q",), compute)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(main())
+    assert calls == 1
+    assert all(np.array_equal(r, _vec(7)) for r in results)
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_query_cache_errors_propagate_and_are_not_cached():
+    cache = emb._QueryEmbeddingCache(maxsize=8, ttl=60)
+    attempts = 0
+
+    async def main():
+        release = asyncio.Event()
+
+        async def failing():
+            nonlocal attempts
+            attempts += 1
+            await release.wait()
+            raise RuntimeError("encoder down")
+
+        tasks = [asyncio.create_task(cache.get_or_compute(("q",), failing)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        async def ok():
+            return _vec(1)
+
+        return results, await cache.get_or_compute(("q",), ok)
+
+    results, recovered = asyncio.run(main())
+    assert attempts == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert np.array_equal(recovered, _vec(1))
+    assert cache.stats()["misses"] == 2
+
+
+def test_query_cache_cancelled_caller_does_not_cancel_shared_encode():
+    cache = emb._QueryEmbeddingCache(maxsize=8, ttl=60)
+
+    async def main():
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            return _vec(3)
+
+        first = asyncio.create_task(cache.get_or_compute(("q",), compute))
+        second = asyncio.create_task(cache.get_or_compute(("q",), compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        return await second
+
+    assert np.array_equal(asyncio.run(main()), _vec(3))
+
+
+# ── _MicroBatcher ────────────────────────────────────────────────────────────
+
+
+def _stub_encoder(monkeypatch, fail_on: str | None = None) -> list[list[str]]:
+    batches: list[list[str]] = []
+    lock = threading.Lock()
+
+    def encode(texts):
+        with lock:
+            batches.append(list(texts))
+        if fail_on is not None and fail_on in texts:
+            raise ValueError(f"cannot encode {fail_on}")
+        return [_vec(float(t.split("-")[-1])) for t in texts]
+
+    monkeypatch.setattr(emb, "_encode_cpu", encode)
+    return batches
+
+
+def test_microbatcher_splits_at_max_batch(monkeypatch):
+    batches = _stub_encoder(monkeypatch)
+
+    async def main():
+        batcher = emb._MicroBatcher(max_batch=3, max_wait=0.05)
+        return await asyncio.gather(*(batcher.encode(f"q-{i}") for i in range(7)))
+
+    vecs = asyncio.run(main())
+    assert [len(b) for b in batches] == [3, 3, 1]
+    assert sorted(t for b in batches for t in b) == sorted(f"q-{i}" for i in range(7))
+    assert [float(v[0]) for v in vecs] == [float(i) for i in range(7)]
+
+
+def test_microbatcher_error_reaches_every_caller_in_the_batch(monkeypatch):
+    batches = _stub_encoder(monkeypatch, fail_on="q-1")
+
+    async def main():
+        batcher = emb._MicroBatcher(max_batch=8, max_wait=0.05)
+        results = await asyncio.gather(
+            *(batcher.encode(f"q-{i}") for i in range(3)), return_exceptions=True,
+        )
+        return results, await batcher.encode("q-5")
+
+    results, after = asyncio.run(main())
+    assert len(batches) == 2
+    assert all(isinstance(r, ValueError) for r in results)
+    assert float(after[0]) == 5.0
+
+
+# ── embed_text ───────────────────────────────────────────────────────────────
+
+
+@pytest.fixture
+def cpu_query_path(monkeypatch):
+    """embed_text on the local backend with a stub encoder and an empty cache."""
+    monkeypatch.setattr(emb, "_BACKEND", "local")
+    monkeypatch.setattr(emb, "_QUERY_CACHE_SIZE", 16)
+    monkeypatch.setattr(emb, "_MICROBATCH_MAX_SIZE", 8)
+    monkeypatch.setattr(emb, "_query_cache", emb._QueryEmbeddingCache(16, 60))
+    encoded: list[str] = []
+
+    def encode(texts):
+        encoded.extend(texts)
+        return [_vec(len(t)) for t in texts]
+
+    monkeypatch.setattr(emb, "_encode_cpu", encode)
+    return encoded
+
+
+def test_embed_text_encodes_stripped_text_and_caches_on_normalized_key(cpu_query_path):
+    async def main():
+        first = await emb.embed_text("  invoice   reminders \n")
+        second = await emb.embed_text("invoice reminders")
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert cpu_query_path == ["invoice   reminders"]
+    assert first is second
+    assert not first.flags.writeable
+
+
+def test_embed_text_concurrent_identical_queries_encode_once(cpu_query_path):
+    async def main():
+        return await asyncio.gather(*(emb.embed_text("late invoices") for _ in range(10)))
+
+    vecs = asyncio.run(main())
+    assert cpu_query_path == ["late invoices"]
+    assert all(v is vecs[0] for v in vecs)
+
+
+# ── _quantized_copy ──────────────────────────────────────────────────────────
+
+
+def test_quantized_copy_is_keyed_on_the_source_model(tmp_path, monkeypatch):
+    quantized: list[str] = []
+
+    def quantize_dynamic(src, dst, weight_type):
+        quantized.append(src)
+        with open(dst, "w") as fh:
+            fh.write(f"int8 of {src}")
+
+    quantization = types.ModuleType("onnxruntime.quantization")
+    quantization.QuantType = types.SimpleNamespace(QInt8="QInt8")
+    quantization.quantize_dynamic = quantize_dynamic
+    monkeypatch.setitem(sys.modules, "onnxruntime", types.ModuleType("onnxruntime"))
+    monkeypatch.setitem(sys.modules, "onnxruntime.quantization", quantization)
+    monkeypatch.setattr(emb, "_ONNX_CACHE_DIR", tmp_path / "cache")
+
+    a, b = tmp_path / "a" / "model.onnx", tmp_path / "b" / "model.onnx"
+    for model in (a, b):
+        model.parent.mkdir()
+        model.write_text("fp32")
+
+    copy_a = emb._quantized_copy(a)
+    assert emb._quantized_copy(a) == copy_a
+    copy_b = emb._quantized_copy(b)
+    assert copy_b != copy_a
+
+    # Re-exporting a model in place invalidates its quantized copy
+    st = a.stat()
+    os.utime(a, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert emb._quantized_copy(a) not in (copy_a, copy_b)
+    assert quantized == [str(a), str(b), str(a)]
+
+
+# ── _OpenAIRateLimiter ───────────────────────────────────────────────────────
+
+
+@pytest.fixture
+def fake_time(monkeypatch):
+    """A FakeClock for the limiter; asyncio.sleep advances it instead of waiting."""
+    clock = FakeClock()
+    clock.sleeps = []
+    real_sleep = asyncio.sleep
+    monkeypatch.setattr(emb, "time", clock)
+
+    async def sleep(seconds, result=None):
+        if seconds > 0:
+            clock.sleeps.append(round(seconds, 3))
+            clock.now += seconds
+        return await real_sleep(0, result)
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    return clock
+
+
+def test_limiter_waits_for_request_budget(fake_time):
+    async def main():
+        limiter = emb._OpenAIRateLimiter(rpm=60, tpm=10**6, max_concurrency=4)
+        for _ in range(60):
+            reserved = await limiter.acquire(10)
+            limiter.on_success({}, reserved, None)
+        assert fake_time.sleeps == []
+        await limiter.acquire(10)  # the 61st request in the same minute
+
+    asyncio.run(main())
+    assert fake_time.sleeps == [1.0]  # one request's worth of refill at 60/min
+
+
+def test_limiter_waits_for_token_budget_and_corrects_estimates(fake_time):
+    async def main():
+        limiter = emb._OpenAIRateLimiter(rpm=10_000, tpm=6_000, max_concurrency=4)
+        reserved = await limiter.acquire(1_000)
+        limiter.on_success({}, reserved, used_tokens=3_000)  # estimate was 2000 short
+        reserved = await limiter.acquire(3_000)
+        limiter.on_success({}, reserved, None)
+        await limiter.acquire(3_000)
+
+    asyncio.run(main())
+    assert fake_time.sleeps == [30.0]  # 3000 tokens at 100 tokens/s
+
+
+def test_limiter_caps_budget_from_response_headers(fake_time):
+    async def main():
+        limiter = emb._OpenAIRateLimiter(rpm=600, tpm=60_000, max_concurrency=4)
+        reserved = await limiter.acquire(100)
+        limiter.on_success(
+            {"x-ratelimit-remaining-requests": "0", "x-ratelimit-remaining-tokens": "50000"},
+            reserved, None,
+        )
+        await limiter.acquire(100)
+
+    asyncio.run(main())
+    assert fake_time.sleeps == [0.1]  # the server said no requests left
+
+
+def test_limiter_blocks_beyond_concurrency_limit(fake_time):
+    async def main():
+        limiter = emb._OpenAIRateLimiter(rpm=10_000, tpm=10**6, max_concurrency=8)
+        tasks = [asyncio.create_task(limiter.acquire(1)) for _ in range(3)]
+        for _ in range(5):
+            await asyncio.sleep(0)
+        admitted = sum(t.done() for t in tasks)
+        limiter.on_success({}, 1, None)
+        await asyncio.gather(*tasks)
+        return admitted, limiter.stats()
+
+    admitted, stats = asyncio.run(main())
+    assert admitted == 2  # concurrency starts at min(2, max_concurrency)
+    assert stats["active"] == 2
+
+
+def test_limiter_halves_on_429_pauses_and_recovers(fake_time):
+    async def main():
+        limiter = emb._OpenAIRateLimiter(rpm=10_000, tpm=10**6, max_concurrency=8)
+
+        async def succeed(headers=None):
+            reserved = await limiter.acquire(1)
+            limiter.on_success(headers or {}, reserved, None)
+
+        for _ in range(5):  # 2 successes → limit 3, 3 more → limit 4
+            await succeed()
+        grown = limiter.limit
+
+        await limiter.acquire(1)
+        pause = limiter.on_rate_limited({"retry-after-ms": "2500"})
+        shrunk = limiter.limit
+        await succeed()  # admitted only after the server's retry-after
+        paused = list(fake_time.sleeps)
+
+        # No growth while the server reports less than 10% of the token budget left
+        for _ in range(4):
+            await succeed({"x-ratelimit-remaining-tokens": "1000"})
+        starved = limiter.limit
+        await succeed()
+        return grown, pause, shrunk, paused, starved, limiter.limit, limiter.stats()
+
+    grown, pause, shrunk, paused, starved, recovered, stats = asyncio.run(main())
+    assert (grown, shrunk) == (4, 2)
+    assert pause == 2.5 and paused == [2.5]
+    assert starved == 2
+    assert recovered == 3
+    assert stats["rate_limited"] == 1
+
+
+def test_encode_openai_retries_after_429(fake_time, monkeypatch):
+    openai = pytest.importorskip("openai")
+    httpx = pytest.importorskip("httpx")
+    calls: list[list[str]] = []
+
+    class Raw:
+        headers = {"x-ratelimit-remaining-tokens": "900000"}
+
+        def __init__(self, texts):
+            self._texts = texts
+
+        def parse(self):
+            data = [types.SimpleNamespace(index=i, embedding=[float(len(t))] * 3) for i, t in enumerate(self._texts)]
+            return types.SimpleNamespace(data=data[::-1], usage=types.SimpleNamespace(prompt_tokens=7))
+
+    async def create(model, input):
+        calls.append(input)
+        if len(calls) == 1:
+            response = httpx.Response(
+                429, headers={"retry-after-ms": "1500"},
+                request=httpx.Request("POST", "https://api.openai.com/v1/embeddings"),
+            )
+            raise openai.RateLimitError("rate limited", response=response, body=None)
+        return Raw(input)
+
+    client = types.SimpleNamespace(
+        embeddings=types.SimpleNamespace(with_raw_response=types.SimpleNamespace(create=create)),
+    )
+    monkeypatch.setattr(emb, "_get_openai", lambda: client)
+
+    async def main():
+        vecs = await emb._encode_openai(["ab", "abcd"])
+        return vecs, emb.get_openai_limiter_stats()
+
+    vecs, stats = asyncio.run(main())
+    assert len(calls) == 2
+    assert [v.tolist() for v in vecs] == [[2.0] * 3, [4.0] * 3]
+    assert fake_time.sleeps == [1.5]
+    # Halved to 1 by the 429, then back to 2 after one success with headroom
+    assert (stats["rate_limited"], stats["concurrency"], stats["active"]) == (1, 2, 0)
+
+
+def test_embedding_model_id_distinguishes_dimensions(monkeypatch):
+    monkeypatch.setattr(emb, "_BACKEND", "local")
+    monkeypatch.setattr(emb, "EMBEDDING_DIM", 768)
+    full = emb.embedding_model_id()
+    monkeypatch.setattr(emb, "EMBEDDING_DIM", 256)
+    assert emb.embedding_model_id() != full
+    monkeypatch.setattr(emb, "_BACKEND", "onnx")
+    monkeypatch.setattr(emb, "_ONNX_QUANTIZE", True)
+    assert emb.embedding_model_id().endswith(":256:int8")
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from agent.schemas import AgentRequest, RetrievalContext, RetrievalMatch
+from agent.skills import enhance_idea
+
+
+def _match(match_id: str, similarity: float) -> RetrievalMatch:
+    return RetrievalMatch(
+        id=match_id, title=match_id, text=f"thread {match_id}", source="reddit",
+        metadata={"similarity": similarity},
+    )
+
+
+class StubRetriever:
+    """Traction per query text; the single-query search yields a few times to expose ordering."""
+
+    def __init__(self, events: list[str], traction: dict[str, float], fail: bool = False) -> None:
+        self.events = events
+        self.traction = traction
+        self.fail = fail
+        self.batches: list[list[str]] = []
+
+    async def get_matches(self, query: str, limit: int = 20) -> list[RetrievalMatch]:
+        self.events.append("search:start")
+        for _ in range(3):
+            await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("DATABASE_URL is not set")
+        self.events.append("search:end")
+        return [_match(query, self.traction[query])]
+
+    async def get_matches_batch(self, queries: list[str], limit: int = 20) -> list[list[RetrievalMatch]]:
+        self.batches.append(list(queries))
+        return [[_match(q, self.traction[q])] for q in queries]
+
+
+@pytest.fixture
+def stub_llm(monkeypatch):
+    """
+    complete_json_async stand-in returning variants A, B, C in Claude's order.
+    It outlasts the stub search, so "llm:end" is only logged if it isn't cancelled.
+    """
+    events: list[str] = []
+    prompts: list[str] = []
+
+    async def complete_json_async(system, user, use_cache=False):
+        events.append("llm:start")
+        prompts.append(user)
+        for _ in range(5):
+            await asyncio.sleep(0)
+        events.append("llm:end")
+        return {
+            "outputs": {
+                "variants": [
+                    {"enhanced_idea_text": text, "rationale": f"why {text}"} for text in ("A", "B", "C")
+                ],
+            },
+        }
+
+    monkeypatch.setattr(enhance_idea, "complete_json_async", complete_json_async)
+    return events, prompts
+
+
+def _request(matches: list[RetrievalMatch] | None = None) -> AgentRequest:
+    return AgentRequest(
+        action="enhance_idea",
+        idea_text="invoice reminders",
+        retrieval=RetrievalContext(matches=matches or []),
+    )
+
+
+def test_llm_starts_before_search_and_first_better_variant_wins(monkeypatch, stub_llm):
+    events, prompts = stub_llm
+    # B is the first variant (in Claude's order) that beats the original; C is better still
+    retriever = StubRetriever(events, {"invoice reminders": 1.0, "A": 0.5, "B": 1.5, "C": 2.0})
+    monkeypatch.setattr(enhance_idea, "_retriever", retriever)
+
+    response = asyncio.run(enhance_idea._run_with_db(_request([_match("own-thread", 0.9)])))
+
+    assert events.index("llm:start") < events.index("search:end")
+    assert "own-thread" in prompts[0]
+    assert retriever.batches == [["A", "B", "C"]]
+    assert response.outputs["suggested"] is True
+    assert response.outputs["enhanced_idea_text"] == "B"
+    assert response.outputs["enhanced_traction"] == 1.5
+    assert response.outputs["original_traction"] == 1.0
+    assert response.outputs["variants_tested"] == 3
+
+
+def test_llm_is_not_held_back_for_requests_without_matches(monkeypatch, stub_llm):
+    events, prompts = stub_llm
+    retriever = StubRetriever(events, {"invoice reminders": 3.0, "A": 0.5, "B": 1.5, "C": 2.0})
+    monkeypatch.setattr(enhance_idea, "_retriever", retriever)
+
+    response = asyncio.run(enhance_idea._run_with_db(_request()))
+
+    assert events.index("llm:start") < events.index("search:end")
+    assert "No retrieval matches provided." in prompts[0]
+    assert response.outputs["suggested"] is False
+    assert response.outputs["enhanced_idea_text"] is None
+
+
+def test_search_failure_cancels_the_llm_call(monkeypatch, stub_llm):
+    events, _ = stub_llm
+    monkeypatch.setattr(enhance_idea, "_retriever", StubRetriever(events, {}, fail=True))
+
+    assert asyncio.run(enhance_idea._run_with_db(_request())) is None
+    assert "llm:start" in events
+    assert "llm:end" not in events
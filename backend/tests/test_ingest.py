@@ -0,0 +1,169 @@
+import io
+import json
+import random
+from datetime import datetime
+
+import pytest
+import zstandard as zstd
+
+import ingest
+
+
+def _expected_lines(data: bytes) -> list[bytes]:
+    lines = data.split(b"\n")
+    return lines[:-1] if data.endswith(b"\n") else lines
+
+
+# ── _split_lines ─────────────────────────────────────────────────────────────
+
+
+@pytest.mark.parametrize("read_size", [1, 2, 3, 7, 64, 1 << 20])
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"\n",
+        b"one\ntwo\nthree\n",
+        b"no trailing newline",
+        b"a\n\n\nb\n",
+        b"x" * 200 + b"\nshort\n" + b"y" * 150,
+    ],
+)
+def test_split_lines_matches_split(data, read_size):
+    got = list(ingest._split_lines(io.BytesIO(data), read_size))
+    assert got == (_expected_lines(data) if data else [])
+
+
+def test_split_lines_random_chunking():
+    rng = random.Random(8)
+    for _ in range(200):
+        data = b"".join(
+            rng.choice([b"\n", b"{}", b"abc", b"z" * rng.randint(0, 40)]) for _ in range(rng.randint(0, 30))
+        )
+        got = list(ingest._split_lines(io.BytesIO(data), rng.randint(1, 16)))
+        assert got == (_expected_lines(data) if data else [])
+
+
+# ── load_zst_index / ZstCursor ───────────────────────────────────────────────
+
+
+def _keep_even(obj):
+    return obj if obj["i"] % 2 == 0 else None
+
+
+def _ndjson(n: int) -> bytes:
+    lines = []
+    for i in range(n):
+        lines.append(json.dumps({"i": i, "pad": "x" * (i % 17)}))
+        if i % 9 == 0:
+            lines += ["", "{broken"]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def _write_frames(path, data: bytes, cuts: list[int]) -> list[int]:
+    """Compress data[cut_k:cut_k+1] as separate frames; returns each frame's decompressed start."""
+    bounds = [0, *cuts, len(data)]
+    with open(path, "wb") as fh:
+        for i, (a, b) in enumerate(zip(bounds, bounds[1:])):
+            # Alternate frames with and without a content size in the header
+            cctx = zstd.ZstdCompressor(write_content_size=i % 2 == 0)
+            fh.write(cctx.compress(data[a:b]))
+    return bounds[:-1]
+
+
+@pytest.fixture
+def multi_frame_zst(tmp_path):
+    data = _ndjson(400)
+    # Frame boundaries fall mid-line, so lines span frames
+    cuts = [len(data) // 5 + 3, len(data) // 2 + 1, 3 * len(data) // 4 + 7]
+    path = tmp_path / "RS_test.zst"
+    starts = _write_frames(path, data, cuts)
+    return str(path), starts
+
+
+def test_load_zst_index_measures_frames_and_caches_sidecar(multi_frame_zst, monkeypatch):
+    path, starts = multi_frame_zst
+    index = ingest.load_zst_index(path)
+    assert [start for _, start in index] == starts
+    assert index[0][0] == 0
+
+    def no_rescan(_path):
+        raise AssertionError("index should come from the sidecar")
+
+    monkeypatch.setattr(ingest, "zst_frame_offsets", no_rescan)
+    assert ingest.load_zst_index(path) == index
+
+
+def test_zst_cursor_resumes_from_checkpoints(multi_frame_zst):
+    path, _ = multi_frame_zst
+    expected = [r for r in map(_keep_even, ingest.iter_zst(path)) if r]
+
+    for step in (1, 7, 50, 1000):
+        got: list[dict] = []
+        position = 0
+        while True:
+            cursor = ingest.ZstCursor(path, position, read_size=64)
+            batch = cursor.take(step, _keep_even)
+            position = cursor.position
+            cursor.close()
+            if not batch:
+                break
+            got += batch
+        assert got == expected, step
+
+
+def test_zst_cursor_skip_then_take(multi_frame_zst):
+    path, _ = multi_frame_zst
+    expected = [r for r in map(_keep_even, ingest.iter_zst(path)) if r]
+
+    cursor = ingest.ZstCursor(path)
+    assert cursor.skip(25, _keep_even) == 25
+    checkpoint = cursor.position
+    cursor.close()
+
+    cursor = ingest.ZstCursor(path, checkpoint)
+    assert cursor.take(10, _keep_even) == expected[25:35]
+    assert cursor.skip(10_000, _keep_even) == len(expected) - 35
+    cursor.close()
+
+
+# ── insert_comments ──────────────────────────────────────────────────────────
+
+
+def _post(post_id: str) -> dict:
+    return ingest.extract_post({
+        "id": post_id, "title": f"Post {post_id}", "author": "op",
+        "created_utc": 1_700_000_000, "subreddit": "test",
+    })
+
+
+def _comment(comment_id: str, post_id: str) -> dict:
+    return {
+        "id": comment_id, "post_id": post_id, "parent_id": post_id, "parent_type": "post",
+        "author": "someone", "body": f"comment {comment_id}", "created_utc": datetime(2023, 11, 15),
+        "score": 1, "controversiality": 0,
+    }
+
+
+def test_insert_comments_marks_only_posts_that_gained_rows(pg, monkeypatch):
+    dirty: set[str] = set()
+    monkeypatch.setattr(ingest, "_dirty_post_ids", dirty)
+    monkeypatch.setattr(ingest, "_orphan_stats", {"dropped": 0, "parked": 0})
+
+    async def body(pool):
+        await ingest.insert_posts(pool, [_post("p1"), _post("p2")], dry_run=False)
+        first = [_comment("c1", "p1"), _comment("c2", "p2"), _comment("c3", "gone")]
+        results = [await ingest.insert_comments(pool, first, dry_run=False)]
+        marked = [set(dirty)]
+        dirty.clear()
+        # Replaying the batch inserts nothing; only c4 is new
+        results.append(await ingest.insert_comments(pool, first + [_comment("c4", "p1")], dry_run=False))
+        marked.append(set(dirty))
+        stored = await pool.fetchval("SELECT COUNT(*) FROM comments")
+        return results, marked, stored
+
+    results, marked, stored = pg(body)
+    assert results == [2, 1]
+    assert marked == [{"p1", "p2"}, {"p1"}]
+    assert stored == 3
+    assert ingest._orphan_stats["dropped"] == 2
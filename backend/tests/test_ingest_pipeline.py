@@ -0,0 +1,42 @@
+import asyncio
+import json
+
+import zstandard as zstd
+
+import ingest_pipeline
+from ingest import iter_zst
+
+
+def _keep_odd(obj):
+    # Module level so the spawned parser processes can unpickle it
+    return obj if obj["i"] % 2 else None
+
+
+def _write_zst(path, n: int) -> None:
+    lines = []
+    for i in range(n):
+        lines.append(json.dumps({"i": i}))
+        if i % 10 == 0:
+            lines += ["", "{not json"]
+    path.write_bytes(zstd.ZstdCompressor().compress(("\n".join(lines) + "\n").encode()))
+
+
+def test_pipelined_limit_counts_parsed_objects_like_iter_zst(tmp_path, monkeypatch):
+    path = tmp_path / "RC_test.zst"
+    _write_zst(path, 2000)
+    monkeypatch.setattr(ingest_pipeline, "BLOCK_BYTES", 2048)
+    loaded: list[dict] = []
+
+    async def load(pool, records, dry_run):
+        loaded.extend(records)
+        return len(records)
+
+    for limit in (1, 333, 2000, None):
+        loaded.clear()
+        asyncio.run(ingest_pipeline.import_file_pipelined(
+            None, "Comments", str(path), _keep_odd, load,
+            batch_size=50, limit=limit, dry_run=False, workers=2, read_size=1024,
+        ))
+        inline = [r for r in map(_keep_odd, iter_zst(str(path), limit=limit)) if r]
+        assert len(loaded) == len(inline), limit
+        assert all(r["i"] % 2 for r in loaded)
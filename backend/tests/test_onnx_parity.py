@@ -0,0 +1,61 @@
+"""
+The onnx backend must produce the same vectors as sentence-transformers, or
+embeddings written by one backend can't be searched with the other
+(compare_embeddings.py runs the same check on a real dump).
+
+Needs onnxruntime, tokenizers and sentence-transformers plus the model files —
+ONNX_MODEL_DIR, or the Hugging Face repo already in the local cache.  Skipped
+otherwise; nothing is downloaded.
+"""
+
+import numpy as np
+import pytest
+
+from repositories import embeddings as emb
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+pytest.importorskip("sentence_transformers")
+
+TEXTS = [
+    "Title: How do you chase clients who pay invoices 60 days late?",
+    "Title: Built a tiny SaaS for dentists\n\nAfter six months I have 40 paying "
+    "practices. Churn is low but onboarding takes me an hour per customer.",
+    "Is there a tool that reminds customers automatically before a subscription renews?",
+    "short",
+    "Title: Pricing advice\n\n" + "We charge per seat and people share logins. " * 40,
+]
+
+
+def _cached_onnx_files():
+    if emb._ONNX_MODEL_DIR:
+        model, tokenizer = emb._onnx_model_files()
+        return (model, tokenizer) if model.exists() and tokenizer.exists() else None
+    from huggingface_hub import try_to_load_from_cache
+
+    files = [try_to_load_from_cache(emb._LOCAL_MODEL_NAME, f) for f in ("onnx/model.onnx", "tokenizer.json")]
+    return tuple(files) if all(isinstance(f, str) for f in files) else None
+
+
+@pytest.fixture(scope="module")
+def reference():
+    if _cached_onnx_files() is None:
+        pytest.skip(f"ONNX files for {emb._LOCAL_MODEL_NAME} are not available locally")
+    try:
+        return np.stack(emb._encode_local(TEXTS))
+    except OSError as exc:  # sentence-transformers model not cached / no network
+        pytest.skip(f"sentence-transformers model unavailable: {exc}")
+
+
+@pytest.mark.parametrize("quantize, tolerance", [(False, 0.99), (True, 0.98)])
+def test_onnx_matches_sentence_transformers(reference, quantize, tolerance, tmp_path, monkeypatch):
+    monkeypatch.setattr(emb, "_onnx", None)
+    monkeypatch.setattr(emb, "_ONNX_QUANTIZE", quantize)
+    monkeypatch.setattr(emb, "_ONNX_CACHE_DIR", tmp_path)
+
+    got = np.stack(emb._encode_onnx(TEXTS))
+
+    assert got.shape == reference.shape
+    # Both sides are L2-normalised, so the row-wise dot product is the cosine
+    cos = np.einsum("ij,ij->i", reference, got)
+    assert cos.min() >= tolerance, dict(zip(TEXTS, cos.round(5)))
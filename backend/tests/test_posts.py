@@ -0,0 +1,207 @@
+from repositories.posts import _combine_top_matches
+
+
+def _results_page_rows():
+    """Rows shaped like get_results_page's top_posts / top_comments CTEs (via json_agg)."""
+    top_posts = [
+        {
+            "id": "p1",
+            "subreddit": "freelance",
+            "author": "alice",
+            "title": "Clients never pay on time",
+            "body": "Net 60 is killing me",
+            "score": 12,
+            "url": "https://reddit.com/r/freelance/p1",
+            "similarity": 0.81,
+        }
+    ]
+    top_comments = [
+        {
+            "id": "c1",
+            "subreddit": "freelance",
+            "author": "bob",
+            "title": "Clients never pay on time",
+            "body": "Same here, I started charging late fees",
+            "score": 3,
+            "similarity": 0.86,
+        }
+    ]
+    return top_posts, top_comments
+
+
+def test_combine_top_matches_results_page_rows():
+    top_posts, top_comments = _results_page_rows()
+    matches = _combine_top_matches(top_posts, top_comments, limit=10)
+
+    assert [m.id for m in matches] == ["c1", "p1"]
+    assert [m.kind for m in matches] == ["comment", "post"]
+    assert all(m.title == "Clients never pay on time" for m in matches)
+    assert matches[0].url is None
+
+
+def test_combine_top_matches_without_title_column():
+    top_posts, top_comments = _results_page_rows()
+    for row in top_posts + top_comments:
+        del row["title"]
+    matches = _combine_top_matches(top_posts, top_comments, limit=1)
+
+    assert len(matches) == 1
+    assert matches[0].title is None
+
+
+# ── Against Postgres (TEST_DATABASE_URL) ─────────────────────────────────────
+
+from datetime import datetime, timedelta  # noqa: E402
+
+import numpy as np  # noqa: E402
+
+from repositories import posts as posts_repo  # noqa: E402
+
+DIM = 768
+
+
+def _near(axis: int, offset: float = 0.0, other: int = 1) -> np.ndarray:
+    """Unit vector on `axis`, tilted towards `other` by `offset` (0 = identical to the axis)."""
+    vec = np.zeros(DIM, dtype=np.float32)
+    vec[axis] = 1.0
+    vec[other] = offset
+    return vec / np.linalg.norm(vec)
+
+
+def _stub_query_embedding(monkeypatch, vec: np.ndarray) -> None:
+    async def embed_text(_text: str) -> np.ndarray:
+        return vec
+
+    monkeypatch.setattr(posts_repo, "embed_text", embed_text)
+
+
+async def _insert_post(conn, post_id, embedding, *, subreddit="freelance", title=None,
+                       created=datetime(2024, 3, 4), last_comment=None, num_comments=0):
+    await conn.execute(
+        """
+        INSERT INTO posts (id, subreddit, title, body, author, created_utc, score, url,
+                           num_comments, last_comment_utc, embedding, month_bucket, week_bucket)
+        VALUES ($1, $2, $3, $4, $5, $6, 10, $7, $8, $9, $10, $11, $12)
+        """,
+        post_id, subreddit, title or f"title {post_id}", f"body {post_id}", f"author_{post_id}",
+        created, f"https://reddit.com/{post_id}", num_comments, last_comment, embedding,
+        created.year * 100 + created.month,
+        int((created - timedelta(days=created.weekday())).strftime("%Y%m%d")),
+    )
+
+
+async def _insert_comment(conn, comment_id, post_id, created, embedding=None):
+    await conn.execute(
+        """
+        INSERT INTO comments (id, post_id, author, body, created_utc, score)
+        VALUES ($1, $2, $3, $4, $5, 1)
+        """,
+        comment_id, post_id, f"commenter_{comment_id}", f"comment {comment_id}", created,
+    )
+    if embedding is not None:
+        await conn.execute(
+            "INSERT INTO comment_embeddings (comment_id, embedding) VALUES ($1, $2)",
+            comment_id, embedding,
+        )
+
+
+def test_get_results_page_rows(pg, monkeypatch):
+    _stub_query_embedding(monkeypatch, _near(0))
+    captured = {}
+    combine = posts_repo._combine_top_matches
+
+    def spy(post_rows, comment_rows, limit):
+        captured["posts"], captured["comments"] = post_rows, comment_rows
+        return combine(post_rows, comment_rows, limit)
+
+    monkeypatch.setattr(posts_repo, "_combine_top_matches", spy)
+    last = datetime(2024, 3, 5, 12)
+
+    async def body(pool):
+        async with pool.acquire() as conn:
+            await _insert_post(conn, "p1", _near(0, 0.1), title="Clients never pay",
+                               last_comment=last, num_comments=4)
+            await _insert_post(conn, "p2", _near(0, 0.2), created=datetime(2024, 4, 8))
+            await _insert_post(conn, "far", _near(5))  # below the similarity threshold
+            for i in range(4):
+                await _insert_comment(conn, f"c{i}", "p1", last - timedelta(hours=i),
+                                      embedding=_near(0, 0.05) if i == 0 else None)
+            await conn.execute(
+                "INSERT INTO post_comment_activity (post_id, hourly_cum) VALUES ('p1', $1)",
+                [1, 2, 3, 4],
+            )
+        return await posts_repo.get_results_page("late invoices", window_hours=24, min_comments=3)
+
+    page = pg(body)
+
+    assert set(captured["posts"][0]) == {
+        "id", "subreddit", "author", "title", "body", "score", "url", "similarity",
+    }
+    assert set(captured["comments"][0]) == {
+        "id", "subreddit", "author", "title", "body", "score", "similarity",
+    }
+    matches = {m.id: m for m in page.top_matches.matches}
+    assert set(matches) == {"p1", "p2", "c0"}
+    assert matches["p1"].title == "Clients never pay"
+    assert (matches["c0"].kind, matches["c0"].title) == ("comment", "Clients never pay")
+    assert [(p.date, p.value) for p in page.mentions.points] == [
+        ("2024-03-01", 1), ("2024-04-01", 1),
+    ]
+    assert [t.id for t in page.active_threads.threads] == ["p1"]
+    assert page.active_threads.threads[0].recent_comments == 4
+
+
+def test_search_posts_subreddit_filter_without_iterative_scan(pg, monkeypatch):
+    """A selective subreddit must still fill `limit` when the HNSW scan is capped at ef_search."""
+    _stub_query_embedding(monkeypatch, _near(0))
+    monkeypatch.setattr(posts_repo, "HNSW_EF_SEARCH", 10)
+    monkeypatch.setattr(posts_repo, "ANN_CANDIDATE_LIMIT", 10)
+    monkeypatch.setattr(posts_repo, "_iterative_scan", False)
+
+    async def body(pool):
+        async with pool.acquire() as conn:
+            # Leave the planner only the HNSW index, as on a large table where
+            # the subreddit is not selective enough for posts_subreddit_idx
+            await conn.execute("DROP INDEX posts_subreddit_idx")
+            for i in range(40):  # nearer to the query than any r/target post
+                await _insert_post(conn, f"o{i}", _near(0, 0.01 + i * 0.001), subreddit="other")
+            for i in range(5):
+                await _insert_post(conn, f"t{i}", _near(0, 0.3 + i * 0.01), subreddit="target")
+        return (
+            await posts_repo.search_posts("late invoices", subreddit="target", limit=5),
+            await posts_repo.search_posts("late invoices", limit=5),
+        )
+
+    in_subreddit, overall = pg(body, enable_seqscan="off")
+    assert [r.id for r in in_subreddit.results] == [f"t{i}" for i in range(5)]
+    assert [r.id for r in overall.results] == [f"o{i}" for i in range(5)]
+
+
+def test_active_threads_count_comments_for_posts_missing_activity_stats(pg, monkeypatch):
+    """post_comment_activity lags ingest; posts without a row must not drop out of the active lists."""
+    _stub_query_embedding(monkeypatch, _near(0))
+    last = datetime(2024, 3, 5, 12)
+
+    async def body(pool):
+        async with pool.acquire() as conn:
+            for post_id, offset, n in (("stats", 0.1, 4), ("fresh", 0.2, 3), ("quiet", 0.3, 1)):
+                await _insert_post(conn, post_id, _near(0, offset), last_comment=last, num_comments=n + 1)
+                for i in range(n):
+                    await _insert_comment(conn, f"{post_id}{i}", post_id, last - timedelta(hours=i))
+                # Outside the 24h window
+                await _insert_comment(conn, f"{post_id}-old", post_id, last - timedelta(hours=30))
+            await conn.execute(
+                "INSERT INTO post_comment_activity (post_id, hourly_cum) VALUES ('stats', $1)",
+                [1, 2, 3, 4] + [4] * 26 + [5],
+            )
+        return (
+            await posts_repo.get_active_threads("late invoices", window_hours=24, min_comments=3),
+            await posts_repo.get_results_page("late invoices", window_hours=24, min_comments=3),
+            await posts_repo.get_threads_activity(["stats", "fresh", "quiet"], window_hours=24),
+        )
+
+    active, page, by_id = pg(body)
+    expected = [("stats", 4), ("fresh", 3)]
+    assert [(t.id, t.recent_comments) for t in active.threads] == expected
+    assert [(t.id, t.recent_comments) for t in page.active_threads.threads] == expected
+    assert [(t.id, t.recent_comments) for t in by_id.threads] == expected + [("quiet", 1)]